@@ -0,0 +1,132 @@
+"""
+Compares the cost of encoding the responses of the read routes:
+
+- before: the generic `jsonable_encoder` walk then the stdlib `json` encoder of
+  `JSONResponse`, what every route did without a response model,
+- after: the conversion from the response model of the route then orjson,
+  what the routes do with `FastJSONResponse` as the default response class.
+
+The medal routes are encoded from the projections of a generated medal table,
+the sport routes from the reference data of `dump_data`.
+
+Usage: python -m benchmarks.bench_serialization [--countries 150] [--audience 1000]
+"""
+import argparse
+import random
+import timeit
+from typing import get_type_hints
+
+# common configures the environment, it must be imported before sota
+from . import common  # noqa: F401
+import pycountry
+from bson import decode_file_iter
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sota.database_connection import sota_database
+from sota.projections import medal_projections
+from sota.reference_data import reference_data
+from sota.responses import FastJSONResponse
+from sota.routers import audient_router, medal_router, medals_router, sport_router
+from sota.routers import sports_router
+from sota.standings import medal_standings
+
+
+def load_reference_data():
+    for name in ("SportDetail", "SubSportType"):
+        with open(f"dump_data/Sota/{name}.bson", "rb") as file:
+            sota_database[name].insert_many(list(decode_file_iter(file)))
+    reference_data.reload()
+
+
+def generate_medals(countries: int):
+    """
+    Gives medals of 20 sub-sports to each country, returns the code of the first one.
+    """
+    random.seed(0)
+    sub_sports = list(sota_database["SubSportType"].find({}, {"_id": 0}))
+    documents = []
+    for country in list(pycountry.countries)[:countries]:
+        documents.append(
+            {
+                "country_code": country.alpha_2,
+                "country_name": country.name,
+                "sports": [
+                    {
+                        "sport_id": sub_sport["sport_id"],
+                        "type_id": sub_sport["type_id"],
+                        "gold": random.randint(0, 3),
+                        "silver": random.randint(0, 3),
+                        "bronze": random.randint(0, 3),
+                    }
+                    for sub_sport in random.sample(sub_sports, 20)
+                ],
+            }
+        )
+    sota_database["Medal"].insert_many(documents)
+    medal_standings.rebuild()
+    medal_projections.rebuild()
+    return documents[0]["country_code"]
+
+
+def encode_before(data) -> bytes:
+    return JSONResponse(jsonable_encoder(data)).body
+
+
+def encode_after(adapter: TypeAdapter, data) -> bytes:
+    return FastJSONResponse(
+        adapter.dump_python(adapter.validate_python(data), mode="json")
+    ).body
+
+
+def measure(function, *args) -> float:
+    """
+    Returns the best time of a call in milliseconds.
+    """
+    number = 20
+    best = min(timeit.repeat(lambda: function(*args), number=number, repeat=5))
+    return best / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--countries", type=int, default=150)
+    parser.add_argument("--audience", type=int, default=1000)
+    args = parser.parse_args()
+
+    load_reference_data()
+    country_code = generate_medals(args.countries)
+    audience = [
+        {"country_code": "US", "sport_id": [1, 5, 12], "gender": "F", "age": 30}
+    ] * args.audience
+
+    endpoints = [
+        ("/medals", medals_router.get_medals, medal_standings.table()),
+        (
+            f"/medal/c/{country_code}",
+            medal_router.get_medal_by_country,
+            medal_projections.country(country_code),
+        ),
+        ("/medal/s/1", medal_router.get_medal_by_sport, medal_projections.sport(1)),
+        ("/sport/all", sport_router.get_all_sport, sport_router.get_all_sport()),
+        ("/sports", sports_router.get_all_sports_id, sports_router.get_all_sports_id()),
+        (f"/audient?limit={args.audience}", audient_router.get_audient, audience),
+    ]
+
+    print(f"{'endpoint':<24}{'bytes':>10}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for path, endpoint, data in endpoints:
+        adapter = TypeAdapter(get_type_hints(endpoint)["return"])
+        assert encode_before(data) == JSONResponse(
+            adapter.dump_python(adapter.validate_python(data), mode="json")
+        ).body, f"{path} is not encoded the same way"
+
+        before = measure(encode_before, data)
+        after = measure(encode_after, adapter, data)
+        print(
+            f"{path:<24}{len(encode_after(adapter, data)):>10}"
+            f"{before:>12.3f}{after:>12.3f}{before / after:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Compares the round trips and latency of the medal update written participant
+by participant (the former implementation of `update_medal`) with the bulk
+write of `sota.medal_writer.write_medals`.
+
+Each batch mixes participants whose sub-sport already exists, countries without
+the sub-sport and countries without any medal yet.
+
+Then compares the throughput of concurrent updates, a podium each, committed
+one by one and coalesced by `sota.medal_writer.MedalWriteCoalescer`, through a
+connection pool of `--connections` connections.
+
+Usage: python -m benchmarks.bench_update_medal [--rtt-ms 1.0] [--connections 10]
+       [--window-ms 2.0]
+"""
+import argparse
+import asyncio
+import time
+
+# common configures the environment, it must be imported before sota
+from .common import RoundTripCollection, timed
+import pycountry
+from unittest.mock import patch
+from sota import medal_writer
+from sota.database_connection import async_medal_collection, medal_collection
+
+SIZES = (10, 100, 200)
+CONCURRENT_UPDATES = (10, 100, 500)
+SPORT_ID, TYPE_ID = 1, 1
+
+
+async def update_one_by_one(collection, medals):
+    """
+    The former implementation of `update_medal`: up to three round trips per participant.
+    """
+    for country_code, medal in medals.items():
+        sport_data = {"sport_id": SPORT_ID, "type_id": TYPE_ID, **medal}
+        updated = (
+            await collection.update_one(
+                {
+                    "country_code": country_code,
+                    "sports": {"$elemMatch": {"sport_id": SPORT_ID, "type_id": TYPE_ID}},
+                },
+                {"$set": {f"sports.$.{name}": count for name, count in medal.items()}},
+            )
+        ).matched_count
+        if not updated:
+            updated = (
+                await collection.update_one(
+                    {"country_code": country_code}, {"$push": {"sports": sport_data}}
+                )
+            ).matched_count
+            if not updated:
+                await collection.insert_one(
+                    {
+                        "country_code": country_code,
+                        "country_name": pycountry.countries.get(alpha_2=country_code).name,
+                        "sports": [sport_data],
+                    }
+                )
+
+
+async def update_in_bulk(collection, medals):
+    with patch.object(medal_writer, "async_medal_collection", collection):
+        await medal_writer.write_medals(
+            {
+                (country_code, SPORT_ID, TYPE_ID): medal
+                for country_code, medal in medals.items()
+            }
+        )
+
+
+async def update_concurrently(collection, podiums, window_ms):
+    """
+    Sends every podium at once, as the timing system does during a busy session.
+    """
+    coalescer = medal_writer.MedalWriteCoalescer(window_ms=window_ms)
+    with patch.object(medal_writer, "async_medal_collection", collection):
+        await asyncio.gather(
+            *(
+                coalescer.write(
+                    {
+                        (country_code, SPORT_ID, type_id): {
+                            "gold": int(medal == "gold"),
+                            "silver": int(medal == "silver"),
+                            "bronze": int(medal == "bronze"),
+                        }
+                        for country_code, medal in zip(podium, ("gold", "silver", "bronze"))
+                    }
+                )
+                for type_id, podium in podiums
+            )
+        )
+    return coalescer.stats()["commits"]
+
+
+def seed(country_codes):
+    """
+    Resets the Medal collection: a third of the countries already has the
+    sub-sport, a third has other medals only and the last third has none.
+    """
+    medal_collection.delete_many({})
+    for index, country_code in enumerate(country_codes):
+        if index % 3 == 2:
+            continue
+        sport_id = SPORT_ID if index % 3 == 0 else SPORT_ID + 1
+        medal_collection.insert_one(
+            {
+                "country_code": country_code,
+                "country_name": country_code,
+                "sports": [
+                    {"sport_id": sport_id, "type_id": TYPE_ID, "gold": 0, "silver": 0, "bronze": 0}
+                ],
+            }
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="simulated round trip latency")
+    parser.add_argument("--connections", type=int, default=10, help="size of the connection pool")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="coalescing window")
+    args = parser.parse_args()
+
+    country_codes = [country.alpha_2 for country in pycountry.countries]
+    print(f"simulated round trip: {args.rtt_ms} ms")
+    print(f"{'participants':>12} | {'implementation':>14} | {'round trips':>11} | {'latency (ms)':>12}")
+    for size in SIZES:
+        medals = {
+            country_code: {"gold": 1, "silver": 0, "bronze": 0}
+            for country_code in country_codes[:size]
+        }
+        for label, implementation in (
+            ("one by one", update_one_by_one),
+            ("bulk write", update_in_bulk),
+        ):
+            seed(list(medals))
+            collection = RoundTripCollection(async_medal_collection, args.rtt_ms)
+            _, elapsed = timed(implementation, collection, medals)
+            print(f"{size:>12} | {label:>14} | {collection.round_trips:>11} | {elapsed:>12.1f}")
+
+    print(f"\nconcurrent podiums, {args.connections} connections, window {args.window_ms} ms")
+    print(f"{'updates':>12} | {'implementation':>14} | {'commits':>11} | {'round trips':>11} | {'updates/s':>10}")
+    for updates in CONCURRENT_UPDATES:
+        podiums = [
+            (type_id, country_codes[(type_id * 3) % 150 : (type_id * 3) % 150 + 3])
+            for type_id in range(1, updates + 1)
+        ]
+        for label, window_ms in (("one by one", 0), ("coalesced", args.window_ms)):
+            seed(country_codes[:150])
+            collection = RoundTripCollection(async_medal_collection, args.rtt_ms, args.connections)
+            start = time.perf_counter()
+            commits = asyncio.run(update_concurrently(collection, podiums, window_ms))
+            rate = updates / (time.perf_counter() - start)
+            print(
+                f"{updates:>12} | {label:>14} | {commits:>11} | {collection.round_trips:>11} | {rate:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compares the validation of the audience and medal payloads checking countries
+against a list of codes, item by item (the former validators), with the checks
+of the whole payload against the frozenset of `sota.countries`.
+
+Usage: python -m benchmarks.bench_validation [--rows 5000]
+"""
+import argparse
+import random
+import timeit
+from typing import List
+
+# common configures the environment, it must be imported before sota
+from . import common  # noqa: F401
+import pycountry
+from bson import decode_file_iter
+from pydantic import BaseModel, model_validator, validator
+from sota.database_connection import sota_database
+from sota.reference_data import reference_data
+from sota.routers.audient_router import RequestAudientData, RequestListOfAudientData
+from sota.routers.medals_router import RequestUpdateMedal
+
+# the former list of codes, scanned for every item
+country_codes = [country.alpha_2 for country in pycountry.countries]
+
+
+class FormerAudientData(RequestAudientData):
+    @validator("country_code")
+    def validate_country_code(cls, value):
+        if value not in country_codes:
+            raise ValueError(f"Country {value} doesn't exist")
+        return value
+
+
+class FormerListOfAudientData(BaseModel):
+    audience: List[FormerAudientData]
+
+    @model_validator(mode="after")
+    def validate_sport_ids(self):
+        # the sport ids are checked the same way in both models
+        if reference_data.missing_sport_ids(
+            sport_id for item in self.audience for sport_id in item.sport_id
+        ):
+            raise ValueError("The sport_id doesn't exist")
+        return self
+
+
+class FormerUpdateMedal(RequestUpdateMedal):
+    @model_validator(mode="after")
+    def check_countries_in_participation(self):
+        participating_countries = reference_data.participating_countries(
+            self.sport_id, self.sport_type_id
+        )
+        for participant in self.participants:
+            if participant.country not in country_codes:
+                raise ValueError(f"Country {participant.country} doesn't exist")
+            if participant.country not in participating_countries:
+                raise ValueError(f"Country {participant.country} is not participating")
+        return self
+
+
+def load_reference_data():
+    for name in ("SportDetail", "SubSportType"):
+        with open(f"dump_data/Sota/{name}.bson", "rb") as file:
+            sota_database[name].insert_many(list(decode_file_iter(file)))
+    reference_data.reload()
+
+
+def measure(function) -> float:
+    """
+    Returns the best time of a call in milliseconds.
+    """
+    number = 5
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    load_reference_data()
+    random.seed(0)
+    # codes late in the list are the slowest to find by a scan
+    codes = country_codes[-100:]
+    audience = {
+        "audience": [
+            {
+                "id": str(index),
+                "country_code": random.choice(codes),
+                "sport_id": [1, 2],
+                "gender": "F",
+                "age": 30,
+            }
+            for index in range(args.rows)
+        ]
+    }
+    sub_sport = reference_data.sub_sport(1, 1)
+    medals = {
+        "sport_id": 1,
+        "sport_type_id": 1,
+        "participants": [
+            {"country": country_code, "medal": {"gold": 1}}
+            for country_code in sorted(sub_sport["participating_countries"])
+        ],
+    }
+
+    payloads = [
+        (
+            f"audience, {args.rows} rows",
+            FormerListOfAudientData,
+            RequestListOfAudientData,
+            audience,
+        ),
+        (
+            f"medals, {len(medals['participants'])} participants",
+            FormerUpdateMedal,
+            RequestUpdateMedal,
+            medals,
+        ),
+    ]
+    print(f"{'payload':<32}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, former, current, payload in payloads:
+        before = measure(lambda: former.model_validate(payload))
+        after = measure(lambda: current.model_validate(payload))
+        print(f"{name:<32}{before:>12.3f}{after:>12.3f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
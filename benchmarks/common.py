@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+# The benchmarks run against the mongomock backed database used by the tests
+for name, value in {
+    "TESTING": "True",
+    "ALLOWED_ORIGINS": "*",
+    "ALLOWED_AUTH_ORIGINS": "*",
+    "DATABASE": "Sota",
+    "SPORT_DETAIL_COLLECTION": "SportDetail",
+    "SUB_SPORT_COLLECTION": "SubSportType",
+    "AUDIENT_COLLECTION": "Audient",
+    "MEDAL_COLLECTION": "Medal",
+    "KEYS_COLLECTION": "Keys",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+class _DelayedCursor:
+    """
+    Cursor paying one simulated round trip before yielding its first document.
+    """
+
+    def __init__(self, cursor, round_trip):
+        self._cursor = cursor
+        self._round_trip = round_trip
+        self._fetched = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._fetched:
+            self._fetched = True
+            await self._round_trip()
+        return await self._cursor.__anext__()
+
+    async def to_list(self, length=None):
+        await self._round_trip()
+        return await self._cursor.to_list(length)
+
+
+class RoundTripCollection:
+    """
+    Wraps an asyncio collection handle, counting the round trips to the
+    database and delaying each one by a simulated network latency.
+
+    With `connections`, at most that many round trips are in flight at once,
+    as with a connection pool of that size.
+    """
+
+    def __init__(self, collection, rtt_ms: float, connections: Optional[int] = None):
+        self._collection = collection
+        self._rtt = rtt_ms / 1000
+        self._connections = connections
+        self._pool: Optional[asyncio.Semaphore] = None
+        self.round_trips = 0
+
+    async def _round_trip(self) -> None:
+        self.round_trips += 1
+        if self._connections is None:
+            await asyncio.sleep(self._rtt)
+            return
+        if self._pool is None:
+            self._pool = asyncio.Semaphore(self._connections)
+        async with self._pool:
+            await asyncio.sleep(self._rtt)
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    def find(self, *args, **kwargs):
+        return _DelayedCursor(self._collection.find(*args, **kwargs), self._round_trip)
+
+    def __getattr__(self, name):
+        operation = getattr(self._collection, name)
+
+        async def run(*args, **kwargs):
+            await self._round_trip()
+            return await operation(*args, **kwargs)
+
+        return run
+
+
+def timed(coroutine_function, *args, **kwargs):
+    """
+    Runs a coroutine function to completion and returns its result
+    with the elapsed time in milliseconds.
+    """
+    start = time.perf_counter()
+    result = asyncio.run(coroutine_function(*args, **kwargs))
+    return result, (time.perf_counter() - start) * 1000
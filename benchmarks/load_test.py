@@ -0,0 +1,274 @@
+"""
+Runs scripted scenarios against the ASGI app and reports the latency percentiles
+of every endpoint they call.
+
+The database is seeded by `benchmarks.seed` first, unless `--no-seed` is given
+to reuse a local mongod seeded beforehand. The requests go through httpx's ASGI
+transport, so the results measure the app and the database, not a server.
+
+- scoreboard: clients polling the medal table, with the ETag of their last
+  response, and the medals of countries and sports,
+- medal_burst: clients publishing the podiums of random sub-sports,
+- audience_upload: clients uploading batches of the audience,
+- mixed: the three at once, mostly scoreboard clients.
+
+`--json` saves the results, `--baseline` compares them with saved results
+so a regression shows up in review.
+
+On mongomock the database calls block the event loop, so a slow write delays
+the reads of the mixed scenario; a mongod gives the figures of production.
+
+Usage: python -m benchmarks.load_test [--scenario all] [--clients 10] [--duration 5]
+       [--audience 2000] [--batch 100] [--json results.json] [--baseline results.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+# common configures the environment, it must be imported before sota
+from . import common  # noqa: F401
+from .seed import DEFAULT_AUDIENCE, TOKEN, seed
+
+# the query plans are not needed to measure the routes
+os.environ.setdefault("EXPLAIN_HOT_QUERIES", "False")
+
+import httpx
+from sota.main import app, lifespan
+from sota.reference_data import reference_data
+
+AUTHORIZATION = {"Authorization": f"Bearer {TOKEN}"}
+PERCENTILES = (50, 95, 99)
+
+
+class Recorder:
+    """
+    Latencies in milliseconds and number of errors of every endpoint.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(
+        self, http: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        response = await http.request(method, url, **kwargs)
+        self.latencies.setdefault(endpoint, []).append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+
+def percentile(values: List[float], rank: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted values.
+    """
+    return values[max(math.ceil(rank / 100 * len(values)) - 1, 0)]
+
+
+def summarize(recorder: Recorder, seconds: float) -> Dict[str, Dict]:
+    results = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        results[endpoint] = {
+            "requests": len(latencies),
+            "errors": recorder.errors.get(endpoint, 0),
+            "rps": len(latencies) / seconds,
+            **{f"p{rank}": percentile(latencies, rank) for rank in PERCENTILES},
+            "max": latencies[-1],
+        }
+    return results
+
+
+class World:
+    """
+    What the clients pick their requests from: the seeded countries, sports and sub-sports.
+    """
+
+    def __init__(self, batch: int):
+        self.batch = batch
+        self.sports = [sport["sport_id"] for sport in reference_data.sports()]
+        self.sub_sports = [
+            sub_sport
+            for sport_id in self.sports
+            for sub_sport in reference_data.sub_sports_of(sport_id)
+            if len(sub_sport["participating_countries"]) >= 3
+        ]
+        self.countries = sorted(
+            {
+                country_code
+                for sub_sport in self.sub_sports
+                for country_code in sub_sport["participating_countries"]
+            }
+        )
+
+
+async def poll_scoreboard(http, recorder: Recorder, rng: random.Random, world: World, state: Dict):
+    draw = rng.random()
+    if draw < 0.5:
+        headers = {"If-None-Match": state["etag"]} if "etag" in state else {}
+        response = await recorder.request(http, "GET /medals", "GET", "/medals", headers=headers)
+        if "etag" in response.headers:
+            state["etag"] = response.headers["etag"]
+    elif draw < 0.7:
+        country_code = rng.choice(world.countries)
+        await recorder.request(
+            http, "GET /medal/c/{country_code}", "GET", f"/medal/c/{country_code}"
+        )
+    elif draw < 0.9:
+        sport_id = rng.choice(world.sports)
+        await recorder.request(http, "GET /medal/s/{sport_id}", "GET", f"/medal/s/{sport_id}")
+    else:
+        await recorder.request(http, "GET /sports", "GET", "/sports")
+
+
+async def publish_medals(http, recorder: Recorder, rng: random.Random, world: World, state: Dict):
+    sub_sport = rng.choice(world.sub_sports)
+    podium = rng.sample(sub_sport["participating_countries"], 3)
+    payload = {
+        "sport_id": sub_sport["sport_id"],
+        "sport_type_id": sub_sport["type_id"],
+        "participants": [
+            {"country": country_code, "medal": {medal: 1}}
+            for country_code, medal in zip(podium, ("gold", "silver", "bronze"))
+        ],
+    }
+    await recorder.request(
+        http,
+        "POST /medals/update_medal",
+        "POST",
+        "/medals/update_medal",
+        json=payload,
+        headers=AUTHORIZATION,
+    )
+
+
+async def upload_audience(http, recorder: Recorder, rng: random.Random, world: World, state: Dict):
+    payload = {
+        "audience": [
+            {
+                "id": f"load{rng.randrange(10 * world.batch):08}",
+                "country_code": rng.choice(world.countries),
+                "sport_id": rng.sample(world.sports, 2),
+                "gender": rng.choice("MFN"),
+                "age": rng.randint(12, 90),
+            }
+            for _ in range(world.batch)
+        ]
+    }
+    await recorder.request(
+        http,
+        "POST /audient/update_audient_info",
+        "POST",
+        "/audient/update_audient_info",
+        json=payload,
+        headers=AUTHORIZATION,
+    )
+
+
+# the clients of a scenario are shared between its actions
+SCENARIOS: Dict[str, List[tuple]] = {
+    "scoreboard": [(poll_scoreboard, 1.0)],
+    "medal_burst": [(publish_medals, 1.0)],
+    "audience_upload": [(upload_audience, 1.0)],
+    "mixed": [(poll_scoreboard, 0.8), (publish_medals, 0.1), (upload_audience, 0.1)],
+}
+
+
+async def run_client(
+    http, recorder: Recorder, action: Callable, world: World, deadline: float, client_seed: int
+):
+    rng = random.Random(client_seed)
+    state: Dict = {}
+    while time.perf_counter() < deadline:
+        await action(http, recorder, rng, world, state)
+        # the mongomock calls don't yield, let the other clients run
+        await asyncio.sleep(0)
+
+
+async def run_scenario(name: str, clients: int, duration: float, world: World) -> Dict:
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as http:
+        start = time.perf_counter()
+        deadline = start + duration
+        tasks = []
+        for action, share in SCENARIOS[name]:
+            for _ in range(max(round(clients * share), 1)):
+                tasks.append(
+                    run_client(http, recorder, action, world, deadline, len(tasks))
+                )
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return summarize(recorder, elapsed)
+
+
+def print_report(results: Dict[str, Dict], baseline: Optional[Dict]) -> None:
+    header = f"{'endpoint':<36}{'requests':>9}{'errors':>7}{'rps':>8}"
+    header += "".join(f"{f'p{rank} ms':>10}" for rank in PERCENTILES) + f"{'max ms':>10}"
+    if baseline is not None:
+        header += f"{'p95 vs base':>13}"
+    for scenario, endpoints in results.items():
+        print(f"\n[{scenario}]")
+        print(header)
+        for endpoint, result in endpoints.items():
+            line = f"{endpoint:<36}{result['requests']:>9}{result['errors']:>7}{result['rps']:>8.0f}"
+            line += "".join(f"{result[f'p{rank}']:>10.2f}" for rank in PERCENTILES)
+            line += f"{result['max']:>10.2f}"
+            if baseline is not None:
+                before = baseline.get(scenario, {}).get(endpoint)
+                if before:
+                    change = (result["p95"] - before["p95"]) / before["p95"] * 100
+                    line += f"{change:>+12.1f}%"
+                else:
+                    line += f"{'new':>13}"
+            print(line)
+
+
+async def run(args) -> Dict[str, Dict]:
+    async with lifespan(app):
+        world = World(args.batch)
+        names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        return {
+            name: await run_scenario(name, args.clients, args.duration, world)
+            for name in names
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--clients", type=int, default=10, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--sports", type=int, default=50)
+    parser.add_argument("--sub-sports", type=int, default=400)
+    parser.add_argument("--audience", type=int, default=DEFAULT_AUDIENCE)
+    parser.add_argument("--batch", type=int, default=100, help="people per audience upload")
+    parser.add_argument("--no-seed", action="store_true", help="keep the data of the database")
+    parser.add_argument("--json", help="file to save the results to")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        seed(args.countries, args.sports, args.sub_sports, args.audience)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = asyncio.run(run(args))
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
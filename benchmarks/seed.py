@@ -0,0 +1,169 @@
+"""
+Seeds the database with synthetic data at the scale of a real games: countries,
+sports, their sub-sports with participating countries, a medal table and an
+audience of any size, plus a key allowed to publish and administer.
+
+The data is the same for the same arguments and seed. It is written to the
+mongomock database of `benchmarks/common.py`, or to a local mongod when the
+environment sets `TESTING=False` and `MONGO`. mongomock scans the whole
+collection for every upsert, so the default audience is small on it
+and a million people on a mongod.
+
+Usage: python -m benchmarks.seed [--countries 200] [--sports 50] [--sub-sports 400]
+       [--audience 1000000] [--seed 0]
+"""
+import argparse
+import itertools
+import random
+import time
+from typing import Dict, Iterator, List
+
+# common configures the environment, it must be imported before sota
+from . import common  # noqa: F401
+import pycountry
+from sota.database_connection import sota_database, testing
+
+# key of the scenarios, with every scope, keys are 20 characters long
+TOKEN = "loadt" * 4
+COLLECTIONS = ("SportDetail", "SubSportType", "Medal", "Audient", "Keys")
+AUDIENT_CHUNK_SIZE = 10_000
+DEFAULT_AUDIENCE = 2_000 if testing else 1_000_000
+
+
+def generate_sports(rng: random.Random, country_codes: List[str], sports: int) -> List[Dict]:
+    documents = []
+    for sport_id in range(1, sports + 1):
+        size = rng.randint(len(country_codes) // 4, len(country_codes))
+        documents.append(
+            {
+                "sport_id": sport_id,
+                "sport_name": f"Sport {sport_id}",
+                "sport_summary": f"Summary of sport {sport_id}.",
+                "participating_countries": sorted(rng.sample(country_codes, size)),
+            }
+        )
+    return documents
+
+
+def generate_sub_sports(
+    rng: random.Random, sports: List[Dict], sub_sports: int
+) -> List[Dict]:
+    """
+    Spreads the sub-sports over the sports, each one open to part of the countries of its sport.
+    """
+    documents = []
+    type_ids: Dict[int, int] = {}
+    for index in range(sub_sports):
+        sport = sports[index % len(sports)]
+        type_id = type_ids[sport["sport_id"]] = type_ids.get(sport["sport_id"], 0) + 1
+        countries = sport["participating_countries"]
+        size = rng.randint(max(len(countries) // 2, 1), len(countries))
+        documents.append(
+            {
+                "sport_id": sport["sport_id"],
+                "type_id": type_id,
+                "type_name": f"Event {type_id} of sport {sport['sport_id']}",
+                "participating_countries": rng.sample(countries, size),
+            }
+        )
+    return documents
+
+
+def generate_medals(rng: random.Random, sub_sports: List[Dict]) -> List[Dict]:
+    """
+    Awards one gold, silver and bronze medal in every sub-sport.
+    """
+    medals: Dict[str, Dict] = {}
+    for sub_sport in sub_sports:
+        podium = rng.sample(sub_sport["participating_countries"], 3)
+        for country_code, medal in zip(podium, ("gold", "silver", "bronze")):
+            document = medals.setdefault(
+                country_code,
+                {
+                    "country_code": country_code,
+                    "country_name": pycountry.countries.get(alpha_2=country_code).name,
+                    "sports": [],
+                },
+            )
+            document["sports"].append(
+                {
+                    "sport_id": sub_sport["sport_id"],
+                    "type_id": sub_sport["type_id"],
+                    "gold": 0,
+                    "silver": 0,
+                    "bronze": 0,
+                    medal: 1,
+                }
+            )
+    return list(medals.values())
+
+
+def generate_audience(
+    rng: random.Random, country_codes: List[str], sports: int, size: int
+) -> Iterator[Dict]:
+    for index in range(size):
+        audient_id = f"a{index:08}"
+        yield {
+            "_id": audient_id,
+            "id": audient_id,
+            "country_code": rng.choice(country_codes),
+            "sport_id": rng.sample(range(1, sports + 1), rng.randint(1, 3)),
+            "gender": rng.choice("MFN"),
+            "age": rng.randint(12, 90),
+        }
+
+
+def seed(
+    countries: int = 200,
+    sports: int = 50,
+    sub_sports: int = 400,
+    audience: int = DEFAULT_AUDIENCE,
+    random_seed: int = 0,
+) -> Dict[str, int]:
+    """
+    Replaces the collections with generated data, returns the number of documents of each.
+    """
+    rng = random.Random(random_seed)
+    country_codes = sorted(
+        rng.sample([country.alpha_2 for country in pycountry.countries], countries)
+    )
+    sport_documents = generate_sports(rng, country_codes, sports)
+    sub_sport_documents = generate_sub_sports(rng, sport_documents, sub_sports)
+    medal_documents = generate_medals(rng, sub_sport_documents)
+
+    for name in COLLECTIONS:
+        sota_database[name].delete_many({})
+    sota_database["SportDetail"].insert_many(sport_documents)
+    sota_database["SubSportType"].insert_many(sub_sport_documents)
+    sota_database["Medal"].insert_many(medal_documents)
+    sota_database["Keys"].insert_one(
+        {"key": TOKEN, "scope": {"PUBLISH_AUDIENCE": True, "PUBLISH_MEDAL": True, "ADMIN": True}}
+    )
+    rows = generate_audience(rng, country_codes, sports, audience)
+    while True:
+        chunk = list(itertools.islice(rows, AUDIENT_CHUNK_SIZE))
+        if not chunk:
+            break
+        sota_database["Audient"].insert_many(chunk)
+
+    return {name: sota_database[name].count_documents({}) for name in COLLECTIONS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--sports", type=int, default=50)
+    parser.add_argument("--sub-sports", type=int, default=400)
+    parser.add_argument("--audience", type=int, default=DEFAULT_AUDIENCE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = seed(args.countries, args.sports, args.sub_sports, args.audience, args.seed)
+    for name, count in counts.items():
+        print(f"{name:<14}{count:>10}")
+    print(f"seeded in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
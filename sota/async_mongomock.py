@@ -0,0 +1,103 @@
+from itertools import islice
+from typing import List, Optional
+
+
+class AsyncMockCursor:
+    """
+    Stand-in for the cursors of pymongo's asyncio API,
+    iterating over a mongomock cursor.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None) -> List:
+        return list(islice(self._cursor, length))
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, *args, **kwargs):
+        self._cursor = self._cursor.skip(*args, **kwargs)
+        return self
+
+    def limit(self, *args, **kwargs):
+        self._cursor = self._cursor.limit(*args, **kwargs)
+        return self
+
+    def batch_size(self, *args, **kwargs):
+        self._cursor = self._cursor.batch_size(*args, **kwargs)
+        return self
+
+
+class AsyncMockCollection:
+    """
+    Stand-in for pymongo's `AsyncCollection` used when testing.
+
+    Every operation is a coroutine running the same operation on a mongomock
+    collection, so the asyncio and the synchronous handles share their data.
+    The operation is looked up on each call, which lets tests patch the
+    methods of the mongomock collection.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    def find(self, *args, **kwargs) -> AsyncMockCursor:
+        return AsyncMockCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs) -> AsyncMockCursor:
+        return AsyncMockCursor(iter(self._collection.aggregate(*args, **kwargs)))
+
+    def __getattr__(self, name):
+        operation = getattr(self._collection, name)
+
+        async def run(*args, **kwargs):
+            return operation(*args, **kwargs)
+
+        return run
+
+
+class AsyncMockDatabase:
+    """
+    Stand-in for pymongo's `AsyncDatabase` on top of a mongomock database.
+    """
+
+    def __init__(self, database):
+        self._database = database
+
+    @property
+    def name(self) -> str:
+        return self._database.name
+
+    def __getitem__(self, name: str) -> AsyncMockCollection:
+        return AsyncMockCollection(self._database[name])
+
+
+class AsyncMockClient:
+    """
+    Stand-in for pymongo's `AsyncMongoClient` on top of a mongomock client.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getitem__(self, name: str) -> AsyncMockDatabase:
+        return AsyncMockDatabase(self._client[name])
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,199 @@
+import threading
+from enum import Enum
+from itertools import permutations
+from typing import Dict, List, Optional, Tuple
+from decouple import config, Csv
+from .data_versions import data_versions, AUDIENCE
+from .database_connection import async_audient_collection
+from .pipelines import Pipeline
+
+
+class Dimension(Enum):
+    COUNTRY = "country"
+    SPORT = "sport"
+    GENDER = "gender"
+    AGE = "age"
+
+
+def age_buckets(boundaries: List[int]) -> List[Tuple[int, str]]:
+    """
+    Returns the (upper bound, label) of the age buckets delimited by the boundaries,
+    for instance [18, 25] gives "0-17", "18-24" and "25+".
+    """
+    buckets = []
+    lower = 0
+    for upper in boundaries:
+        buckets.append((upper, f"{lower}-{upper - 1}"))
+        lower = upper
+    return buckets + [(None, f"{lower}+")]
+
+
+AGE_BUCKETS = age_buckets(
+    config("AUDIENT_AGE_BUCKETS", default="18,25,35,45,55,65", cast=Csv(int))
+)
+AGE_LABELS = [label for _, label in AGE_BUCKETS]
+
+# expression grouping the audience by each dimension
+GROUP_KEYS = {
+    Dimension.COUNTRY: "$country_code",
+    Dimension.SPORT: "$sport_id",
+    Dimension.GENDER: "$gender",
+    Dimension.AGE: {
+        "$switch": {
+            "branches": [
+                {"case": {"$lt": ["$age", upper]}, "then": label}
+                for upper, label in AGE_BUCKETS[:-1]
+            ],
+            "default": AGE_LABELS[-1],
+        }
+    },
+}
+
+
+def count_pipeline(*dimensions: Dimension) -> List[Dict]:
+    """
+    Returns the pipeline counting the audience grouped by the given dimensions.
+    A person following several sports is counted once in each of them.
+    """
+    pipeline = [{"$unwind": "$sport_id"}] if Dimension.SPORT in dimensions else []
+    if len(dimensions) == 1:
+        group_key = GROUP_KEYS[dimensions[0]]
+    else:
+        group_key = {dimension.value: GROUP_KEYS[dimension] for dimension in dimensions}
+    return pipeline + [{"$group": {"_id": group_key, "count": {"$sum": 1}}}]
+
+
+COUNT_PIPELINES = {
+    dimension: Pipeline(f"audience_by_{dimension.value}", count_pipeline(dimension))
+    for dimension in Dimension
+}
+CROSSTAB_PIPELINES = {
+    (rows, columns): Pipeline(
+        f"audience_by_{rows.value}_{columns.value}", count_pipeline(rows, columns)
+    )
+    for rows, columns in permutations(Dimension, 2)
+}
+SUMMARY_PIPELINE = Pipeline(
+    "audience_summary",
+    [
+        {
+            "$facet": {
+                dimension.value: count_pipeline(dimension) for dimension in Dimension
+            }
+        }
+    ],
+)
+
+
+def sort_key(dimension: Dimension, value):
+    if dimension is Dimension.AGE:
+        return AGE_LABELS.index(value)
+    return value
+
+
+def to_counts(dimension: Dimension, groups: List[Dict]) -> Dict[str, int]:
+    """
+    Converts the groups of a single dimension to {value: count}, ordered by value.
+    """
+    groups = sorted(groups, key=lambda group: sort_key(dimension, group["_id"]))
+    return {str(group["_id"]): group["count"] for group in groups}
+
+
+class AudienceStats:
+    """
+    Counts of the audience computed by aggregations on the Audient collection.
+
+    Results are cached per query shape along with the audience version they
+    were computed for, so any write of the audience makes them stale.
+    """
+
+    def __init__(self, collection=async_audient_collection):
+        self._collection = collection
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple, Tuple[int, Dict]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def invalidate(self) -> None:
+        """
+        Drops every cached result.
+        """
+        with self._lock:
+            self._results.clear()
+
+    def _cached(self, shape: Tuple) -> Tuple[int, Optional[Dict]]:
+        version = data_versions.get(AUDIENCE)
+        with self._lock:
+            cached_version, result = self._results.get(shape, (None, None))
+            if cached_version == version:
+                self._hits += 1
+                return version, result
+            self._misses += 1
+        return version, None
+
+    def _store(self, shape: Tuple, version: int, result: Dict) -> Dict:
+        with self._lock:
+            self._results[shape] = (version, result)
+        return result
+
+    def stats(self) -> Dict:
+        """
+        Returns the number of cached results and the hit and miss counters.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._results),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
+
+    async def summary(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the counts by every dimension, computed by a single `$facet` stage.
+        """
+        version, result = self._cached(("summary",))
+        if result is not None:
+            return result
+        facets = await SUMMARY_PIPELINE.run_async(self._collection)
+        result = {
+            dimension.value: to_counts(dimension, facets[0][dimension.value])
+            for dimension in Dimension
+        }
+        return self._store(("summary",), version, result)
+
+    async def counts(self, dimension: Dimension) -> Dict[str, int]:
+        """
+        Returns the counts by a dimension as {value: count}.
+        """
+        version, result = self._cached((dimension,))
+        if result is not None:
+            return result
+        groups = await COUNT_PIPELINES[dimension].run_async(self._collection)
+        return self._store((dimension,), version, to_counts(dimension, groups))
+
+    async def crosstab(
+        self, rows: Dimension, columns: Dimension
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the counts by two dimensions as {row value: {column value: count}}.
+        """
+        version, result = self._cached((rows, columns))
+        if result is not None:
+            return result
+        groups = await CROSSTAB_PIPELINES[(rows, columns)].run_async(self._collection)
+        groups.sort(
+            key=lambda group: (
+                sort_key(rows, group["_id"][rows.value]),
+                sort_key(columns, group["_id"][columns.value]),
+            )
+        )
+        result = {}
+        for group in groups:
+            row = result.setdefault(str(group["_id"][rows.value]), {})
+            row[str(group["_id"][columns.value])] = group["count"]
+        return self._store((rows, columns), version, result)
+
+
+audience_stats = AudienceStats()
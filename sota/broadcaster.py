@@ -0,0 +1,172 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from decouple import config
+from .data_versions import data_versions
+
+# event sent to a subscriber which must refetch the medals instead of resuming
+RESET = {"type": "reset"}
+
+
+class Subscription:
+    """
+    The queue of events of one subscriber of the broadcaster.
+
+    The queue is bounded: a subscriber which doesn't keep up is dropped,
+    it gets a `RESET` event and its queue is closed.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int, backlog: List):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.backlog = deque(backlog)
+        self.dropped = False
+
+    def _put(self, item: Tuple[str, Dict]) -> None:
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Dict]]:
+        """
+        Returns the next (token, event), None once the subscriber was dropped.
+        Raises `asyncio.TimeoutError` if no event came within the timeout.
+        """
+        if self.backlog:
+            return self.backlog.popleft()
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class MedalBroadcaster:
+    """
+    In-process fan-out of the medal changes committed by `update_medal`.
+
+    Every event gets a resume token, "<boot id>-<sequence>". The last
+    `MEDAL_STREAM_HISTORY` events are kept so a client reconnecting with the
+    token of the last event it got receives the events it missed. A client
+    whose token is too old, or was issued before a restart, gets `RESET`.
+
+    The tokens and the history are those of the process: behind several
+    workers, a client only resumes if it reconnects to the same one, so the
+    stream needs sticky sessions, otherwise every reconnection gets `RESET`.
+
+    `publish` may be called from any thread, the events are handed to the event
+    loop of every subscriber.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = config("MEDAL_STREAM_QUEUE_SIZE", default=100, cast=int),
+        history_size: int = config("MEDAL_STREAM_HISTORY", default=1000, cast=int),
+    ):
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions: Set[Subscription] = set()
+        self._history: Deque[Tuple[int, Dict]] = deque(maxlen=history_size)
+        self._sequence = 0
+        self._dropped = 0
+        # last counts published for every (country, sport, type)
+        self._published: Dict[Tuple, Tuple] = {}
+
+    def _token(self, sequence: int) -> str:
+        return f"{data_versions.boot_id}-{sequence}"
+
+    def _backlog(self, resume_token: Optional[str]) -> List[Tuple[str, Dict]]:
+        if resume_token is None:
+            return []
+        boot_id, _, sequence = resume_token.rpartition("-")
+        if boot_id != data_versions.boot_id or not sequence.isdigit():
+            return [(self._token(self._sequence), RESET)]
+        sequence = int(sequence)
+        oldest = self._history[0][0] if self._history else self._sequence + 1
+        if sequence < oldest - 1 or sequence > self._sequence:
+            return [(self._token(self._sequence), RESET)]
+        return [
+            (self._token(event_sequence), event)
+            for event_sequence, event in self._history
+            if event_sequence > sequence
+        ]
+
+    def subscribe(self, resume_token: Optional[str] = None) -> Subscription:
+        """
+        Registers a subscriber on the running event loop. The events missed
+        since `resume_token` are delivered first.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            subscription = Subscription(
+                loop, self._queue_size, self._backlog(resume_token)
+            )
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, events: List[Dict]) -> None:
+        """
+        Sends events to every subscriber.
+        """
+        with self._lock:
+            for event in events:
+                self._published[self._cell(event)] = self._counts(event)
+                self._sequence += 1
+                self._history.append((self._sequence, event))
+                item = (self._token(self._sequence), event)
+                for subscription in list(self._subscriptions):
+                    if subscription.dropped:
+                        self._subscriptions.discard(subscription)
+                        self._dropped += 1
+                        continue
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription._put, item)
+                    except RuntimeError:  # the loop of the subscriber was closed
+                        self._subscriptions.discard(subscription)
+
+    @staticmethod
+    def _cell(event: Dict) -> Tuple:
+        return (event["country"], event["sport_id"], event["type_id"])
+
+    @staticmethod
+    def _counts(event: Dict) -> Tuple:
+        return (event["gold"], event["silver"], event["bronze"])
+
+    def publish_new(self, events: List[Dict]) -> None:
+        """
+        Sends the events whose counts were not published yet by this process,
+        for the changes which may have been published already.
+        """
+        with self._lock:
+            events = [
+                event
+                for event in events
+                if self._published.get(self._cell(event)) != self._counts(event)
+            ]
+        if events:
+            self.publish(events)
+
+    def forget(self) -> None:
+        """
+        Forgets the counts published, when the medals may have been written unseen.
+        """
+        with self._lock:
+            self._published = {}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "dropped": self._dropped,
+                "last_token": self._token(self._sequence),
+            }
+
+
+medal_broadcaster = MedalBroadcaster()
@@ -0,0 +1,36 @@
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Set
+
+
+@lru_cache(maxsize=None)
+def country_names() -> Dict[str, str]:
+    """
+    Returns the names of the countries keyed by their alpha-2 code.
+
+    Built on first use, pycountry loads its database when it is first read.
+    """
+    import pycountry
+
+    return {country.alpha_2: country.name for country in pycountry.countries}
+
+
+@lru_cache(maxsize=None)
+def country_codes() -> FrozenSet[str]:
+    """
+    Returns the alpha-2 codes of the countries.
+    """
+    return frozenset(country_names())
+
+
+def country_name(country_code: str) -> str:
+    """
+    Returns the name of a country from its alpha-2 code.
+    """
+    return country_names()[country_code]
+
+
+def unknown_countries(codes: Iterable[str]) -> Set[str]:
+    """
+    Returns the codes which aren't alpha-2 codes of a country among the given ones.
+    """
+    return set(codes).difference(country_codes())
@@ -0,0 +1,71 @@
+import threading
+import uuid
+from typing import Callable, Dict, Optional
+
+MEDALS = "medals"
+AUDIENCE = "audience"
+REFERENCE = "reference"
+
+
+class DataVersions:
+    """
+    Version counters of the data served by the read routes, bumped by the writes.
+
+    The counters of the process tell its caches when the data changed. They
+    are used as validators of the HTTP responses too, until the versions kept
+    in the database are shared: an ETag is then built from those, the same in
+    every worker, so a client revalidating with another worker still gets a
+    304. The ETag built from the counters of the process holds its id, so an
+    ETag issued before a restart, or by another process, is never taken as current.
+    """
+
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._tracked: Dict[str, Callable[[], int]] = {}
+        # versions shared by every process, None until they are known
+        self._shared: Optional[Dict[str, int]] = None
+
+    def track(self, name: str, version: Callable[[], int]) -> None:
+        """
+        Adds a version kept outside of this process, such as the sequence of
+        a snapshot shared by the workers, to the version of some data.
+        """
+        self._tracked[name] = version
+
+    def bump(self, name: str) -> int:
+        """
+        Increments the version of some data after it was written.
+        """
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return self._versions[name]
+
+    def share(self, versions: Dict[str, int]) -> None:
+        """
+        Sets the versions of some data kept in the database, which only grow.
+        """
+        with self._lock:
+            shared = dict(self._shared or {})
+            for name, version in versions.items():
+                shared[name] = max(shared.get(name, 0), version)
+            self._shared = shared
+
+    def get(self, name: str) -> int:
+        tracked = self._tracked.get(name)
+        return self._versions.get(name, 0) + (tracked() if tracked else 0)
+
+    def etag(self, *names: str) -> str:
+        """
+        Returns the strong ETag of the current versions of the given data.
+        """
+        shared = self._shared
+        if shared is not None:
+            versions = "-".join(str(shared.get(name, 0)) for name in names)
+            return f'"shared-{versions}"'
+        versions = "-".join(str(self.get(name)) for name in names)
+        return f'"{self.boot_id}-{versions}"'
+
+
+data_versions = DataVersions()
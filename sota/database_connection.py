@@ -1,20 +1,199 @@
-from pymongo import MongoClient
+import threading
+from typing import Dict
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
 from decouple import config
-from mongomock import MongoClient as MockMongoClient
+from .metrics import command_metrics
+from .pool_metrics import pool_metrics
+
+testing = config('TESTING', default=False, cast=bool)
+
+
+class LazyHandle:
+    """
+    Stands for a client, database or collection created on first use.
+
+    Creating a client resolves the hosts of the connection string and starts
+    its monitoring threads, which importing the app must not wait for. The
+    handles are created by the first operation, or by the lifespan handler.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._handle = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> bool:
+        return self._handle is not None
+
+    def resolve(self):
+        if self._handle is None:
+            with self._lock:
+                if self._handle is None:
+                    self._handle = self._factory()
+        return self._handle
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __getitem__(self, name):
+        return self.resolve()[name]
+
+
+def _optional_int(value: str):
+    return int(value) if value else None
+
+
+def client_options() -> Dict:
+    """
+    Returns the options of the clients set by the `MONGO_*` settings.
+    An option which isn't set is left to the connection string, or to the driver default.
+    """
+    options = {
+        "maxPoolSize": config("MONGO_MAX_POOL_SIZE", default="", cast=_optional_int),
+        "minPoolSize": config("MONGO_MIN_POOL_SIZE", default="", cast=_optional_int),
+        "maxConnecting": config("MONGO_MAX_CONNECTING", default="", cast=_optional_int),
+        "waitQueueTimeoutMS": config(
+            "MONGO_WAIT_QUEUE_TIMEOUT_MS", default="", cast=_optional_int
+        ),
+        "serverSelectionTimeoutMS": config(
+            "MONGO_SERVER_SELECTION_TIMEOUT_MS", default="", cast=_optional_int
+        ),
+        "readPreference": config("MONGO_READ_PREFERENCE", default="") or None,
+        "compressors": config("MONGO_COMPRESSORS", default="") or None,
+    }
+    return {name: value for name, value in options.items() if value is not None}
 
 
 def get_database_client():
-    if config('TESTING', default=False, cast=bool):
+    if testing:
+        from mongomock import MongoClient as MockMongoClient
+
         return MockMongoClient()
     else:
-        return MongoClient(config("MONGO", cast=str))
+        return MongoClient(
+            config("MONGO", cast=str),
+            event_listeners=[pool_metrics["sync"], command_metrics["sync"]],
+            **client_options(),
+        )
+
+
+def get_async_database_client(client):
+    """
+    Returns the client of the asyncio driver, used by the routes running
+    on the event loop. When testing it wraps the mongomock client
+    so both clients share the same data.
+    """
+    if testing:
+        from .async_mongomock import AsyncMockClient
+
+        return AsyncMockClient(client)
+    else:
+        return AsyncMongoClient(
+            config("MONGO", cast=str),
+            event_listeners=[pool_metrics["async"], command_metrics["async"]],
+            **client_options(),
+        )
+
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def read_preference():
+    """
+    Returns the read preference of the handles used by the read routes,
+    set by `READ_PREFERENCE` and bounded by `READ_MAX_STALENESS_SECONDS` if set.
+    The primary unless secondaries are chosen.
+    """
+    mode = READ_PREFERENCES[config("READ_PREFERENCE", default="primary")]
+    if mode is Primary:
+        return Primary()
+    return mode(
+        max_staleness=config("READ_MAX_STALENESS_SECONDS", default=-1, cast=int)
+    )
+
+
+def _collection(database, setting: str, default: str = "") -> LazyHandle:
+    # pinned to the primary, whatever `MONGO_READ_PREFERENCE` sets on the client
+    return LazyHandle(
+        lambda: database.get_collection(
+            config(setting, cast=str, default=default), read_preference=Primary()
+        )
+    )
+
+
+def _async_collection(database, collection: LazyHandle, setting: str, default: str = ""):
+    if testing:
+        from .async_mongomock import AsyncMockCollection
+
+        # wraps the synchronous handle, so tests patching it patch both
+        return AsyncMockCollection(collection)
+    return _collection(database, setting, default)
+
+
+def _read_collection(collection) -> LazyHandle:
+    return LazyHandle(
+        lambda: collection.with_options(read_preference=read_preference())
+    )
+
+
+def _async_read_collection(collection, read_collection: LazyHandle):
+    if testing:
+        from .async_mongomock import AsyncMockCollection
+
+        return AsyncMockCollection(read_collection)
+    return _read_collection(collection)
+
+
+client = LazyHandle(get_database_client)
+
+sota_database = LazyHandle(lambda: client[config("DATABASE", cast=str, default="")])
+sport_detail_collection = _collection(sota_database, "SPORT_DETAIL_COLLECTION")
+sub_sport_collection = _collection(sota_database, "SUB_SPORT_COLLECTION")
+audient_collection = _collection(sota_database, "AUDIENT_COLLECTION")
+medal_collection = _collection(sota_database, "MEDAL_COLLECTION")
+keys_collection = _collection(sota_database, "KEYS_COLLECTION")
+versions_collection = _collection(sota_database, "VERSIONS_COLLECTION", "Versions")
+medal_fact_collection = _collection(sota_database, "MEDAL_FACT_COLLECTION", "MedalFact")
+medal_counter_collection = _collection(sota_database, "MEDAL_COUNTER_COLLECTION", "MedalCounter")
+
+async_client = LazyHandle(lambda: get_async_database_client(client))
+
+async_sota_database = LazyHandle(lambda: async_client[config("DATABASE", cast=str, default="")])
+async_sport_detail_collection = _async_collection(async_sota_database, sport_detail_collection, "SPORT_DETAIL_COLLECTION")
+async_sub_sport_collection = _async_collection(async_sota_database, sub_sport_collection, "SUB_SPORT_COLLECTION")
+async_audient_collection = _async_collection(async_sota_database, audient_collection, "AUDIENT_COLLECTION")
+async_medal_collection = _async_collection(async_sota_database, medal_collection, "MEDAL_COLLECTION")
+async_keys_collection = _async_collection(async_sota_database, keys_collection, "KEYS_COLLECTION")
+async_versions_collection = _async_collection(async_sota_database, versions_collection, "VERSIONS_COLLECTION", "Versions")
+async_medal_fact_collection = _async_collection(async_sota_database, medal_fact_collection, "MEDAL_FACT_COLLECTION", "MedalFact")
+async_medal_counter_collection = _async_collection(async_sota_database, medal_counter_collection, "MEDAL_COUNTER_COLLECTION", "MedalCounter")
 
+# handles of the audience pages, which may read from secondaries. The writes,
+# and the caches keyed by the versions the writes bump, use the primary: a
+# lagging secondary would fill them with stale data under the new version
+read_audient_collection = _read_collection(audient_collection)
+async_read_audient_collection = _async_read_collection(async_audient_collection, read_audient_collection)
 
-client = get_database_client()
 
-sota_database = client[config("DATABASE", cast=str, default="")]
-sport_detail_collection = sota_database[config("SPORT_DETAIL_COLLECTION", cast=str, default="")]
-sub_sport_collection = sota_database[config("SUB_SPORT_COLLECTION", cast=str, default="")]
-audient_collection = sota_database[config("AUDIENT_COLLECTION", cast=str, default="")]
-medal_collection = sota_database[config("MEDAL_COLLECTION", cast=str, default="")]
-keys_collection = sota_database[config("KEYS_COLLECTION", cast=str, default="")]
\ No newline at end of file
+async def close_database_clients() -> None:
+    """
+    Closes the clients which were created.
+    """
+    if async_client.created:
+        await async_client.close()
+    if client.created:
+        client.close()
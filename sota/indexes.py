@@ -0,0 +1,173 @@
+import logging
+from typing import Dict, List
+from pymongo import ASCENDING, IndexModel
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+from .database_connection import (
+    keys_collection,
+    medal_collection,
+    sport_detail_collection,
+    sub_sport_collection,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def required_indexes() -> Dict[str, List[IndexModel]]:
+    """
+    Returns the indexes every collection needs for the hot queries,
+    keyed by collection name:
+
+    - Keys: `check_auth_key` looks up a key on every protected request,
+    - Medal: `update_medal` filters on country and the (sport, type) pair,
+    - SportDetail / SubSportType: joined by `$lookup` and validators.
+
+    The MedalFact documents of the flat layout are only read by their `_id`.
+    """
+    indexes = {
+        keys_collection.name: [
+            IndexModel([("key", ASCENDING)], name="key_1", unique=True),
+        ],
+        medal_collection.name: [
+            IndexModel(
+                [("country_code", ASCENDING)], name="country_code_1", unique=True
+            ),
+            IndexModel(
+                [("sports.sport_id", ASCENDING), ("sports.type_id", ASCENDING)],
+                name="sports.sport_id_1_sports.type_id_1",
+            ),
+        ],
+        sport_detail_collection.name: [
+            IndexModel([("sport_id", ASCENDING)], name="sport_id_1", unique=True),
+        ],
+        sub_sport_collection.name: [
+            IndexModel(
+                [("sport_id", ASCENDING), ("type_id", ASCENDING)],
+                name="sport_id_1_type_id_1",
+                unique=True,
+            ),
+        ],
+    }
+    return indexes
+
+
+def _collections(database=None) -> Dict[str, Collection]:
+    handles = (
+        keys_collection,
+        medal_collection,
+        sport_detail_collection,
+        sub_sport_collection,
+    )
+    if database is not None:
+        return {handle.name: database[handle.name] for handle in handles}
+    return {handle.name: handle for handle in handles}
+
+
+def _index_drift(existing: Dict, wanted: Dict) -> List[str]:
+    """
+    Compares an entry of `index_information()` with the wanted index document
+    and lists the differences as human readable strings.
+    """
+    drift = []
+    existing_key = [(field, int(order)) for field, order in existing["key"]]
+    wanted_key = [(field, int(order)) for field, order in wanted["key"].items()]
+    if existing_key != wanted_key:
+        drift.append(f"key is {existing_key}, expected {wanted_key}")
+    if bool(existing.get("unique")) != bool(wanted.get("unique")):
+        drift.append(
+            f"unique is {bool(existing.get('unique'))}, expected {bool(wanted.get('unique'))}"
+        )
+    return drift
+
+
+def ensure_indexes(database=None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Creates the required indexes that are missing and reports the ones
+    which exist under the same name but with a different definition,
+    in `database` if given, otherwise in the database of the app.
+
+    Drifted indexes are never dropped automatically, they are only logged
+    so an operator can decide what to do with them.
+
+    Returns a report as {collection: {"created": [...], "drift": [...]}}.
+    """
+    collections = _collections(database)
+    report = {}
+    for collection_name, models in required_indexes().items():
+        collection = collections[collection_name]
+        existing = collection.index_information()
+        created, drift = [], []
+        for model in models:
+            wanted = model.document
+            name = wanted["name"]
+            if name not in existing:
+                try:
+                    collection.create_indexes([model])
+                    created.append(name)
+                except OperationFailure as e:
+                    drift.append(f"{name}: could not be created ({e})")
+                continue
+            drift.extend(f"{name}: {diff}" for diff in _index_drift(existing[name], wanted))
+
+        for name in created:
+            logger.info("Created index %s on %s", name, collection_name)
+        for message in drift:
+            logger.warning("Index drift on %s: %s", collection_name, message)
+        report[collection_name] = {"created": created, "drift": drift}
+    return report
+
+
+def hot_queries() -> Dict[str, tuple]:
+    """
+    Returns the filters used by the hottest queries of the API,
+    as {description: (collection, filter)}.
+    """
+    return {
+        "check_auth_key": (keys_collection, {"key": "x" * 20}),
+        "update_medal": (
+            medal_collection,
+            {
+                "country_code": "US",
+                "sports": {"$elemMatch": {"sport_id": 1, "type_id": 1}},
+            },
+        ),
+        "lookup_sport_detail": (sport_detail_collection, {"sport_id": 1}),
+        "lookup_sub_sport": (sub_sport_collection, {"sport_id": 1, "type_id": 1}),
+    }
+
+
+def _winning_stages(plan: Dict) -> List[str]:
+    """
+    Flattens the winning plan of an `explain()` output into the list of its
+    stages, from the root stage down to the leaf.
+    """
+    stages = []
+    while plan:
+        stages.append(plan.get("stage", "?"))
+        plan = plan.get("inputStage")
+    return stages
+
+
+def explain_hot_queries() -> Dict[str, List[str]]:
+    """
+    Runs `explain()` on every hot query and logs its winning plan.
+
+    A plan that falls back to a collection scan is logged as a warning
+    so regressions on the indexes are visible in the logs.
+    """
+    plans = {}
+    for description, (collection, query) in hot_queries().items():
+        cursor = collection.find(query).limit(1)
+        explain = getattr(cursor, "explain", None)
+        if explain is None:  # mongomock does not implement explain
+            continue
+        winning_plan = explain().get("queryPlanner", {}).get("winningPlan", {})
+        # the slot based engine nests the classic plan under `queryPlan`
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        stages = _winning_stages(winning_plan)
+        plans[description] = stages
+        if "COLLSCAN" in stages:
+            logger.warning("Query plan of %s uses a collection scan: %s", description, stages)
+        else:
+            logger.info("Query plan of %s: %s", description, stages)
+    return plans
@@ -0,0 +1,410 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional
+from decouple import config
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+from starlette.concurrency import run_in_threadpool
+from .broadcaster import medal_broadcaster
+from .data_versions import data_versions, AUDIENCE, MEDALS, REFERENCE
+from .database_connection import async_sota_database, async_versions_collection, testing
+from .key_cache import key_cache
+from .medal_layout import fact_cells
+from .projections import medal_projections
+from .reference_data import reference_data
+from .standings import MEDAL_TYPES, medal_standings
+
+logger = logging.getLogger(__name__)
+
+CHANGE_STREAM = "change_stream"
+POLLING = "polling"
+LOCAL = "local"
+OFF = "off"
+
+MEDAL = "MEDAL_COLLECTION"
+AUDIENT = "AUDIENT_COLLECTION"
+SPORT_DETAIL = "SPORT_DETAIL_COLLECTION"
+SUB_SPORT = "SUB_SPORT_COLLECTION"
+KEYS = "KEYS_COLLECTION"
+MEDAL_FACT = "MEDAL_FACT_COLLECTION"
+WATCHED = (MEDAL, AUDIENT, SPORT_DETAIL, SUB_SPORT, KEYS, MEDAL_FACT)
+REFERENCE_SETTINGS = (SPORT_DETAIL, SUB_SPORT)
+# names of the collections whose setting is optional
+DEFAULT_NAMES = {MEDAL_FACT: "MedalFact"}
+
+
+def collection_name(setting: str) -> str:
+    return config(setting, default=DEFAULT_NAMES.get(setting, ""))
+
+# id of the document of the versions, bumped by the writes
+VERSIONS_ID = "invalidation"
+# the data of the ETags changed by the writes of every collection
+DATA = {MEDAL: MEDALS, MEDAL_FACT: MEDALS, AUDIENT: AUDIENCE, SPORT_DETAIL: REFERENCE, SUB_SPORT: REFERENCE}
+# raised when the deployment is not a replica set, nor a sharded cluster
+CHANGE_STREAMS_NOT_SUPPORTED = 40573
+
+
+def medal_cells(change: Dict) -> Optional[List[Dict]]:
+    """
+    Returns the medals of the cells written by a change of the Medal collection,
+    as the events of the medal stream, or None if they are not known.
+
+    The cells of an update are the sub-sports at the updated indexes of `sports`,
+    read from the document looked up after the change.
+    """
+    document = change.get("fullDocument")
+    if document is None or change["operationType"] not in ("insert", "update", "replace"):
+        return None
+    sports = document.get("sports", [])
+    if change["operationType"] == "update":
+        description = change.get("updateDescription", {})
+        if description.get("removedFields") or description.get("truncatedArrays"):
+            return None
+        indexes = set()
+        for path in description.get("updatedFields", {}):
+            parts = path.split(".")
+            if parts[0] != "sports":
+                continue
+            if len(parts) == 1:
+                indexes = set(range(len(sports)))
+                break
+            indexes.add(int(parts[1]))
+        sports = [sports[index] for index in sorted(indexes) if index < len(sports)]
+    return [
+        {
+            "country": document["country_code"],
+            "sport_id": sport["sport_id"],
+            "type_id": sport["type_id"],
+            **{medal: sport[medal] for medal in MEDAL_TYPES},
+        }
+        for sport in sports
+    ]
+
+
+def share_versions(document: Dict) -> None:
+    """
+    Gives the ETags the versions of the document bumped by the writes,
+    which are the same in every process.
+    """
+    versions: Dict[str, int] = {}
+    for setting, name in DATA.items():
+        versions[name] = versions.get(name, 0) + document.get(collection_name(setting), 0)
+    data_versions.share(versions)
+
+
+def apply_medal_change(change: Dict) -> bool:
+    return apply_cells(medal_cells(change))
+
+
+def apply_fact_change(change: Dict) -> bool:
+    return apply_cells(fact_cells(change))
+
+
+def apply_cells(cells: Optional[List[Dict]]) -> bool:
+    """
+    Applies the medals of the written cells to the read models, or drops
+    them when the cells are not known. Returns whether they were dropped.
+    """
+    if cells is None:
+        medal_standings.invalidate()
+        medal_projections.invalidate()
+        medal_broadcaster.forget()
+        data_versions.bump(MEDALS)
+        return True
+
+    # the changes of this process come back from the change stream, they are
+    # already applied, so are the changes read by several lookups, and the
+    # changes written to the shared snapshot by another worker
+    changed = [
+        cell
+        for cell in cells
+        if medal_standings.cell(cell["country"], cell["sport_id"], cell["type_id"])
+        != {medal: cell[medal] for medal in MEDAL_TYPES}
+    ]
+    if changed:
+        sub_sports: Dict = {}
+        for cell in changed:
+            medal = {name: cell[name] for name in MEDAL_TYPES}
+            medal_standings.apply(cell["country"], cell["sport_id"], cell["type_id"], medal)
+            sub_sports.setdefault((cell["sport_id"], cell["type_id"]), {})[cell["country"]] = medal
+        for (sport_id, type_id), medals in sub_sports.items():
+            medal_projections.apply(sport_id, type_id, medals)
+        data_versions.bump(MEDALS)
+    medal_broadcaster.publish_new(cells)
+    return False
+
+
+def apply_audience_change(change: Dict) -> None:
+    data_versions.bump(AUDIENCE)
+
+
+def apply_reference_change(change: Dict) -> None:
+    # its version is bumped, and the names of the projections refreshed, once
+    # the data loaded again differs
+    reference_data.invalidate()
+
+
+def apply_keys_change(change: Dict) -> None:
+    # a deleted key is only known by its id, every key is dropped then
+    key = (change.get("fullDocument") or {}).get("key")
+    key_cache.invalidate(key)
+
+
+HANDLERS = {
+    MEDAL: apply_medal_change,
+    AUDIENT: apply_audience_change,
+    SPORT_DETAIL: apply_reference_change,
+    SUB_SPORT: apply_reference_change,
+    KEYS: apply_keys_change,
+    MEDAL_FACT: apply_fact_change,
+}
+
+
+class InvalidationBus:
+    """
+    Keeps the in-process caches of every worker in line with the writes of
+    the others, the medal read models, the reference data, the API keys and
+    the versions behind the ETags and the audience statistics.
+
+    The changes are read from a change stream on the database, in the
+    format of its events. The medal changes are applied cell by cell and
+    published on the medal stream, the others invalidate the caches of their
+    collection, or only the key they changed.
+
+    The change streams need a replica set. Without one, the bus falls back to
+    polling a version document, bumped by the writes through `notify`, which
+    only tells which collections changed. In the `local` mode used by the
+    tests nothing is watched, the changes are given to `emit` instead.
+
+    Unless local, the versions of that document are watched or polled as
+    well, and shared with the ETags of every process. The reference data
+    changed by a write is loaded again before the versions which follow it
+    are shared, so an ETag never stands for data not loaded yet. A medal
+    change whose cells are not known, such as a deletion, bumps the versions
+    of the medals, which the writer didn't.
+    """
+
+    def __init__(
+        self,
+        mode: str = config("INVALIDATION_BUS", default=LOCAL if testing else CHANGE_STREAM),
+        poll_interval: float = config("INVALIDATION_POLL_INTERVAL", default=1.0, cast=float),
+        retry_delay: float = config("INVALIDATION_RETRY_DELAY", default=1.0, cast=float),
+        database=async_sota_database,
+        versions=async_versions_collection,
+    ):
+        self.mode = mode
+        self._poll_interval = poll_interval
+        self._retry_delay = retry_delay
+        self._database = database
+        self._versions = versions
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._changes: Dict[str, int] = {}
+        self._reference_changed = False
+        self._medals_dropped = False
+
+    def _versions_name(self) -> str:
+        return config("VERSIONS_COLLECTION", default="Versions")
+
+    def _collections(self) -> Dict[str, str]:
+        return {collection_name(setting): setting for setting in WATCHED}
+
+    def handle(self, change: Dict) -> None:
+        """
+        Applies a change of a watched collection to the caches of this process.
+        A change of no collection (a dropped database) invalidates them all.
+        """
+        name = change.get("ns", {}).get("coll")
+        if name == self._versions_name():
+            if change.get("documentKey", {}).get("_id") == VERSIONS_ID and change.get("fullDocument"):
+                share_versions(change["fullDocument"])
+            return
+        setting = self._collections().get(name)
+        if setting is None:
+            if change["operationType"] in ("dropDatabase", "invalidate"):
+                self.invalidate_all()
+            return
+        with self._lock:
+            self._changes[setting] = self._changes.get(setting, 0) + 1
+        if setting in REFERENCE_SETTINGS:
+            self._reference_changed = True
+        dropped = HANDLERS[setting](change)
+        # a polled change was found by its version, which was bumped already
+        if dropped and self.mode == CHANGE_STREAM:
+            self._medals_dropped = True
+
+    async def reload_reference(self) -> None:
+        """
+        Loads the reference data again off the event loop, if a handled change
+        made it stale.
+        """
+        if not self._reference_changed:
+            return
+        self._reference_changed = False
+        try:
+            await run_in_threadpool(reference_data.reload)
+        except PyMongoError:
+            self._reference_changed = True
+            raise
+
+    async def _share_dropped_medals(self) -> None:
+        if not self._medals_dropped:
+            return
+        self._medals_dropped = False
+        # every process bumps them, the ETags only need to change
+        await self.notify(MEDAL)
+
+    def invalidate_all(self) -> None:
+        """
+        Invalidates every cache, when some changes may have been missed.
+        """
+        for name in self._collections():
+            self.handle({"operationType": "invalidate", "ns": {"coll": name}})
+
+    def emit(self, change: Dict) -> None:
+        """
+        Stands in for the change stream in the local mode.
+        """
+        self.handle(change)
+
+    async def notify(self, *settings: str) -> None:
+        """
+        Tells the other processes that the collections of the given settings
+        were written, by bumping their versions. The changes of the collections
+        are also seen by a change stream, the versions are shared by the ETags.
+        """
+        if self.mode not in (CHANGE_STREAM, POLLING):
+            return
+        names = [collection_name(setting) for setting in settings]
+        document = await self._versions.find_one_and_update(
+            {"_id": VERSIONS_ID},
+            {"$inc": {name: 1 for name in names}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        for name in names:
+            # this process applied its own write, unless another one came first
+            if self._seen.get(name) == document[name] - 1:
+                self._seen[name] = document[name]
+        share_versions(document)
+
+    def _pipeline(self) -> List[Dict]:
+        names = [*self._collections(), self._versions_name()]
+        with_documents = [
+            collection_name(MEDAL),
+            collection_name(KEYS),
+            collection_name(MEDAL_FACT),
+            self._versions_name(),
+        ]
+        return [
+            {
+                "$match": {
+                    "$or": [
+                        {"ns.coll": {"$in": names}},
+                        {"operationType": {"$in": ["dropDatabase", "invalidate"]}},
+                    ]
+                }
+            },
+            # only the changes of the medals, in either layout, the keys and the
+            # versions are read from the documents
+            {
+                "$set": {
+                    "fullDocument": {
+                        "$cond": [
+                            {"$in": ["$ns.coll", with_documents]},
+                            "$fullDocument",
+                            "$$REMOVE",
+                        ]
+                    }
+                }
+            },
+        ]
+
+    async def _watch(self) -> None:
+        missed = False
+        while True:
+            try:
+                async with await self._database.watch(
+                    self._pipeline(),
+                    full_document="updateLookup",
+                    resume_after=self._resume_token,
+                ) as stream:
+                    if missed:
+                        self.invalidate_all()
+                        missed = False
+                    # including a reload which failed before the stream was resumed
+                    await self.reload_reference()
+                    await self._share_dropped_medals()
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self.handle(change)
+                        await self.reload_reference()
+                        await self._share_dropped_medals()
+                        if change["operationType"] == "invalidate":
+                            self._resume_token = None
+            except OperationFailure as error:
+                if error.code == CHANGE_STREAMS_NOT_SUPPORTED:
+                    logger.warning("Change streams are not supported, polling the versions")
+                    self.mode = POLLING
+                    return await self._poll()
+                logger.warning("Change stream failed, watching again: %s", error)
+                # the resume token may be too old to resume from
+                self._resume_token = None
+                missed = True
+            except PyMongoError as error:
+                logger.warning("Change stream interrupted, resuming: %s", error)
+                missed = self._resume_token is None
+            await asyncio.sleep(self._retry_delay)
+
+    async def poll(self) -> None:
+        """
+        Invalidates the caches of the collections whose version changed since the last poll.
+        """
+        document = await self._versions.find_one({"_id": VERSIONS_ID}) or {}
+        for name in self._collections():
+            version = document.get(name, 0)
+            seen = self._seen.setdefault(name, version)
+            if version != seen:
+                self._seen[name] = version
+                self.handle({"operationType": "invalidate", "ns": {"coll": name}})
+        # once the caches are dropped and the reference data loaded again
+        await self.reload_reference()
+        share_versions(document)
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except PyMongoError as error:
+                logger.warning("Polling the versions failed: %s", error)
+            await asyncio.sleep(self._poll_interval)
+
+    async def start(self) -> None:
+        if self.mode in (CHANGE_STREAM, POLLING):
+            try:
+                share_versions(await self._versions.find_one({"_id": VERSIONS_ID}) or {})
+            except PyMongoError as error:
+                logger.warning("Reading the versions failed: %s", error)
+        if self.mode == CHANGE_STREAM:
+            self._task = asyncio.create_task(self._watch())
+        elif self.mode == POLLING:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"mode": self.mode, "changes": dict(self._changes)}
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from decouple import config
+
+
+class KeyCache:
+    """
+    In-process LRU cache of the authentication keys read from the Keys collection.
+
+    Known keys are kept for `KEY_CACHE_TTL` seconds and unknown keys for
+    `KEY_CACHE_NEGATIVE_TTL` seconds, so repeated bad keys don't reach the
+    database either. At most `KEY_CACHE_SIZE` keys are kept, the least
+    recently used one is evicted first.
+
+    A key written to the database must be dropped with `invalidate`,
+    otherwise a cached miss hides it until its negative TTL expired.
+    """
+
+    def __init__(
+        self,
+        max_size: int = config("KEY_CACHE_SIZE", default=1024, cast=int),
+        ttl: float = config("KEY_CACHE_TTL", default=60, cast=float),
+        negative_ttl: float = config("KEY_CACHE_NEGATIVE_TTL", default=5, cast=float),
+    ):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        # key -> (expires_at, key document or None for an unknown key)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        """
+        Looks a key up, returns (found, key document).
+
+        `found` is False when the key has to be read from the database,
+        the document is None when the key is cached as unknown.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, entry[1]
+
+    def put(self, key: str, document: Optional[Dict]) -> None:
+        """
+        Caches the document of a key, or None for an unknown key.
+        """
+        ttl = self._ttl if document is not None else self._negative_ttl
+        if self._max_size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, document)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Drops a key from the cache, or every key when none is given.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        """
+        Returns the size of the cache and its hit and miss counters.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
+
+
+key_cache = KeyCache()
@@ -0,0 +1,455 @@
+"""
+Loads BSON, JSON or CSV files into the collections of the database, in place of
+copying `dump_data` and running mongorestore.
+
+The files are read as a stream, in chunks of `--chunk-size` documents. Every
+chunk is validated with the rules of the routes writing the collection, then
+inserted by an unordered `insert_many`, `--workers` chunks at a time. The
+reference collections are loaded first, the medals and the audience are
+validated against them, read back from the primary. The indexes are created
+once the data is loaded. A document failing its insert for another reason
+than a duplicate key is counted as failed, with the first errors.
+
+- BSON: a dump of mongodump, as in `dump_data/Sota`,
+- JSON: a document per line, as written by mongoexport, in extended JSON,
+- CSV: a document per row with a header, a list is a JSON array or values
+  separated by `;`, a nested document is written as JSON.
+
+A file loads into the collection of its name, `Audient.bson` into Audient,
+unless `--collection` is given. A directory loads all of its files.
+
+Usage: python -m sota.load dump_data/Sota [--collection Audient] [--chunk-size 10000]
+       [--workers 4] [--drop] [--no-validate] [--no-indexes]
+"""
+import argparse
+import csv
+import functools
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from bson import decode_file_iter
+from bson.json_util import loads as json_util_loads
+from decouple import config
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from pymongo.errors import BulkWriteError
+from pymongo.read_preferences import Primary
+from .countries import country_name, unknown_countries
+from .database_connection import sota_database
+from .indexes import ensure_indexes
+from .invalidation import VERSIONS_ID
+from .reference_data import ReferenceData, reference_data
+from .routers.audient_router import RequestAudientData
+from .routers.medals_router import RequestMedal
+
+# the reference collections first, the others are validated against them
+SETTINGS = (
+    "SPORT_DETAIL_COLLECTION",
+    "SUB_SPORT_COLLECTION",
+    "KEYS_COLLECTION",
+    "MEDAL_COLLECTION",
+    "AUDIENT_COLLECTION",
+)
+REFERENCE_SETTINGS = ("SPORT_DETAIL_COLLECTION", "SUB_SPORT_COLLECTION")
+# validated against the reference data
+REFERENCING_SETTINGS = ("MEDAL_COLLECTION", "AUDIENT_COLLECTION")
+DUPLICATE_KEY = 11000
+# fields of the CSV files holding a list
+LIST_FIELDS = frozenset({"sport_id", "participating_countries", "sports"})
+KEY_LENGTH = 20
+
+Document = Dict
+Rejected = Tuple[Document, str]
+
+
+# readers
+
+
+def read_bson(path: str) -> Iterator[Document]:
+    with open(path, "rb") as file:
+        yield from decode_file_iter(file)
+
+
+def read_json(path: str) -> Iterator[Document]:
+    """
+    Reads a document per line. A file holding a single array is read at once.
+    """
+    with open(path) as file:
+        first = file.read(1)
+        while first.isspace():
+            first = file.read(1)
+        if first == "[":
+            yield from json_util_loads(first + file.read())
+            return
+        line = first + file.readline()
+        while line:
+            if line.strip():
+                yield json_util_loads(line)
+            line = file.readline()
+
+
+def csv_value(field: str, value: str):
+    if value[:1] in ("[", "{"):
+        return json.loads(value)
+    if field in LIST_FIELDS:
+        return value.split(";") if value else []
+    return value
+
+
+def read_csv(path: str) -> Iterator[Document]:
+    """
+    Reads a document per row, the values are strings converted by the validation.
+    """
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            yield {field: csv_value(field, value) for field, value in row.items() if value != ""}
+
+
+READERS: Dict[str, Callable[[str], Iterator[Document]]] = {
+    ".bson": read_bson,
+    ".json": read_json,
+    ".ndjson": read_json,
+    ".csv": read_csv,
+}
+
+
+# validators, with the rules of the routes writing the collections
+
+
+class SportDetailDocument(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    sport_id: int = Field(gt=0)
+    sport_name: str
+    sport_summary: str = ""
+    participating_countries: List[str]
+
+
+class SubSportDocument(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    sport_id: int = Field(gt=0)
+    type_id: int = Field(gt=0)
+    type_name: str
+    participating_countries: List[str]
+
+
+class MedalCell(RequestMedal):
+    sport_id: int = Field(gt=0)
+    type_id: int = Field(gt=0)
+
+
+class MedalDocument(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    country_code: str
+    country_name: Optional[str] = None
+    sports: List[MedalCell] = []
+
+
+class KeyDocument(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    key: str = Field(min_length=KEY_LENGTH, max_length=KEY_LENGTH)
+    scope: Dict[str, bool]
+
+
+def _models(model, chunk: List[Document]) -> Tuple[List[Tuple[Document, BaseModel]], List[Rejected]]:
+    valid, rejected = [], []
+    for document in chunk:
+        try:
+            valid.append((document, model.model_validate(document)))
+        except ValidationError as e:
+            rejected.append((document, str(e).replace("\n", " ")))
+    return valid, rejected
+
+
+def _with_id(document: Document, fields: Dict) -> Document:
+    return {"_id": document["_id"], **fields} if "_id" in document else fields
+
+
+def validate_reference(model):
+    """
+    Checks the fields of the sports or sub-sports, their countries are not
+    checked: they are the reference the other collections are checked against.
+    """
+
+    def validate(chunk: List[Document]) -> Tuple[List[Document], List[Rejected]]:
+        valid, rejected = _models(model, chunk)
+        return [_with_id(document, item.model_dump()) for document, item in valid], rejected
+
+    return validate
+
+
+def validate_keys(chunk: List[Document]) -> Tuple[List[Document], List[Rejected]]:
+    valid, rejected = _models(KeyDocument, chunk)
+    return [_with_id(document, item.model_dump()) for document, item in valid], rejected
+
+
+def validate_medals(
+    chunk: List[Document], reference: ReferenceData = reference_data
+) -> Tuple[List[Document], List[Rejected]]:
+    """
+    Checks the countries and sub-sports as `update_medal` does, a country must
+    exist and participate in the sub-sports of its medals.
+    """
+    valid, rejected = _models(MedalDocument, chunk)
+    unknown = unknown_countries(item.country_code for _, item in valid)
+    documents = []
+    for document, item in valid:
+        error = None
+        if item.country_code in unknown:
+            error = f"Country {item.country_code} doesn't exist"
+        for cell in item.sports:
+            if error is not None:
+                break
+            if not reference.sub_sport(cell.sport_id, cell.type_id):
+                error = f"The sport_id {cell.sport_id} and type_id {cell.type_id} don't exist"
+            elif item.country_code not in reference.participating_countries(
+                cell.sport_id, cell.type_id
+            ):
+                error = (
+                    f"Country {item.country_code} is not participating in the given "
+                    f"sport_id {cell.sport_id} and type_id {cell.type_id}"
+                )
+        if error is not None:
+            rejected.append((document, error))
+            continue
+        fields = item.model_dump()
+        fields["country_name"] = item.country_name or country_name(item.country_code)
+        documents.append(_with_id(document, fields))
+    return documents, rejected
+
+
+def validate_audience(
+    chunk: List[Document], reference: ReferenceData = reference_data
+) -> Tuple[List[Document], List[Rejected]]:
+    """
+    Checks the audience as `update_audient_info` does, and keys it by its id as it does.
+    """
+    for document in chunk:
+        if "id" not in document and "_id" in document:
+            document["id"] = str(document["_id"])
+    valid, rejected = _models(RequestAudientData, chunk)
+    unknown = unknown_countries(item.country_code for _, item in valid)
+    missing = reference.missing_sport_ids(
+        sport_id for _, item in valid for sport_id in item.sport_id
+    )
+    documents = []
+    for document, item in valid:
+        if item.country_code in unknown:
+            rejected.append((document, f"Country {item.country_code} doesn't exist"))
+        elif missing.intersection(item.sport_id):
+            sport_ids = ", ".join(map(str, sorted(missing.intersection(item.sport_id))))
+            rejected.append((document, f"The sport_id {sport_ids} doesn't exist"))
+        else:
+            documents.append({"_id": item.id, **item.model_dump()})
+    return documents, rejected
+
+
+VALIDATORS = {
+    "SPORT_DETAIL_COLLECTION": validate_reference(SportDetailDocument),
+    "SUB_SPORT_COLLECTION": validate_reference(SubSportDocument),
+    "KEYS_COLLECTION": validate_keys,
+    "MEDAL_COLLECTION": validate_medals,
+    "AUDIENT_COLLECTION": validate_audience,
+}
+
+
+# loading
+
+
+def chunks(documents: Iterable[Document], size: int) -> Iterator[List[Document]]:
+    iterator = iter(documents)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _insert(collection, documents: List[Document]) -> Tuple[int, int, List[str]]:
+    """
+    Inserts documents unordered, returns the number inserted, the number of
+    duplicates, and the errors of the documents which failed otherwise.
+    """
+    try:
+        return len(collection.insert_many(documents, ordered=False).inserted_ids), 0, []
+    except BulkWriteError as e:
+        duplicates = 0
+        errors = []
+        for error in e.details["writeErrors"]:
+            if error["code"] == DUPLICATE_KEY:
+                duplicates += 1
+            else:
+                errors.append(f"{documents[error['index']].get('_id', '')}: {error['errmsg']}")
+        return e.details["nInserted"], duplicates, errors
+
+
+def load_file(
+    path: str,
+    collection,
+    validate: Optional[Callable] = None,
+    chunk_size: int = 10_000,
+    workers: int = 4,
+    max_errors: int = 10,
+) -> Dict:
+    """
+    Loads a file into a collection, returns the counts of the documents read,
+    inserted, rejected by the validation, duplicated and failed to insert,
+    with the first errors.
+    """
+    reader = READERS[os.path.splitext(path)[1].lower()]
+    result = {"file": path, "collection": collection.name, "read": 0, "inserted": 0,
+              "rejected": 0, "duplicates": 0, "failed": 0, "errors": []}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+
+        def collect(done):
+            for future in done:
+                inserted, duplicates, errors = future.result()
+                result["inserted"] += inserted
+                result["duplicates"] += duplicates
+                result["failed"] += len(errors)
+                result["errors"].extend(errors[: max_errors - len(result["errors"])])
+
+        for chunk in chunks(reader(path), chunk_size):
+            result["read"] += len(chunk)
+            if validate is not None:
+                chunk, rejected = validate(chunk)
+                result["rejected"] += len(rejected)
+                for document, error in rejected[: max_errors - len(result["errors"])]:
+                    result["errors"].append(f"{document.get('_id', '')}: rejected, {error}")
+            if not chunk:
+                continue
+            # at most one chunk waiting per worker, the memory stays bounded
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(_insert, collection, chunk))
+        collect(wait(pending)[0])
+    result["seconds"] = time.perf_counter() - start
+    result["rows_per_second"] = result["read"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+
+def data_files(paths: Iterable[str]) -> List[str]:
+    """
+    Lists the data files of the paths, those of a directory included, without
+    the metadata of mongodump.
+    """
+    files = []
+    for path in paths:
+        names = sorted(os.listdir(path)) if os.path.isdir(path) else [None]
+        for name in names:
+            file = os.path.join(path, name) if name else path
+            extension = os.path.splitext(file)[1].lower()
+            if extension in READERS and not file.endswith(".metadata.json"):
+                files.append(file)
+    return files
+
+
+def collection_of(path: str) -> str:
+    return os.path.basename(path).split(".")[0]
+
+
+def primary_reference(database) -> ReferenceData:
+    """
+    Reads the reference data from the primary of `database`, where the sports
+    and sub-sports just loaded are, even if the secondaries are behind.
+    """
+    reference = ReferenceData(
+        *(
+            database.get_collection(config(setting), read_preference=Primary())
+            for setting in REFERENCE_SETTINGS
+        ),
+        ttl=float("inf"),
+    )
+    reference.reload()
+    return reference
+
+
+def load(
+    paths: Iterable[str],
+    database=sota_database,
+    collection: Optional[str] = None,
+    chunk_size: int = 10_000,
+    workers: int = 4,
+    drop: bool = False,
+    validate: bool = True,
+    build_indexes: bool = True,
+) -> List[Dict]:
+    """
+    Loads the files of the paths, the reference collections first, then
+    bumps the versions of the loaded collections, so the running servers
+    issue new ETags, and creates the indexes. Returns the result of every file.
+    """
+    settings = {config(setting, default=""): setting for setting in SETTINGS}
+    order = {name: index for index, name in enumerate(settings)}
+    files = sorted(
+        data_files(paths),
+        key=lambda file: order.get(collection or collection_of(file), len(order)),
+    )
+    results = []
+    dropped = set()
+    reference = None
+    for file in files:
+        name = collection or collection_of(file)
+        setting = settings.get(name)
+        validator = VALIDATORS.get(setting) if validate else None
+        if validator is not None and setting in REFERENCING_SETTINGS:
+            if reference is None:
+                # the files are validated against the reference data loaded before them
+                reference = primary_reference(database)
+            validator = functools.partial(validator, reference=reference)
+        if drop and name not in dropped:
+            database.drop_collection(name)
+            dropped.add(name)
+        results.append(load_file(file, database[name], validator, chunk_size, workers))
+    loaded = {result["collection"] for result in results if result["inserted"]}
+    if loaded:
+        database[config("VERSIONS_COLLECTION", default="Versions")].update_one(
+            {"_id": VERSIONS_ID}, {"$inc": {name: 1 for name in loaded}}, upsert=True
+        )
+    if build_indexes:
+        ensure_indexes(database)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="+", help="files or directories to load")
+    parser.add_argument("--collection", help="collection to load every file into")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="documents per insert")
+    parser.add_argument("--workers", type=int, default=4, help="inserts running at once")
+    parser.add_argument("--drop", action="store_true", help="drop the collections first")
+    parser.add_argument("--no-validate", action="store_true", help="insert the documents as read")
+    parser.add_argument("--no-indexes", action="store_true", help="do not create the indexes")
+    args = parser.parse_args()
+
+    results = load(
+        args.paths,
+        collection=args.collection,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        drop=args.drop,
+        validate=not args.no_validate,
+        build_indexes=not args.no_indexes,
+    )
+    print(f"{'file':<40}{'collection':<16}{'read':>10}{'inserted':>10}{'rejected':>10}"
+          f"{'duplicates':>11}{'failed':>8}{'seconds':>9}{'rows/s':>10}")
+    for result in results:
+        print(
+            f"{result['file']:<40}{result['collection']:<16}{result['read']:>10}"
+            f"{result['inserted']:>10}{result['rejected']:>10}{result['duplicates']:>11}"
+            f"{result['failed']:>8}{result['seconds']:>9.1f}{result['rows_per_second']:>10.0f}"
+        )
+        for error in result["errors"]:
+            print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
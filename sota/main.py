@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
@@ -9,19 +10,72 @@ from .routers import (
     medal_router,
     audient_router,
     apikeygen_router,
+    admin_router,
+    stream_router,
+    metrics_router,
 )
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from decouple import config, Csv
+from .indexes import ensure_indexes, explain_hot_queries
+from .metrics import MetricsMiddleware
+from .responses import FastJSONResponse
+from .standings import medal_standings
+from .medal_snapshot import medal_snapshot
+from .data_versions import data_versions, MEDALS
+from .projections import medal_projections
+from .reference_data import reference_data
+from .database_connection import client, async_client, close_database_clients
+from .countries import country_codes
+from .invalidation import invalidation_bus
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepares the database and read models before serving requests:
+    creates the database clients, creates missing indexes, reports index drift,
+    logs the plans of hot queries, loads the country registry, the reference data,
+    the medal standings and projections, in memory or in the snapshot shared
+    by the workers, then starts following
+    the writes of the other processes.
+    Stops following them, releases the snapshot and closes the database
+    clients on shutdown.
+
+    Nothing of it is done at import, so importing the app stays cheap.
+    """
+    client.resolve()
+    async_client.resolve()
+    if config("ENSURE_INDEXES", default=True, cast=bool):
+        ensure_indexes()
+    if config("EXPLAIN_HOT_QUERIES", default=True, cast=bool):
+        explain_hot_queries()
+    country_codes()
+    reference_data.reload()
+    if medal_snapshot.enabled:
+        medal_snapshot.open()
+        data_versions.track(MEDALS, medal_snapshot.sequence)
+    medal_standings.load()
+    medal_projections.load()
+    await invalidation_bus.start()
+    yield
+    await invalidation_bus.stop()
+    medal_snapshot.release()
+    await close_database_clients()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=config("ALLOWED_ORIGINS", cast=Csv()),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # the page cursor and the validators of the read routes
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# outermost, so the time spent in the other middlewares is measured too
+app.add_middleware(MetricsMiddleware)
 
 auth_origins = config("ALLOWED_AUTH_ORIGINS", cast=Csv())
 authentication = FastAPI()
@@ -40,7 +94,10 @@ app.include_router(sports_router.router)
 app.include_router(sport_router.router)
 app.include_router(medals_router.router)
 app.include_router(medal_router.router)
+app.include_router(stream_router.router)
 app.include_router(audient_router.router)
+app.include_router(admin_router.router)
+app.include_router(metrics_router.router)
 
 # to be separated into another CORS configuration
 authentication.include_router(apikeygen_router.router)
@@ -0,0 +1,155 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from decouple import config
+from pymongo import UpdateOne
+from .countries import country_name
+from .database_connection import medal_counter_collection, medal_fact_collection
+
+MEDAL_TYPES = ("gold", "silver", "bronze")
+
+# every country keeps the `sports` array of its medals in one Medal document
+EMBEDDED = "embedded"
+# written to both layouts, read from the embedded one, while migrating
+DUAL = "dual"
+# a MedalFact document per (country, sport, type) and MedalCounter totals
+FLAT = "flat"
+LAYOUTS = (EMBEDDED, DUAL, FLAT)
+
+MEDAL_LAYOUT = config("MEDAL_LAYOUT", default=EMBEDDED)
+if MEDAL_LAYOUT not in LAYOUTS:
+    raise ValueError(f"MEDAL_LAYOUT must be one of {', '.join(LAYOUTS)}, not {MEDAL_LAYOUT}")
+
+
+def reads_flat() -> bool:
+    """
+    Whether the read models load the medals from the flat layout.
+    """
+    return MEDAL_LAYOUT == FLAT
+
+
+def writes_embedded() -> bool:
+    return MEDAL_LAYOUT in (EMBEDDED, DUAL)
+
+
+def writes_flat() -> bool:
+    return MEDAL_LAYOUT in (DUAL, FLAT)
+
+
+def fact_id(country_code: str, sport_id: int, type_id: int) -> str:
+    """
+    Returns the _id of the fact of a cell, its uniqueness keeps a cell from being
+    inserted twice without relying on an index.
+    """
+    return f"{country_code}:{sport_id}:{type_id}"
+
+
+def fact(country_code: str, sport_id: int, type_id: int, medal: Dict[str, int]) -> Dict:
+    return {
+        "_id": fact_id(country_code, sport_id, type_id),
+        "country_code": country_code,
+        "sport_id": sport_id,
+        "type_id": type_id,
+        **{name: medal[name] for name in MEDAL_TYPES},
+    }
+
+
+def country_counter_id(country_code: str) -> str:
+    return f"country:{country_code}"
+
+
+def sport_counter_id(sport_id: int) -> str:
+    return f"sport:{sport_id}"
+
+
+def counter_increments(
+    deltas: Dict[Tuple[str, int, int], Tuple[int, int, int]]
+) -> Dict[str, Dict]:
+    """
+    Sums the changes of the counts of some cells into the increments of the
+    counters of their countries and sports, as {_id: {"key": .., "$inc": ..}}.
+    """
+    increments: Dict[str, Dict] = {}
+    for (country_code, sport_id, _), delta in deltas.items():
+        for counter_id, key in (
+            (country_counter_id(country_code), {"country_code": country_code}),
+            (sport_counter_id(sport_id), {"sport_id": sport_id}),
+        ):
+            counter = increments.setdefault(
+                counter_id, {"key": key, "$inc": dict.fromkeys(MEDAL_TYPES, 0)}
+            )
+            for name, count in zip(MEDAL_TYPES, delta):
+                counter["$inc"][name] += count
+    return increments
+
+
+def counter_updates(
+    deltas: Dict[Tuple[str, int, int], Tuple[int, int, int]],
+    names: Callable[[str], str] = country_name,
+) -> List[UpdateOne]:
+    """
+    Returns the updates incrementing the counters by the changes of some cells,
+    creating the missing counters, `names` giving the name of a new country.
+    """
+    updates = []
+    for counter_id, counter in counter_increments(deltas).items():
+        insert = dict(counter["key"])
+        if "country_code" in insert:
+            insert["country_name"] = names(insert["country_code"])
+        updates.append(
+            UpdateOne(
+                {"_id": counter_id},
+                {"$inc": counter["$inc"], "$setOnInsert": insert},
+                upsert=True,
+            )
+        )
+    return updates
+
+
+def load_facts(
+    facts=medal_fact_collection, counters=medal_counter_collection
+) -> Tuple[Dict, Dict[str, str]]:
+    """
+    Reads the counts of every cell and the names of the countries from the flat layout.
+    """
+    cells = {}
+    for document in facts.find({}, {"_id": 0}):
+        cells[(document["country_code"], document["sport_id"], document["type_id"])] = tuple(
+            document[name] for name in MEDAL_TYPES
+        )
+    names = {
+        document["country_code"]: document["country_name"]
+        for document in counters.find(
+            {"country_code": {"$exists": True}}, {"_id": 0, "country_code": 1, "country_name": 1}
+        )
+    }
+    for country_code, _, _ in cells:
+        if country_code not in names:
+            names[country_code] = country_name(country_code)
+    return cells, names
+
+
+def country_totals(counters=medal_counter_collection) -> Dict[str, Dict[str, int]]:
+    """
+    Returns the totals of every country kept by the counters, without aggregating the facts.
+    """
+    return {
+        document["country_code"]: {name: document[name] for name in MEDAL_TYPES}
+        for document in counters.find({"country_code": {"$exists": True}}, {"_id": 0})
+    }
+
+
+def fact_cells(change: Dict) -> Optional[List[Dict]]:
+    """
+    Returns the medals of the cell written by a change of the MedalFact collection,
+    as the events of the medal stream, or None if they are not known.
+    """
+    document = change.get("fullDocument")
+    if document is None or change["operationType"] not in ("insert", "update", "replace"):
+        return None
+    return [
+        {
+            "country": document["country_code"],
+            "sport_id": document["sport_id"],
+            "type_id": document["type_id"],
+            **{name: document[name] for name in MEDAL_TYPES},
+        }
+    ]
@@ -0,0 +1,459 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+from decouple import config
+
+Cell = Tuple[str, int, int]
+Counts = Tuple[int, int, int]
+
+MAGIC = b"SOTAMDL1"
+# magic, sequence, generation, ready, countries, sub-sports, max countries, max sub-sports, boot
+HEADER = struct.Struct("<8sQIIIIIIQ")
+HEADER_SIZE = 64
+SEQUENCE_OFFSET = 8
+COUNTRY = struct.Struct("<2s62s")
+SUB_SPORT = struct.Struct("<II")
+COUNTS = struct.Struct("<III")
+# gold count of a cell without medals, the counters start filled with it
+ABSENT = 0xFFFFFFFF
+# reads of an odd sequence before checking that its writer is still alive
+READ_RETRIES = 1000
+
+
+def boot_token() -> str:
+    """
+    Identifies the start of the server of this process: its process group,
+    which uvicorn shares with its workers, and the start time of the leader
+    of the group, so a restarted server doesn't find the snapshot of the
+    previous one even if it got the same process ids.
+    """
+    group = os.getpgrp()
+    try:
+        with open(f"/proc/{group}/stat") as file:
+            started = file.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        started = "0"
+    return f"{group}-{started}"
+
+
+def default_path(token: str) -> str:
+    """
+    A file in shared memory per database and server start.
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    database = config("DATABASE", default="")
+    return os.path.join(directory, f"sota-medals-{database}-{token}")
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+
+class SnapshotFull(Exception):
+    """
+    Raised when the countries or sub-sports outgrow the capacity of the snapshot.
+    """
+
+
+class MedalSnapshot:
+    """
+    Medal counts of every (country, sub-sport) cell, in a file mapped in memory
+    by every worker process, so the medal data is held and built once per server.
+
+    The layout is fixed by the capacities: a header, the table of the countries
+    (code and name), the table of the sub-sports (sport and type ids), the
+    totals of every country and the matrix of the counts, a row per country
+    and a column per sub-sport. The tables are only appended to, until the
+    whole snapshot is published again, which bumps the generation.
+
+    A writer takes an exclusive lock on the file, so there is one writer at a
+    time across the processes. Readers take no lock, they read the sequence
+    word before and after reading, and read again if it changed or is odd:
+    a writer makes it odd while it writes. The counts are read in place from
+    the mapping, only the values a request needs are unpacked.
+
+    A writer killed in the middle of a write leaves the sequence odd, and its
+    lock released: the next process taking the lock makes the sequence even
+    again and marks the snapshot as not published, so it is loaded again.
+
+    The header keeps the boot token of the server which created the file, a
+    file of another server start is emptied when it is opened. Every process
+    mapping the file holds a shared lock on its first byte, the last one to
+    `release` it removes the file.
+    """
+
+    def __init__(
+        self,
+        path: str = config("MEDAL_SNAPSHOT_PATH", default=""),
+        max_countries: int = config("MEDAL_SNAPSHOT_MAX_COUNTRIES", default=256, cast=int),
+        max_sub_sports: int = config("MEDAL_SNAPSHOT_MAX_SUB_SPORTS", default=1024, cast=int),
+        enabled: bool = config("MEDAL_SNAPSHOT", default=False, cast=bool),
+        token: str = "",
+    ):
+        token = token or boot_token()
+        self.path = path or default_path(token)
+        self._token = _token_hash(token)
+        self.max_countries = max_countries
+        self.max_sub_sports = max_sub_sports
+        self.enabled = enabled
+        self._countries_offset = HEADER_SIZE
+        self._sub_sports_offset = self._countries_offset + COUNTRY.size * max_countries
+        self._totals_offset = self._sub_sports_offset + SUB_SPORT.size * max_sub_sports
+        self._matrix_offset = self._totals_offset + COUNTS.size * max_countries
+        self.size = self._matrix_offset + COUNTS.size * max_countries * max_sub_sports
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        # (generation, countries, sub-sports) and the row of every country and
+        # the column of every sub-sport, replaced as a whole
+        self._indexes: Tuple = (None, {}, {})
+
+    # mapping
+
+    def _linked(self, fd: int) -> bool:
+        """
+        Whether the path still names the open file, the last process of a
+        server may have removed it in between.
+        """
+        try:
+            path = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        file = os.fstat(fd)
+        return (path.st_dev, path.st_ino) == (file.st_dev, file.st_ino)
+
+    def open(self) -> None:
+        """
+        Maps the file, creating it with an empty snapshot if it doesn't match
+        the capacities or the server start.
+        """
+        if self._map is not None:
+            return
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if self._linked(fd):
+                break
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        try:
+            header = os.pread(fd, HEADER.size, 0)
+            if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC or (
+                HEADER.unpack(header)[6:] != (self.max_countries, self.max_sub_sports, self._token)
+            ) or os.fstat(fd).st_size != self.size:
+                os.ftruncate(fd, self.size)
+                os.pwrite(
+                    fd,
+                    HEADER.pack(
+                        MAGIC, 0, 0, 0, 0, 0, self.max_countries, self.max_sub_sports, self._token
+                    ),
+                    0,
+                )
+            fcntl.lockf(fd, fcntl.LOCK_SH, 1)
+            self._fd = fd
+            self._map = mmap.mmap(fd, self.size)
+            self._repair()
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def release(self) -> None:
+        """
+        Unmaps the file, and removes it unless another process maps it.
+        Called on shutdown, so the file of a stopped server isn't reused.
+        """
+        if self._map is None:
+            return
+        with self._locked():
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1)
+            except OSError:
+                # mapped by another worker, the last one removes it
+                pass
+            else:
+                if self._linked(self._fd):
+                    os.unlink(self.path)
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+            self._map = None
+            self._fd = None
+
+    def unlink(self) -> None:
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    # reading
+
+    def _header(self) -> Tuple:
+        return HEADER.unpack_from(self._map, 0)
+
+    def sequence(self) -> int:
+        """
+        Returns the sequence word, bumped twice by every write.
+        """
+        return struct.unpack_from("<Q", self._map, SEQUENCE_OFFSET)[0]
+
+    def _read(self, function: Callable):
+        retries = 0
+        while True:
+            before = self.sequence()
+            if before & 1:
+                retries += 1
+                if retries >= READ_RETRIES:
+                    # waits for a live writer, repairs after a dead one
+                    with self._locked():
+                        self._repair()
+                    retries = 0
+                else:
+                    time.sleep(0)
+                continue
+            try:
+                result = function()
+            except (KeyError, IndexError, struct.error, UnicodeDecodeError):
+                # torn by a writer, the sequence tells it
+                result = None
+            if self.sequence() == before:
+                return result
+
+    def _index(self) -> Tuple[Dict[str, int], Dict[Tuple[int, int], int]]:
+        _, _, generation, _, countries, sub_sports, _, _, _ = self._header()
+        key, rows, columns = self._indexes
+        if key == (generation, countries, sub_sports):
+            return rows, columns
+        rows = {
+            COUNTRY.unpack_from(self._map, self._countries_offset + COUNTRY.size * row)[0].decode(): row
+            for row in range(countries)
+        }
+        columns = {
+            SUB_SPORT.unpack_from(self._map, self._sub_sports_offset + SUB_SPORT.size * column): column
+            for column in range(sub_sports)
+        }
+        self._indexes = ((generation, countries, sub_sports), rows, columns)
+        return rows, columns
+
+    def _cell_offset(self, row: int, column: int) -> int:
+        return self._matrix_offset + COUNTS.size * (row * self.max_sub_sports + column)
+
+    @property
+    def ready(self) -> bool:
+        return self._map is not None and self._read(lambda: self._header()[3] == 1)
+
+    def cell(self, country_code: str, sport_id: int, type_id: int) -> Optional[Counts]:
+        """
+        Returns the counts of a cell, None if it has no medals.
+        """
+
+        def read():
+            rows, columns = self._index()
+            row = rows.get(country_code)
+            column = columns.get((sport_id, type_id))
+            if row is None or column is None:
+                return None
+            counts = COUNTS.unpack_from(self._map, self._cell_offset(row, column))
+            return None if counts[0] == ABSENT else counts
+
+        return self._read(read)
+
+    def totals(self) -> Dict[str, Counts]:
+        """
+        Returns the totals of every country with medals.
+        """
+
+        def read():
+            rows, _ = self._index()
+            return {
+                country_code: COUNTS.unpack_from(
+                    self._map, self._totals_offset + COUNTS.size * row
+                )
+                for country_code, row in rows.items()
+            }
+
+        return self._read(read)
+
+    def cells(self) -> Tuple[Dict[str, str], Dict[Cell, Counts]]:
+        """
+        Returns the names of the countries and the counts of every cell with medals.
+        """
+
+        def read():
+            rows, columns = self._index()
+            names = {}
+            cells = {}
+            columns = list(columns.items())
+            width = len(columns) * 3
+            matrix = memoryview(self._map).cast("I")
+            try:
+                for country_code, row in rows.items():
+                    offset = self._countries_offset + COUNTRY.size * row
+                    names[country_code] = COUNTRY.unpack_from(self._map, offset)[1].rstrip(b"\0").decode()
+                    start = (self._matrix_offset // 4) + row * self.max_sub_sports * 3
+                    values = matrix[start : start + width].tolist()
+                    for (sport_id, type_id), column in columns:
+                        gold = values[column * 3]
+                        if gold != ABSENT:
+                            cells[(country_code, sport_id, type_id)] = (
+                                gold,
+                                values[column * 3 + 1],
+                                values[column * 3 + 2],
+                            )
+            finally:
+                matrix.release()
+            return names, cells
+
+        return self._read(read)
+
+    # writing
+
+    @contextmanager
+    def _locked(self):
+        # flock excludes the other processes, not the other threads of this one
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _repair(self) -> None:
+        """
+        Makes an odd sequence even again, under the lock: its writer died in
+        the middle of a write, the snapshot is marked as not published.
+        """
+        sequence = self.sequence()
+        if sequence & 1:
+            struct.pack_into("<I", self._map, 20, 0)
+            struct.pack_into("<Q", self._map, SEQUENCE_OFFSET, sequence + 1)
+
+    @contextmanager
+    def _sequenced(self):
+        sequence = self.sequence()
+        struct.pack_into("<Q", self._map, SEQUENCE_OFFSET, sequence + 1)
+        try:
+            yield
+        finally:
+            struct.pack_into("<Q", self._map, SEQUENCE_OFFSET, sequence + 2)
+
+    @contextmanager
+    def _writing(self):
+        with self._locked(), self._sequenced():
+            yield
+
+    def _append_country(self, rows: Dict, country_code: str, name: str) -> int:
+        row = len(rows)
+        if row >= self.max_countries:
+            raise SnapshotFull(f"More than {self.max_countries} countries")
+        COUNTRY.pack_into(
+            self._map,
+            self._countries_offset + COUNTRY.size * row,
+            country_code.encode(),
+            name.encode()[: COUNTRY.size - 2],
+        )
+        COUNTS.pack_into(self._map, self._totals_offset + COUNTS.size * row, 0, 0, 0)
+        rows[country_code] = row
+        return row
+
+    def _append_sub_sport(self, columns: Dict, sport_id: int, type_id: int) -> int:
+        column = len(columns)
+        if column >= self.max_sub_sports:
+            raise SnapshotFull(f"More than {self.max_sub_sports} sub-sports")
+        SUB_SPORT.pack_into(
+            self._map, self._sub_sports_offset + SUB_SPORT.size * column, sport_id, type_id
+        )
+        columns[(sport_id, type_id)] = column
+        return column
+
+    def _write_cells(
+        self,
+        rows: Dict,
+        columns: Dict,
+        cells: Dict[Cell, Counts],
+        names: Callable[[str], str],
+    ) -> None:
+        """
+        Writes cells with the indexes given, then the number of countries and sub-sports.
+        """
+        for cell, counts in cells.items():
+            self._write_cell(rows, columns, cell, counts, names)
+        struct.pack_into("<II", self._map, 24, len(rows), len(columns))
+
+    def _write_cell(
+        self, rows: Dict, columns: Dict, cell: Cell, counts: Counts, names: Callable[[str], str]
+    ) -> None:
+        country_code, sport_id, type_id = cell
+        row = rows.get(country_code)
+        if row is None:
+            row = self._append_country(rows, country_code, names(country_code))
+        column = columns.get((sport_id, type_id))
+        if column is None:
+            column = self._append_sub_sport(columns, sport_id, type_id)
+        offset = self._cell_offset(row, column)
+        old = COUNTS.unpack_from(self._map, offset)
+        if old[0] == ABSENT:
+            old = (0, 0, 0)
+        COUNTS.pack_into(self._map, offset, *counts)
+        total_offset = self._totals_offset + COUNTS.size * row
+        total = COUNTS.unpack_from(self._map, total_offset)
+        COUNTS.pack_into(
+            self._map,
+            total_offset,
+            *(sum_count - old_count + new_count for sum_count, old_count, new_count in zip(total, old, counts)),
+        )
+
+    def _publish(self, cells: Dict[Cell, Counts], names: Dict[str, str]) -> None:
+        generation = self._header()[2] + 1
+        self._map[self._matrix_offset : self.size] = b"\xff" * (self.size - self._matrix_offset)
+        self._write_cells({}, {}, cells, names.__getitem__)
+        struct.pack_into("<II", self._map, 16, generation, 1)
+
+    def publish(self, cells: Dict[Cell, Counts], names: Dict[str, str]) -> None:
+        """
+        Replaces the whole snapshot, in a new generation.
+        `names` gives the name of every country.
+        """
+        with self._writing():
+            self._publish(cells, names)
+
+    def update(self, cells: Dict[Cell, Counts], names: Callable[[str], str]) -> None:
+        """
+        Writes the counts of some cells, `names` gives the name of a new country.
+        """
+        with self._writing():
+            rows, columns = self._index()
+            self._write_cells(dict(rows), dict(columns), cells, names)
+
+    def publish_once(self, load: Callable[[], Tuple[Dict[Cell, Counts], Dict[str, str]]]) -> bool:
+        """
+        Publishes the snapshot loaded by `load` unless another process already
+        did, returns whether this one did. The other processes wait for it.
+        """
+        with self._locked():
+            self._repair()
+            if self._header()[3] == 1:
+                return False
+            cells, names = load()
+            with self._sequenced():
+                self._publish(cells, names)
+            return True
+
+    def invalidate(self) -> None:
+        """
+        Marks the snapshot as not published, the next reader publishes it again.
+        """
+        with self._writing():
+            struct.pack_into("<I", self._map, 20, 0)
+
+
+medal_snapshot = MedalSnapshot()
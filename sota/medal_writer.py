@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from decouple import config
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from .countries import country_name
+from .database_connection import (
+    async_medal_collection,
+    async_medal_counter_collection,
+    async_medal_fact_collection,
+)
+from .medal_layout import (
+    MEDAL_TYPES,
+    country_counter_id,
+    counter_updates,
+    fact,
+    fact_id,
+    writes_embedded,
+    writes_flat,
+)
+
+logger = logging.getLogger(__name__)
+
+# (country_code, sport_id, type_id)
+Cell = Tuple[str, int, int]
+
+UPDATED = "updated"  # the country already had medals in the sub-sport
+ADDED = "added"  # the sub-sport was added to the medals of the country
+CREATED = "created"  # the country got its first medals
+FAILED = "failed"
+
+
+async def write_medals(cells: Dict[Cell, Dict[str, int]]) -> Dict[Cell, Dict]:
+    """
+    Writes the medal counts of (country, sport, type) cells to the layouts set
+    by `MEDAL_LAYOUT` and returns the outcome of every cell.
+
+    When writing both layouts, the embedded one gives the outcomes, the cells
+    it wrote are then written to the flat one.
+    """
+    if not writes_flat():
+        return await write_embedded(cells)
+    if not writes_embedded():
+        return await write_flat(cells)
+
+    results = await write_embedded(cells)
+    written = {cell: cells[cell] for cell, result in results.items() if result["result"] != FAILED}
+    if written:
+        for cell, result in (await write_flat(written)).items():
+            if result["result"] == FAILED:
+                # the migration copies the cells of the embedded layout again
+                logger.warning("Medal fact %s not written: %s", cell, result["detail"])
+    return results
+
+
+async def write_embedded(cells: Dict[Cell, Dict[str, int]]) -> Dict[Cell, Dict]:
+    """
+    Writes the medal counts of (country, sport, type) cells to the Medal
+    documents in two round trips, whatever the number of cells:
+
+    - one query finding which countries and cells already exist,
+    - one unordered bulk write setting the existing cells, pushing the new ones
+      and creating the documents of new countries.
+
+    Pushes only match documents that still lack the cell, so a cell created
+    concurrently is never duplicated: the write fails instead and can be retried.
+
+    Returns the outcome of every cell as {cell: {"result": .., "detail": ..}}.
+    """
+    country_codes = list({country_code for country_code, _, _ in cells})
+    existing_cells = {}
+    async for document in async_medal_collection.find(
+        {"country_code": {"$in": country_codes}},
+        {"_id": 0, "country_code": 1, "sports.sport_id": 1, "sports.type_id": 1},
+    ):
+        existing_cells[document["country_code"]] = {
+            (sport["sport_id"], sport["type_id"]) for sport in document.get("sports", [])
+        }
+
+    requests = []
+    outcomes = {}
+    for (country_code, sport_id, type_id), medal in cells.items():
+        cell_filter = {"sport_id": sport_id, "type_id": type_id}
+        if (sport_id, type_id) in existing_cells.get(country_code, ()):
+            outcomes[(country_code, sport_id, type_id)] = UPDATED
+            requests.append(
+                UpdateOne(
+                    {"country_code": country_code, "sports": {"$elemMatch": cell_filter}},
+                    {"$set": {f"sports.$.{name}": medal[name] for name in MEDAL_TYPES}},
+                )
+            )
+            continue
+
+        update = {"$push": {"sports": {**cell_filter, **medal}}}
+        if country_code in existing_cells:
+            outcomes[(country_code, sport_id, type_id)] = ADDED
+        else:
+            outcomes[(country_code, sport_id, type_id)] = CREATED
+            update["$setOnInsert"] = {"country_name": country_name(country_code)}
+        requests.append(
+            UpdateOne(
+                {
+                    "country_code": country_code,
+                    "sports": {"$not": {"$elemMatch": cell_filter}},
+                },
+                update,
+                upsert=True,
+            )
+        )
+
+    results = {cell: {"result": outcome} for cell, outcome in outcomes.items()}
+    if not requests:
+        return results
+    try:
+        await async_medal_collection.bulk_write(requests, ordered=False)
+    except BulkWriteError as e:
+        cells_in_order = list(outcomes)
+        for error in e.details["writeErrors"]:
+            results[cells_in_order[error["index"]]] = {
+                "result": FAILED,
+                "detail": error["errmsg"],
+            }
+    return results
+
+
+async def write_flat(cells: Dict[Cell, Dict[str, int]]) -> Dict[Cell, Dict]:
+    """
+    Writes the medal counts of (country, sport, type) cells to the MedalFact
+    documents in three round trips, whatever the number of cells:
+
+    - two concurrent queries reading the facts of the cells by their _id and
+      the counters of the countries, which tell the countries with medals,
+    - one unordered bulk write of the facts,
+    - one unordered bulk write incrementing the counters of the countries and
+      sports by the change of their cells.
+
+    A fact is only written if it still has the counts read, and a new fact is
+    only inserted if it still doesn't exist, so a cell written concurrently
+    fails instead of leaving the counters off by the concurrent change.
+    """
+    country_codes = list({country_code for country_code, _, _ in cells})
+    facts, counters = await asyncio.gather(
+        async_medal_fact_collection.find(
+            {"_id": {"$in": [fact_id(*cell) for cell in cells]}}, {"_id": 0}
+        ).to_list(None),
+        async_medal_counter_collection.find(
+            {"_id": {"$in": [country_counter_id(country_code) for country_code in country_codes]}},
+            {"_id": 0, "country_code": 1},
+        ).to_list(None),
+    )
+    existing = {
+        (document["country_code"], document["sport_id"], document["type_id"]): tuple(
+            document[name] for name in MEDAL_TYPES
+        )
+        for document in facts
+    }
+    countries_with_medals = {document["country_code"] for document in counters}
+
+    requests = []
+    outcomes = {}
+    deltas = {}
+    for cell, medal in cells.items():
+        counts = tuple(medal[name] for name in MEDAL_TYPES)
+        old = existing.get(cell)
+        document = fact(*cell, medal)
+        del document["_id"]
+        if old is not None:
+            outcomes[cell] = UPDATED
+            cell_filter = {"_id": fact_id(*cell), **dict(zip(MEDAL_TYPES, old))}
+        else:
+            outcomes[cell] = ADDED if cell[0] in countries_with_medals else CREATED
+            old = (0, 0, 0)
+            cell_filter = {"_id": fact_id(*cell), "gold": {"$exists": False}}
+        # a filter matching no fact upserts one, which fails on its _id if it exists
+        requests.append(UpdateOne(cell_filter, {"$set": document}, upsert=True))
+        deltas[cell] = tuple(new - before for new, before in zip(counts, old))
+
+    results = {cell: {"result": outcome} for cell, outcome in outcomes.items()}
+    try:
+        await async_medal_fact_collection.bulk_write(requests, ordered=False)
+    except BulkWriteError as e:
+        cells_in_order = list(outcomes)
+        for error in e.details["writeErrors"]:
+            cell = cells_in_order[error["index"]]
+            results[cell] = {"result": FAILED, "detail": error["errmsg"]}
+            del deltas[cell]
+
+    counters = counter_updates(deltas)
+    if counters:
+        await async_medal_counter_collection.bulk_write(counters, ordered=False)
+    return results
+
+
+class _Batch:
+    """
+    Cells of the writes waiting for the same commit, and their callers.
+    """
+
+    def __init__(self):
+        self.cells: Dict[Cell, Dict[str, int]] = {}
+        self.writes = 0
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.commit: Optional[asyncio.Task] = None
+
+
+class MedalWriteCoalescer:
+    """
+    Group commit of the medal writes of concurrent requests.
+
+    The first write of a batch waits for the window, the writes arriving in
+    the meantime join the batch, then the whole batch is written by a single
+    `write_medals` and every caller gets the outcome of its own cells. A cell
+    written by several requests of a batch takes the medals of the last one,
+    as if they had been written one after the other.
+
+    With a window of 0, the default, every write is committed on its own.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = config("MEDAL_COALESCE_WINDOW_MS", default=0.0, cast=float),
+    ):
+        self.window = window_ms / 1000
+        self._batch: Optional[_Batch] = None
+        self._lock = threading.Lock()
+        self._commits = 0
+        self._writes = 0
+        self._cells = 0
+
+    def _count(self, writes: int, cells: int) -> None:
+        with self._lock:
+            self._commits += 1
+            self._writes += writes
+            self._cells += cells
+
+    async def write(self, cells: Dict[Cell, Dict[str, int]]) -> Dict[Cell, Dict]:
+        """
+        Writes the medal counts of some cells, with the writes of the other
+        requests of the window, and returns the outcome of these cells.
+        """
+        if self.window <= 0:
+            results = await write_medals(cells)
+            self._count(1, len(cells))
+            return results
+
+        batch = self._batch
+        if batch is None:
+            batch = self._batch = _Batch()
+            # a task, so a caller leaving does not cancel the commit of the others
+            batch.commit = asyncio.create_task(self._commit(batch))
+        batch.cells.update(cells)
+        batch.writes += 1
+        results = await asyncio.shield(batch.done)
+        return {cell: results[cell] for cell in cells}
+
+    async def _commit(self, batch: _Batch) -> None:
+        await asyncio.sleep(self.window)
+        # the writes arriving from now on start the next batch
+        self._batch = None
+        try:
+            batch.done.set_result(await write_medals(batch.cells))
+            self._count(batch.writes, len(batch.cells))
+        except Exception as e:
+            batch.done.set_exception(e)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "window_ms": self.window * 1000,
+                "commits": self._commits,
+                "writes": self._writes,
+                "cells": self._cells,
+            }
+
+
+medal_coalescer = MedalWriteCoalescer()
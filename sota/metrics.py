@@ -0,0 +1,243 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+from decouple import config, Csv
+from pymongo import monitoring
+
+# upper bounds of the histogram buckets, in seconds
+REQUEST_BUCKETS = config(
+    "METRICS_REQUEST_BUCKETS",
+    default="0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10",
+    cast=Csv(float),
+)
+COMMAND_BUCKETS = config(
+    "METRICS_COMMAND_BUCKETS",
+    default="0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1",
+    cast=Csv(float),
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Counts of observations per bucket, with their sum.
+    It is not locked, its owner serializes the observations and the snapshots.
+    """
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = sorted(buckets)
+        # the last count is of the observations above every bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        return histogram
+
+
+class RequestMetrics:
+    """
+    Number of requests by route and status, their latency by route,
+    and the number of requests being served.
+
+    Routes are labelled by their path template, so the number of series
+    doesn't grow with the paths requested, and requests matching no route
+    share the `unmatched` label.
+    """
+
+    def __init__(self, buckets: List[float] = REQUEST_BUCKETS):
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+
+    def started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            key = (method, route, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = Histogram(self._buckets)
+            histogram.observe(seconds)
+
+    def snapshot(self) -> Tuple[int, Dict, Dict]:
+        with self._lock:
+            return (
+                self._in_flight,
+                dict(self._requests),
+                {key: histogram.copy() for key, histogram in self._latency.items()},
+            )
+
+
+def route_label(scope: Dict) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # the root path holds the path of the mounted apps
+    return scope.get("root_path", "") + getattr(route, "path_format", route.path)
+
+
+class MetricsMiddleware:
+    """
+    Records the requests served by the app in `RequestMetrics`.
+
+    The latency is measured until the last chunk of the response is sent,
+    so streamed responses are timed as a whole.
+    """
+
+    def __init__(self, app, metrics: Optional[RequestMetrics] = None):
+        self.app = app
+        self.metrics = metrics or request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.finished(
+                scope["method"], route_label(scope), status, time.perf_counter() - start
+            )
+
+
+def command_collection(event) -> str:
+    """
+    Returns the collection targeted by a command, `$cmd` for the database commands.
+    """
+    if event.command_name == "getMore":
+        return event.command.get("collection", "$cmd")
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else "$cmd"
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Durations of the commands sent by a client, by collection and command,
+    fed by pymongo's command events.
+
+    The succeeded and failed events don't carry the command, its collection
+    is kept from the started event until then.
+    """
+
+    def __init__(self, buckets: List[float] = COMMAND_BUCKETS):
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple, str] = {}
+        self._durations: Dict[Tuple[str, str], Histogram] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}
+
+    def _key(self, event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def _finished(self, event) -> Tuple[str, str]:
+        collection = self._pending.pop(self._key(event), "$cmd")
+        key = (collection, event.command_name)
+        histogram = self._durations.get(key)
+        if histogram is None:
+            histogram = self._durations[key] = Histogram(self._buckets)
+        histogram.observe(event.duration_micros / 1_000_000)
+        return key
+
+    def started(self, event) -> None:
+        collection = command_collection(event)
+        with self._lock:
+            self._pending[self._key(event)] = collection
+
+    def succeeded(self, event) -> None:
+        with self._lock:
+            self._finished(event)
+
+    def failed(self, event) -> None:
+        with self._lock:
+            key = self._finished(event)
+            self._failures[key] = self._failures.get(key, 0) + 1
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        with self._lock:
+            return (
+                {key: histogram.copy() for key, histogram in self._durations.items()},
+                dict(self._failures),
+            )
+
+
+request_metrics = RequestMetrics()
+
+# one per client, like the pool metrics
+command_metrics = {"sync": CommandMetrics(), "async": CommandMetrics()}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """
+    Builds a page of the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def family(
+        self, name: str, kind: str, help: str, samples: Iterable[Tuple[Labels, float]]
+    ) -> None:
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def histogram(
+        self, name: str, help: str, histograms: Iterable[Tuple[Labels, Histogram]]
+    ) -> None:
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in histograms:
+            count = 0
+            for bound, bucket_count in zip(
+                histogram.buckets + [float("inf")], histogram.counts
+            ):
+                count += bucket_count
+                le = (("le", _format_value(float(bound))),)
+                self._lines.append(f"{name}_bucket{_format_labels(labels + le)} {count}")
+            self._lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            self._lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
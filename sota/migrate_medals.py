@@ -0,0 +1,321 @@
+"""
+Converts the embedded Medal documents to the flat layout: a MedalFact document
+per (country, sport, type) and the MedalCounter totals of every country and sport.
+
+The migration runs while the API serves requests, with every worker writing
+both layouts (`MEDAL_LAYOUT=dual`):
+
+1. copy: the cells of the Medal documents are inserted as facts, in batches
+   in the order of their _id. A fact already written by the API is newer and
+   is left as it is. The counters are incremented by the inserted facts, as
+   the API increments them by the facts it writes. The last copied _id is
+   saved after every batch, so an interrupted migration resumes after it.
+2. counters: the counters are checked against the sums of the facts, and
+   repaired by the difference.
+3. verify: the facts are compared with the Medal documents, the ones which
+   differ are written again from them, then the counters are checked.
+   Once the workers write the flat layout only, the Medal documents are no
+   longer up to date: the facts are then only compared, never written again,
+   and the counters are checked against them.
+
+The workers keep incrementing the counters meanwhile, so the migration never
+sets them: a repair increments a counter by the difference between the sums
+of the facts and the counter read before them, and only if the counter still
+has the value read, otherwise it is checked again.
+
+Once verified, the workers can be switched to `MEDAL_LAYOUT=flat`. Running
+the migration with `MEDAL_LAYOUT=flat` then only checks the counters.
+
+Usage: python -m sota.migrate_medals [--batch 500] [--restart]
+"""
+import argparse
+import itertools
+import time
+from typing import Dict, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from .countries import country_name
+from .database_connection import (
+    medal_collection,
+    medal_counter_collection,
+    medal_fact_collection,
+    versions_collection,
+)
+from .medal_layout import (
+    MEDAL_TYPES,
+    country_counter_id,
+    counter_updates,
+    fact,
+    load_facts,
+    sport_counter_id,
+    writes_embedded,
+)
+from .standings import load_medals
+
+# id of the document saving the progress, in the versions collection
+MIGRATION_ID = "medal_layout_migration"
+COPY = "copy"
+COUNTERS = "counters"
+VERIFY = "verify"
+DONE = "done"
+# checks of the counters moved by concurrent writes before giving up on them
+REPAIR_ROUNDS = 5
+
+
+def progress() -> Dict:
+    return versions_collection.find_one({"_id": MIGRATION_ID}) or {"phase": COPY, "copied": 0}
+
+
+def save_progress(**fields) -> None:
+    versions_collection.update_one({"_id": MIGRATION_ID}, {"$set": fields}, upsert=True)
+
+
+def copy_facts(batch_size: int, max_batches: Optional[int] = None) -> int:
+    """
+    Inserts the missing facts of the Medal documents after the last copied one,
+    returns the number of documents copied by this run.
+    """
+    state = progress()
+    copied = 0
+    for batch in itertools.count():
+        if max_batches is not None and batch >= max_batches:
+            return copied
+        query = {"_id": {"$gt": state["last_id"]}} if "last_id" in state else {}
+        documents = list(medal_collection.find(query).sort("_id", 1).limit(batch_size))
+        if not documents:
+            break
+        facts = [
+            fact(medal["country_code"], sport["sport_id"], sport["type_id"], sport)
+            for medal in documents
+            for sport in medal.get("sports", [])
+        ]
+        if facts:
+            result = medal_fact_collection.bulk_write(
+                [
+                    UpdateOne({"_id": document["_id"]}, {"$setOnInsert": document}, upsert=True)
+                    for document in facts
+                ],
+                ordered=False,
+            )
+            inserted = {
+                (facts[index]["country_code"], facts[index]["sport_id"], facts[index]["type_id"]):
+                    tuple(facts[index][name] for name in MEDAL_TYPES)
+                for index in result.upserted_ids
+            }
+            if inserted:
+                names = {medal["country_code"]: medal.get("country_name") for medal in documents}
+                medal_counter_collection.bulk_write(
+                    counter_updates(inserted, lambda code: names.get(code) or country_name(code)),
+                    ordered=False,
+                )
+        copied += len(documents)
+        state = {"last_id": documents[-1]["_id"], "copied": state.get("copied", 0) + len(documents)}
+        save_progress(phase=COPY, **state)
+    save_progress(phase=COUNTERS)
+    return copied
+
+
+def _sums(group: str):
+    return medal_fact_collection.aggregate(
+        [
+            {
+                "$group": {
+                    "_id": f"${group}",
+                    **{name: {"$sum": f"${name}"} for name in MEDAL_TYPES},
+                }
+            }
+        ]
+    )
+
+
+def _counter_values() -> Dict[str, Tuple[int, int, int]]:
+    return {
+        document["_id"]: tuple(document[name] for name in MEDAL_TYPES)
+        for document in medal_counter_collection.find()
+    }
+
+
+def _expected_counters() -> Dict[str, Tuple[Dict, Tuple[int, int, int]]]:
+    """
+    Returns the key fields and the sums of the facts of every counter.
+    """
+    expected = {}
+    for totals in _sums("country_code"):
+        country_code = totals["_id"]
+        expected[country_counter_id(country_code)] = (
+            {"country_code": country_code},
+            tuple(totals[name] for name in MEDAL_TYPES),
+        )
+    for totals in _sums("sport_id"):
+        sport_id = totals["_id"]
+        expected[sport_counter_id(sport_id)] = (
+            {"sport_id": sport_id},
+            tuple(totals[name] for name in MEDAL_TYPES),
+        )
+    return expected
+
+
+def compute_counters() -> int:
+    """
+    Increments the counters which differ from the sums of their facts by the
+    difference, returns the number of counters repaired.
+
+    The counters are read before the facts are summed, and incremented only
+    if they still have the values read: the increment of a concurrent write
+    is then kept, and its counter checked again in the next round.
+    """
+    names = {
+        document["country_code"]: document.get("country_name")
+        for document in medal_collection.find({}, {"_id": 0, "country_code": 1, "country_name": 1})
+    }
+    repaired = 0
+    for _ in range(REPAIR_ROUNDS):
+        actual = _counter_values()
+        expected = _expected_counters()
+        requests = []
+        for counter_id in expected.keys() | actual.keys():
+            key, sums = expected.get(counter_id, ({}, (0, 0, 0)))
+            counts = actual.get(counter_id)
+            if counts == sums:
+                continue
+            if counts is None:
+                counter_filter = {"_id": counter_id, "gold": {"$exists": False}}
+                counts = (0, 0, 0)
+            else:
+                counter_filter = {"_id": counter_id, **dict(zip(MEDAL_TYPES, counts))}
+            insert = dict(key)
+            if "country_code" in insert:
+                code = insert["country_code"]
+                insert["country_name"] = names.get(code) or country_name(code)
+            requests.append(
+                UpdateOne(
+                    counter_filter,
+                    {
+                        "$inc": {name: new - old for name, new, old in zip(MEDAL_TYPES, sums, counts)},
+                        "$setOnInsert": insert,
+                    },
+                    # a filter matching no counter upserts one, which fails on its _id if it exists
+                    upsert=True,
+                )
+            )
+        if not requests:
+            break
+        failed = 0
+        try:
+            medal_counter_collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # moved by a concurrent write since they were read
+            failed = len(e.details["writeErrors"])
+        repaired += len(requests) - failed
+        if not failed:
+            break
+    save_progress(phase=VERIFY)
+    return repaired
+
+
+def _counters_match() -> bool:
+    expected = {}
+    for (country_code, sport_id, _), counts in load_facts()[0].items():
+        for counter_id in (country_counter_id(country_code), sport_counter_id(sport_id)):
+            expected[counter_id] = tuple(
+                total + count for total, count in zip(expected.get(counter_id, (0, 0, 0)), counts)
+            )
+    actual = {
+        document["_id"]: tuple(document[name] for name in MEDAL_TYPES)
+        for document in medal_counter_collection.find()
+    }
+    return actual == expected
+
+
+def verify() -> Dict[str, int]:
+    """
+    Writes again the facts which differ from the Medal documents, then computes
+    the counters again if they don't match the facts. Returns what was found.
+
+    With the flat layout only, the facts are newer than the Medal documents:
+    the ones which differ are counted as `unrepaired_facts` and left as they are.
+    """
+    # the facts are read first: a cell written by the API in between is then
+    # newer in the Medal documents, and its fact is repaired only if unchanged
+    flat, _ = load_facts()
+    embedded, _ = load_medals(medal_collection)
+    requests = []
+    deltas = {}
+    for cell, counts in embedded.items():
+        if flat.get(cell) == counts:
+            continue
+        document = fact(*cell, dict(zip(MEDAL_TYPES, counts)))
+        fact_filter = {"_id": document.pop("_id")}
+        if cell in flat:
+            fact_filter.update(zip(MEDAL_TYPES, flat[cell]))
+        else:
+            fact_filter["gold"] = {"$exists": False}
+        requests.append(UpdateOne(fact_filter, {"$set": document}, upsert=True))
+        deltas[cell] = tuple(new - old for new, old in zip(counts, flat.get(cell, (0, 0, 0))))
+    unrepaired = 0
+    if not writes_embedded():
+        # the Medal documents stopped following the writes
+        unrepaired = len(requests)
+        requests = []
+        deltas = {}
+    if requests:
+        try:
+            medal_fact_collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # written by the API since they were read
+            cells_in_order = list(deltas)
+            for error in e.details["writeErrors"]:
+                del deltas[cells_in_order[error["index"]]]
+        if deltas:
+            medal_counter_collection.bulk_write(counter_updates(deltas), ordered=False)
+    repaired = len(deltas)
+    report = {
+        "facts": len(embedded),
+        "repaired_facts": repaired,
+        "unrepaired_facts": unrepaired,
+        # cells of the flat layout only, left for an operator to look at
+        "unknown_facts": len(flat.keys() - embedded.keys()),
+        "counters_repaired": 0,
+    }
+    if not _counters_match():
+        report["counters_repaired"] = compute_counters()
+    save_progress(phase=DONE, report=report)
+    return report
+
+
+def migrate(batch_size: int = 500, restart: bool = False, max_batches: Optional[int] = None) -> Dict:
+    """
+    Runs the phases of the migration from the saved progress, returns it.
+    `max_batches` stops the copy after some batches, as an interruption would.
+    """
+    if restart:
+        versions_collection.delete_one({"_id": MIGRATION_ID})
+    phase = progress()["phase"]
+    if phase == COPY:
+        copy_facts(batch_size, max_batches)
+        phase = progress()["phase"]
+    if phase == COUNTERS:
+        compute_counters()
+        phase = VERIFY
+    if phase in (VERIFY, DONE):
+        # verifying again is harmless, and catches the writes since the last run
+        verify()
+    return progress()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch", type=int, default=500, help="Medal documents per batch")
+    parser.add_argument("--restart", action="store_true", help="copy from the first document again")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state = migrate(args.batch, args.restart)
+    print(f"copied {state.get('copied', 0)} Medal documents")
+    for name, count in state.get("report", {}).items():
+        print(f"{name:<18}{count:>10}")
+    print(f"migrated in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
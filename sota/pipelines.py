@@ -0,0 +1,83 @@
+import threading
+import time
+from typing import Dict, List
+from decouple import config
+
+# options given to every aggregation, unless the pipeline overrides them
+DEFAULT_OPTIONS = {
+    "allowDiskUse": config("PIPELINE_ALLOW_DISK_USE", default=False, cast=bool),
+    "maxTimeMS": config("PIPELINE_MAX_TIME_MS", default=30000, cast=int) or None,
+    "batchSize": config("PIPELINE_BATCH_SIZE", default=0, cast=int) or None,
+}
+
+
+class PipelineTimings:
+    """
+    Number of runs and execution times of every named pipeline.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: Dict[str, Dict] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        milliseconds = seconds * 1000
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {"runs": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            timing["runs"] += 1
+            timing["total_ms"] += milliseconds
+            timing["max_ms"] = max(timing["max_ms"], milliseconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {**timing, "mean_ms": timing["total_ms"] / timing["runs"]}
+                for name, timing in self._timings.items()
+            }
+
+
+pipeline_timings = PipelineTimings()
+
+
+class Pipeline:
+    """
+    An aggregation pipeline built once, when the module defining it is imported.
+    Its stages are shared between runs and must not be mutated.
+
+    The options of the aggregation (`allowDiskUse`, `maxTimeMS`, `hint`,
+    `batchSize`...) are the `PIPELINE_*` settings overridden by the keyword
+    arguments, and the execution time of every run is recorded under
+    the name of the pipeline.
+    """
+
+    def __init__(self, name: str, stages: List[Dict], **options):
+        self.name = name
+        self.stages = stages
+        self.options = {
+            key: value
+            for key, value in {**DEFAULT_OPTIONS, **options}.items()
+            if value is not None
+        }
+
+    def run(self, collection) -> List[Dict]:
+        """
+        Runs the pipeline on a collection of the synchronous driver.
+        """
+        start = time.perf_counter()
+        try:
+            return list(collection.aggregate(self.stages, **self.options))
+        finally:
+            pipeline_timings.record(self.name, time.perf_counter() - start)
+
+    async def run_async(self, collection) -> List[Dict]:
+        """
+        Runs the pipeline on a collection of the asyncio driver.
+        """
+        start = time.perf_counter()
+        try:
+            cursor = await collection.aggregate(self.stages, **self.options)
+            return await cursor.to_list(None)
+        finally:
+            pipeline_timings.record(self.name, time.perf_counter() - start)
@@ -0,0 +1,92 @@
+import threading
+from typing import Dict
+from pymongo import monitoring
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Counters of the connection pools of a client, fed by pymongo's pool events.
+
+    `in_use` is the number of connections checked out right now, `max_in_use`
+    its peak, to be compared with `maxPoolSize`. `exhausted` counts the
+    checkouts which timed out waiting for a connection, `wait_ms` the time
+    spent waiting for a connection by the successful checkouts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "exhausted": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "open": 0,
+            "created": 0,
+            "closed": 0,
+            "cleared": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _add(self, name: str, value=1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_checked_out(self, event) -> None:
+        wait_ms = (event.duration or 0.0) * 1000
+        with self._lock:
+            counters = self._counters
+            counters["checkouts"] += 1
+            counters["in_use"] += 1
+            counters["max_in_use"] = max(counters["max_in_use"], counters["in_use"])
+            counters["wait_ms_total"] += wait_ms
+            counters["wait_ms_max"] = max(counters["wait_ms_max"], wait_ms)
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self._counters["checkout_failures"] += 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self._counters["exhausted"] += 1
+
+    def connection_checked_in(self, event) -> None:
+        self._add("in_use", -1)
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self._counters["created"] += 1
+            self._counters["open"] += 1
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self._counters["closed"] += 1
+            self._counters["open"] -= 1
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self._add("cleared")
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        checkouts = counters["checkouts"]
+        counters["wait_ms_mean"] = counters["wait_ms_total"] / checkouts if checkouts else 0.0
+        return counters
+
+
+# one per client, the synchronous and the asyncio clients have their own pools
+pool_metrics = {"sync": PoolMetrics(), "async": PoolMetrics()}
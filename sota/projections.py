@@ -0,0 +1,298 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+from .countries import country_name
+from .database_connection import medal_collection
+from .medal_snapshot import MedalSnapshot, medal_snapshot
+from .reference_data import reference_data
+from .standings import MEDAL_TYPES, read_medals, shared_snapshot
+
+Counts = Tuple[int, int, int]
+
+
+def _medals(counts: Counts) -> Dict[str, int]:
+    return dict(zip(MEDAL_TYPES, counts))
+
+
+def _sum(counts: List[Counts]) -> Counts:
+    return tuple(sum(medal) for medal in zip(*counts)) if counts else (0, 0, 0)
+
+
+class MedalProjections:
+    """
+    Denormalized documents served by the `/medal` routes, one per country,
+    per sport and per sub-sport, kept in memory.
+
+    They are built once from the Medal collection and the names of the
+    sports and sub-sports in the reference data, so a read is a single dictionary lookup instead of
+    an aggregation joining SportDetail and SubSportType for every medal row.
+
+    When `update_medal` writes a (sport, type) for some countries, only the
+    documents of those countries, of the sport and of the sub-sport are
+    computed again, from memory.
+
+    Like the aggregations they replace, medals of a sport or sub-sport
+    missing from the reference collections are left out of the documents.
+
+    With `MEDAL_SNAPSHOT` enabled, the documents are built from the cells of
+    the snapshot shared by the workers, and again whenever its sequence moved.
+    """
+
+    def __init__(
+        self,
+        medal=medal_collection,
+        reference=reference_data,
+        snapshot: MedalSnapshot = medal_snapshot,
+    ):
+        self._medal = medal
+        self._reference = reference
+        self._snapshot = snapshot
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._country_names: Dict[str, str] = {}
+        # the same medal counts indexed by country and by sport
+        self._by_country: Dict[str, Dict[Tuple[int, int], Counts]] = {}
+        self._by_sport: Dict[int, Dict[Tuple[str, int], Counts]] = {}
+        self._countries: Dict[str, Dict] = {}
+        self._sports: Dict[int, Dict] = {}
+        self._sub_sports: Dict[Tuple[int, int], Dict] = {}
+        self._loaded = False
+        # sequence of the snapshot the documents were built at
+        self._sequence: Optional[int] = None
+
+    def rebuild(self) -> None:
+        """
+        Builds every document from the database.
+        """
+        with self._lock:
+            self._load(publish=True)
+
+    def load(self) -> None:
+        """
+        Builds every document, from the shared snapshot if another worker already published it.
+        """
+        with self._lock:
+            self._load()
+
+    def _load(self, publish: bool = False) -> None:
+        self._reset()
+        shared = shared_snapshot(self._snapshot)
+        if shared is None:
+            cells, names = read_medals(self._medal)
+        else:
+            if publish:
+                shared.publish(*read_medals(self._medal))
+            else:
+                shared.publish_once(lambda: read_medals(self._medal))
+            # read before the cells, a write in between only builds them once more
+            sequence = shared.sequence()
+            names, cells = shared.cells()
+        self._country_names = names
+        for (country_code, sport_id, type_id), counts in cells.items():
+            self._set_counts(country_code, sport_id, type_id, counts)
+        self._refresh_all()
+        self._loaded = True
+        if shared is not None:
+            self._sequence = sequence
+
+    def _refresh_all(self) -> None:
+        for country_code in self._by_country:
+            self._refresh_country(country_code)
+        for sport_id, counts in self._by_sport.items():
+            self._refresh_sport(sport_id)
+            for type_id in {type_id for _, type_id in counts}:
+                self._refresh_sub_sport(sport_id, type_id)
+
+    def refresh_names(self) -> None:
+        """
+        Builds every document again from the medals in memory, with the
+        names of the sports and sub-sports now in the reference data.
+        """
+        with self._lock:
+            if self._loaded:
+                self._refresh_all()
+
+    def invalidate(self) -> None:
+        """
+        Drops every document, they are built again from the database on the next read.
+        """
+        with self._lock:
+            self._reset()
+
+    def apply(
+        self, sport_id: int, type_id: int, medals: Dict[str, Dict[str, int]]
+    ) -> None:
+        """
+        Applies the medals of a (sport, type) written for some countries,
+        given as {country_code: {"gold": .., "silver": .., "bronze": ..}},
+        and refreshes the documents affected by them.
+        """
+        if shared_snapshot(self._snapshot) is not None:
+            # the next read sees the sequence of the snapshot moved
+            return
+        with self._lock:
+            if not self._loaded:
+                # nothing to keep up to date, the next read loads the written data
+                return
+            for country_code, medal in medals.items():
+                if country_code not in self._country_names:
+                    self._country_names[country_code] = country_name(country_code)
+                self._set_counts(
+                    country_code,
+                    sport_id,
+                    type_id,
+                    tuple(medal[name] for name in MEDAL_TYPES),
+                )
+                self._refresh_country(country_code)
+            self._refresh_sport(sport_id)
+            self._refresh_sub_sport(sport_id, type_id)
+
+    def _get(self, documents: str, key) -> Dict:
+        shared = shared_snapshot(self._snapshot)
+        with self._lock:
+            if not self._loaded or (
+                shared is not None and (not shared.ready or shared.sequence() != self._sequence)
+            ):
+                self._load()
+            return getattr(self, documents).get(key, {})
+
+    def country(self, country_code: str) -> Dict:
+        """
+        Returns the medals of a country, detailed by sport and sub-sport.
+        """
+        return self._get("_countries", country_code)
+
+    def sport(self, sport_id: int) -> Dict:
+        """
+        Returns the medals of a sport, detailed by country and sub-sport.
+        """
+        return self._get("_sports", sport_id)
+
+    def sub_sport(self, sport_id: int, type_id: int) -> Dict:
+        """
+        Returns the medals of a sub-sport, detailed by country.
+        """
+        return self._get("_sub_sports", (sport_id, type_id))
+
+    def _set_counts(
+        self, country_code: str, sport_id: int, type_id: int, counts: Counts
+    ) -> None:
+        self._by_country.setdefault(country_code, {})[(sport_id, type_id)] = counts
+        self._by_sport.setdefault(sport_id, {})[(country_code, type_id)] = counts
+
+    def _has_names(self, sport_id: int, type_id: int) -> bool:
+        return self._reference.sub_sport(sport_id, type_id) is not None and (
+            self._reference.sport(sport_id) is not None
+        )
+
+    def _sub_sport_medals(self, sport_id: int, cells: Dict[int, Counts]) -> List[Dict]:
+        return [
+            {
+                "sub_id": type_id,
+                "sub_name": self._reference.type_name(sport_id, type_id),
+                **_medals(counts),
+            }
+            for type_id, counts in sorted(cells.items())
+        ]
+
+    def _refresh_country(self, country_code: str) -> None:
+        by_sport: Dict[int, Dict[int, Counts]] = {}
+        for (sport_id, type_id), counts in self._by_country.get(country_code, {}).items():
+            if self._has_names(sport_id, type_id):
+                by_sport.setdefault(sport_id, {})[type_id] = counts
+
+        individual_sports = [
+            {
+                "sport_id": sport_id,
+                "sport_name": self._reference.sport_name(sport_id),
+                **_medals(_sum(list(cells.values()))),
+                "sub_sports": self._sub_sport_medals(sport_id, cells),
+            }
+            for sport_id, cells in sorted(by_sport.items())
+        ]
+        self._store(
+            self._countries,
+            country_code,
+            {
+                "country": country_code,
+                "country_name": self._country_names[country_code],
+                **self._total(individual_sports),
+                "individual_sports": individual_sports,
+            }
+            if individual_sports
+            else None,
+        )
+
+    def _refresh_sport(self, sport_id: int) -> None:
+        by_country: Dict[str, Dict[int, Counts]] = {}
+        for (country_code, type_id), counts in self._by_sport.get(sport_id, {}).items():
+            if self._has_names(sport_id, type_id):
+                by_country.setdefault(country_code, {})[type_id] = counts
+
+        individual_countries = [
+            {
+                "country_code": country_code,
+                "country_name": self._country_names[country_code],
+                **_medals(_sum(list(cells.values()))),
+                "sub_sports": self._sub_sport_medals(sport_id, cells),
+            }
+            for country_code, cells in sorted(by_country.items())
+        ]
+        self._store(
+            self._sports,
+            sport_id,
+            {
+                "sport": sport_id,
+                "sport_name": self._reference.sport_name(sport_id),
+                **self._total(individual_countries),
+                "individual_countries": individual_countries,
+            }
+            if individual_countries
+            else None,
+        )
+
+    def _refresh_sub_sport(self, sport_id: int, type_id: int) -> None:
+        individual_countries = []
+        if self._has_names(sport_id, type_id):
+            individual_countries = [
+                {
+                    "country_code": country_code,
+                    "country_name": self._country_names[country_code],
+                    **_medals(counts),
+                }
+                for (country_code, cell_type_id), counts in sorted(
+                    self._by_sport.get(sport_id, {}).items()
+                )
+                if cell_type_id == type_id
+            ]
+        self._store(
+            self._sub_sports,
+            (sport_id, type_id),
+            {
+                "sport_id": sport_id,
+                "sport_name": self._reference.sport_name(sport_id),
+                "sub_sport_id": type_id,
+                "sub_sport_name": self._reference.type_name(sport_id, type_id),
+                **self._total(individual_countries),
+                "individual_countries": individual_countries,
+            }
+            if individual_countries
+            else None,
+        )
+
+    @staticmethod
+    def _total(rows: List[Dict]) -> Dict[str, int]:
+        return {medal: sum(row[medal] for row in rows) for medal in MEDAL_TYPES}
+
+    @staticmethod
+    def _store(documents: Dict, key, document: Optional[Dict]) -> None:
+        if document:
+            documents[key] = document
+        else:
+            documents.pop(key, None)
+
+
+medal_projections = MedalProjections()
+# the documents embed the names of the sports and sub-sports
+reference_data.on_change(medal_projections.refresh_names)
@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from decouple import config
+from .data_versions import data_versions, REFERENCE
+from .database_connection import sport_detail_collection, sub_sport_collection
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceData:
+    """
+    In-memory cache of the SportDetail and SubSportType collections,
+    the reference data used by the validators and the sport routes.
+
+    Both collections are loaded at once and answered from dictionaries and sets.
+    Only the first lookup waits for them. Once `REFERENCE_DATA_TTL` seconds have
+    passed, or the cache was invalidated, a lookup starts loading them again in a
+    background thread and the previous data is answered meanwhile, so the
+    validators never query the database on the event loop. `reload` loads them
+    on demand and waits.
+
+    The version of the reference data is only bumped, and the callbacks given to
+    `on_change` only called, when a load found data different from the previous one.
+    """
+
+    def __init__(
+        self,
+        sport_detail=sport_detail_collection,
+        sub_sport=sub_sport_collection,
+        ttl: float = config("REFERENCE_DATA_TTL", default=300, cast=float),
+    ):
+        self._sport_detail = sport_detail
+        self._sub_sport = sub_sport
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._sports: Dict[int, Dict] = {}
+        self._sub_sports: Dict[Tuple[int, int], Dict] = {}
+        self._sub_sports_of: Dict[int, List[Dict]] = {}
+        self._participating_countries: Dict[Tuple[int, int], FrozenSet[str]] = {}
+        self._loaded = False
+        self._loaded_at: Optional[float] = None
+        # bumped by invalidate, a load which started before is stale already
+        self._generation = 0
+        self._refresh_lock = threading.Lock()
+        self._refresh: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_change(self, listener: Callable[[], None]) -> None:
+        """
+        Calls `listener` after every load which changed the data, from the
+        thread which loaded it.
+        """
+        self._listeners.append(listener)
+
+    def reload(self) -> None:
+        """
+        Loads both collections from the database.
+        """
+        with self._lock:
+            changed = self._load()
+        self._notify(changed)
+
+    def _load(self) -> bool:
+        generation = self._generation
+        sports = {
+            document["sport_id"]: document
+            for document in self._sport_detail.find({}, {"_id": 0})
+        }
+        sub_sports = {}
+        sub_sports_of = {}
+        for document in self._sub_sport.find({}, {"_id": 0}):
+            sub_sports[(document["sport_id"], document["type_id"])] = document
+            sub_sports_of.setdefault(document["sport_id"], []).append(document)
+
+        changed = not self._loaded or sports != self._sports or sub_sports != self._sub_sports
+        if changed:
+            self._sports = sports
+            self._sub_sports = sub_sports
+            self._sub_sports_of = sub_sports_of
+            self._participating_countries = {
+                key: frozenset(document["participating_countries"])
+                for key, document in sub_sports.items()
+            }
+        self._loaded = True
+        self._loaded_at = time.monotonic() if generation == self._generation else None
+        if changed:
+            data_versions.bump(REFERENCE)
+        return changed
+
+    def _notify(self, changed: bool) -> None:
+        # outside of the lock, a listener may look the reference data up
+        if changed:
+            for listener in self._listeners:
+                listener()
+
+    def invalidate(self) -> None:
+        """
+        Marks the cache as stale, both collections are loaded again in the
+        background on the next lookup.
+        """
+        self._generation += 1
+        self._loaded_at = None
+
+    def _ensure_fresh(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self._ttl:
+            return
+        if self._loaded:
+            self._refresh_in_background()
+            return
+        changed = False
+        with self._lock:
+            # another thread may have loaded the data while this one was waiting
+            if not self._loaded:
+                changed = self._load()
+        self._notify(changed)
+
+    def _refresh_in_background(self) -> None:
+        with self._refresh_lock:
+            if self._refresh is not None and self._refresh.is_alive():
+                return
+            self._refresh = threading.Thread(
+                target=self._background_reload, name="reference-data-refresh", daemon=True
+            )
+            self._refresh.start()
+
+    def _background_reload(self) -> None:
+        try:
+            self.reload()
+        except Exception as error:
+            # the previous data is still answered, the next lookup tries again
+            logger.warning("Reloading the reference data failed: %s", error)
+
+    def sports(self) -> List[Dict]:
+        """
+        Returns the documents of every sport, without their `_id`.
+        """
+        self._ensure_fresh()
+        return list(self._sports.values())
+
+    def sport(self, sport_id: int) -> Optional[Dict]:
+        """
+        Returns the document of a sport, or None if it doesn't exist.
+        """
+        self._ensure_fresh()
+        return self._sports.get(sport_id)
+
+    def missing_sport_ids(self, sport_ids: Iterable[int]) -> Set[int]:
+        """
+        Returns the sport ids which don't exist among the given ones.
+        """
+        self._ensure_fresh()
+        return set(sport_ids).difference(self._sports)
+
+    def sub_sport(self, sport_id: int, type_id: int) -> Optional[Dict]:
+        """
+        Returns the document of a sub-sport, or None if it doesn't exist.
+        """
+        self._ensure_fresh()
+        return self._sub_sports.get((sport_id, type_id))
+
+    def sub_sports_of(self, sport_id: int) -> List[Dict]:
+        """
+        Returns the documents of the sub-sports of a sport.
+        """
+        self._ensure_fresh()
+        return self._sub_sports_of.get(sport_id, [])
+
+    def participating_countries(self, sport_id: int, type_id: int) -> FrozenSet[str]:
+        """
+        Returns the codes of the countries participating in a sub-sport.
+        """
+        self._ensure_fresh()
+        return self._participating_countries.get((sport_id, type_id), frozenset())
+
+    def sport_name(self, sport_id: int) -> Optional[str]:
+        sport = self.sport(sport_id)
+        return sport["sport_name"] if sport else None
+
+    def type_name(self, sport_id: int, type_id: int) -> Optional[str]:
+        sub_sport = self.sub_sport(sport_id, type_id)
+        return sub_sport["type_name"] if sub_sport else None
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,24 @@
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by orjson, the default response class of the app.
+
+    The data of routes declaring a response model is converted by pydantic
+    from their dicts, skipping the walk of `jsonable_encoder`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class EmptyObject(BaseModel):
+    """
+    The blank object returned when nothing was found.
+    """
+
+    model_config = ConfigDict(extra="forbid")
@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
+from ..data_versions import data_versions, MEDALS
+from ..standings import medal_standings
+from ..projections import medal_projections
+from ..reference_data import reference_data
+from ..key_cache import key_cache
+from ..audience_stats import audience_stats
+from ..broadcaster import medal_broadcaster
+from ..medal_writer import medal_coalescer
+from ..pipelines import pipeline_timings
+from ..pool_metrics import pool_metrics
+from ..invalidation import invalidation_bus, MEDAL, SPORT_DETAIL, SUB_SPORT
+from .deps.auth_deps import check_auth_key, CheckPermissionsOfKey, AuthScope
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[
+        Depends(check_auth_key),
+        Depends(CheckPermissionsOfKey([AuthScope.ADMIN])),
+    ],
+)
+
+
+@router.post("/medals/rebuild")
+async def rebuild_medal_standings():
+    """
+    Rebuilds the in-memory medal standings from the database,
+    then checks them against the aggregation over the Medal collection.
+    The versions shared by the ETags of every process are bumped too.
+    """
+    await run_in_threadpool(medal_standings.rebuild)
+    data_versions.bump(MEDALS)
+    await invalidation_bus.notify(MEDAL)
+    return await run_in_threadpool(medal_standings.check)
+
+
+@router.get("/medals/check")
+def check_medal_standings():
+    """
+    Checks the in-memory medal standings against the aggregation
+    over the Medal collection without modifying them.
+    """
+    return medal_standings.check()
+
+
+@router.post("/reference/reload")
+async def reload_reference_data():
+    """
+    Reloads the sports and sub-sports from the database,
+    then rebuilds the medal projections which embed their names.
+    The other processes reload them too.
+    """
+
+    def reload():
+        reference_data.reload()
+        medal_projections.rebuild()
+
+    await run_in_threadpool(reload)
+    await invalidation_bus.notify(SPORT_DETAIL, SUB_SPORT)
+    return {"sports": len(reference_data.sports())}
+
+
+@router.get("/stats")
+def get_stats():
+    """
+    Returns the counters of the in-process caches, of the medal stream and writes,
+    of the connection pools and the execution times of the aggregation pipelines.
+    """
+    return {
+        "key_cache": key_cache.stats(),
+        "audience_stats": audience_stats.stats(),
+        "medal_stream": medal_broadcaster.stats(),
+        "medal_writes": medal_coalescer.stats(),
+        "invalidation": invalidation_bus.stats(),
+        "pipelines": pipeline_timings.stats(),
+        "pools": {client: metrics.stats() for client, metrics in pool_metrics.items()},
+    }
+
+
+@router.post("/keys/invalidate")
+def invalidate_key_cache():
+    """
+    Drops every cached key, for instance after keys were revoked in the database.
+    """
+    key_cache.invalidate()
+    return {"key_cache": key_cache.stats()}
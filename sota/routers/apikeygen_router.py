@@ -1,6 +1,9 @@
+from enum import Enum
 from typing import Dict
 from fastapi import APIRouter, HTTPException
-from ..database_connection import keys_collection
+from ..database_connection import async_keys_collection
+from ..invalidation import invalidation_bus, KEYS
+from ..key_cache import key_cache
 from pydantic import BaseModel
 from .deps.auth_deps import AuthScope
 import random, string
@@ -8,12 +11,22 @@ import random, string
 router = APIRouter(tags=["keygen"])
 
 
+class KeygenScope(Enum):
+    """
+    The scopes a key can be generated with. ADMIN is left out, an admin key
+    is only inserted in the Keys collection by an operator.
+    """
+
+    PUBLISH_MEDAL = AuthScope.PUBLISH_MEDAL.value
+    PUBLISH_AUDIENCE = AuthScope.PUBLISH_AUDIENCE.value
+
+
 class ScopeDict(BaseModel):
-    scope: Dict[AuthScope, bool]
+    scope: Dict[KeygenScope, bool]
 
 
 @router.post("/")
-def gen_new_key(scope: ScopeDict):
+async def gen_new_key(scope: ScopeDict):
     """
     Generate 20 character long key,
     check permissions via payload (body),
@@ -36,14 +49,17 @@ def gen_new_key(scope: ScopeDict):
         key = "".join(
             random.choices(string.ascii_letters + string.digits, k=20)
         )  # alpha-numeric
-        if not keys_collection.find_one({"key": key}):
+        if not await async_keys_collection.find_one({"key": key}):
             break
 
-    keys_collection.insert_one(
+    await async_keys_collection.insert_one(
         {
             "key": key,
             "scope": {perm.value: state for perm, state in scope.scope.items()},
         }
     )
+    # the key may have been cached as unknown before it existed
+    key_cache.invalidate(key)
+    await invalidation_bus.notify(KEYS)
 
     return {"key": key}
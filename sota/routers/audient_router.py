@@ -1,17 +1,30 @@
 # Standard library imports
-from typing import List
+import json
+from typing import AsyncIterator, List, Optional
 
 # Third-party imports
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel, Field, validator
-import pycountry
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, validator, model_validator
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from decouple import config
 
 # Local application imports
-from ..database_connection import audient_collection, sport_detail_collection
+from ..audience_stats import audience_stats, Dimension
+from ..countries import unknown_countries
+from ..data_versions import data_versions, AUDIENCE
+from ..database_connection import async_audient_collection, async_read_audient_collection
+from ..invalidation import invalidation_bus, AUDIENT
+from ..reference_data import reference_data
 from .deps.auth_deps import check_auth_key, CheckPermissionsOfKey, AuthScope
+from .deps.cache_deps import ConditionalGet
 
 
-country_codes = [country.alpha_2 for country in pycountry.countries]
+bulk_chunk_size = config("AUDIENT_BULK_CHUNK_SIZE", default=1000, cast=int)
+page_size = config("AUDIENT_PAGE_SIZE", default=1000, cast=int)
+max_page_size = config("AUDIENT_MAX_PAGE_SIZE", default=10000, cast=int)
+genders = frozenset({"M", "F", "N"})
 router = APIRouter(prefix="/audient", tags=["audient"])
 
 
@@ -24,43 +37,130 @@ class RequestAudientData(BaseModel):
 
     @validator("gender")
     def validate_gender(cls, value):
-        allowed_values = {"M", "F", "N"}
-        if value not in allowed_values:
+        if value not in genders:
             raise ValueError(
                 f"Invalid value for gender {value}. It must be 'M', 'F', or 'N'."
             )
         return value
 
-    @validator("country_code")
-    def validate_country_code(cls, value):
-        if value not in country_codes:
-            raise ValueError(f"Country {value} doesn't exist")
-        return value
-
-    @validator("sport_id", each_item=True)
-    def validate_sport_id(cls, value):
-        if not sport_detail_collection.find_one({"sport_id": value}):
-            raise ValueError(f"The sport_id {value} doesn't exist")
-        return value
-
 
 class RequestListOfAudientData(BaseModel):
     audience: List[RequestAudientData]
 
-
-def convert_data(data):
-    return {
-        "country_code": data["country_code"],
-        "sport_id": data["sport_id"],
-        "gender": data["gender"],
-        "age": data["age"],
-    }
+    @model_validator(mode="after")
+    def validate_country_codes(self):
+        """
+        Checks the country codes of the whole audience at once.
+        """
+        unknown = unknown_countries(item.country_code for item in self.audience)
+        if unknown:
+            raise ValueError(f"Country {', '.join(sorted(unknown))} doesn't exist")
+        return self
+
+    @model_validator(mode="after")
+    def validate_sport_ids(self):
+        """
+        Checks the sport ids of the whole audience at once against the reference data.
+        """
+        missing_sport_ids = sorted(
+            reference_data.missing_sport_ids(
+                sport_id for item in self.audience for sport_id in item.sport_id
+            )
+        )
+        if missing_sport_ids:
+            raise ValueError(
+                f"The sport_id {', '.join(map(str, missing_sport_ids))} doesn't exist"
+            )
+        return self
 
 
-@router.get("")
-def get_audient():
-    audient_all = [convert_data(audient) for audient in audient_collection.find()]
-    return audient_all
+class AudientInfo(BaseModel):
+    country_code: str
+    sport_id: List[int]
+    gender: str
+    age: int
+
+
+# fields returned by the read routes, `_id` is only fetched as the page cursor
+AUDIENT_PROJECTION = {"_id": 0, "country_code": 1, "sport_id": 1, "gender": 1, "age": 1}
+
+
+@router.get("", dependencies=[Depends(ConditionalGet(AUDIENCE))])
+async def get_audient(
+    response: Response,
+    limit: int = Query(default=page_size, ge=1, le=max_page_size),
+    after: Optional[str] = None,
+) -> List[AudientInfo]:
+    """
+    Gets a page of the audience ordered by id, `limit` people after the id `after`.
+
+    The id to pass as `after` to get the next page is returned in the
+    `X-Next-Cursor` header, which is missing on the last page.
+    """
+    query = {"_id": {"$gt": after}} if after is not None else {}
+    documents = (
+        await async_read_audient_collection.find(query, {**AUDIENT_PROJECTION, "_id": 1})
+        .sort("_id", ASCENDING)
+        .limit(limit + 1)
+        .to_list(None)
+    )
+    if len(documents) > limit:
+        documents = documents[:limit]
+        response.headers["X-Next-Cursor"] = str(documents[-1]["_id"])
+    for document in documents:
+        del document["_id"]
+    return documents
+
+
+async def ndjson_lines(cursor) -> AsyncIterator[str]:
+    async for document in cursor:
+        yield json.dumps(document) + "\n"
+
+
+@router.get("/stream", dependencies=[Depends(ConditionalGet(AUDIENCE))])
+async def stream_audient(response: Response):
+    """
+    Streams the whole audience as newline-delimited JSON, one person per line,
+    written as the cursor yields them.
+    """
+    cursor = async_read_audient_collection.find({}, AUDIENT_PROJECTION).batch_size(
+        page_size
+    )
+    # the cache headers set on `response` are not applied to a returned response
+    return StreamingResponse(
+        ndjson_lines(cursor),
+        media_type="application/x-ndjson",
+        headers=dict(response.headers),
+    )
+
+
+@router.get("/stats", dependencies=[Depends(ConditionalGet(AUDIENCE))])
+async def get_audient_stats():
+    """
+    Gets the number of people by country, sport, gender and age bucket.
+    """
+    return await audience_stats.summary()
+
+
+@router.get("/stats/{dimension}", dependencies=[Depends(ConditionalGet(AUDIENCE))])
+async def get_audient_counts(dimension: Dimension):
+    """
+    Gets the number of people by country, sport, gender or age bucket.
+    """
+    return await audience_stats.counts(dimension)
+
+
+@router.get(
+    "/stats/{rows}/{columns}", dependencies=[Depends(ConditionalGet(AUDIENCE))]
+)
+async def get_audient_crosstab(rows: Dimension, columns: Dimension):
+    """
+    Gets the number of people by two dimensions, for instance
+    `/stats/sport/country` as {sport_id: {country_code: count}}.
+    """
+    if rows is columns:
+        raise HTTPException(400, detail="The dimensions must be different")
+    return await audience_stats.crosstab(rows, columns)
 
 
 @router.post(
@@ -71,7 +171,61 @@ def get_audient():
     ],
 )
 async def update_audient_info(data: RequestListOfAudientData):
-    audient_data = data.model_dump()
-    for item in audient_data["audience"]:
-        audient_collection.update_one({"_id": item["id"]}, {"$set": item}, upsert=True)
-    return {"Success": audient_data}
+    """
+    Upserts the audience with unordered bulk writes of `AUDIENT_BULK_CHUNK_SIZE`
+    documents each. A person listed more than once gets their last entry.
+
+    Returns a summary of the writes instead of the audience. The people whose
+    write failed are counted as `failed` and listed in `errors` with the reason;
+    if a chunk fails as a whole, the chunks after it are not written either and
+    the error is reported for the chunk.
+    """
+    audience = {item.id: item.model_dump() for item in data.audience}
+    audient_ids = list(audience)
+    requests = [
+        UpdateOne({"_id": audient_id}, {"$set": item}, upsert=True)
+        for audient_id, item in audience.items()
+    ]
+
+    summary = {
+        "received": len(data.audience),
+        "matched": 0,
+        "modified": 0,
+        "upserted": 0,
+        "failed": 0,
+    }
+    errors = []
+    sent = False
+    try:
+        for start in range(0, len(requests), bulk_chunk_size):
+            sent = True
+            try:
+                result = await async_audient_collection.bulk_write(
+                    requests[start : start + bulk_chunk_size], ordered=False
+                )
+            except BulkWriteError as e:
+                # the other writes of an unordered chunk are done anyway
+                summary["matched"] += e.details["nMatched"]
+                summary["modified"] += e.details["nModified"]
+                summary["upserted"] += e.details["nUpserted"]
+                summary["failed"] += len(e.details["writeErrors"])
+                errors.extend(
+                    {"id": audient_ids[start + error["index"]], "detail": error["errmsg"]}
+                    for error in e.details["writeErrors"]
+                )
+                continue
+            except PyMongoError as e:
+                summary["failed"] += len(requests) - start
+                errors.append({"chunk": start // bulk_chunk_size, "detail": str(e)})
+                break
+            summary["matched"] += result.matched_count
+            summary["modified"] += result.modified_count
+            summary["upserted"] += result.upserted_count
+    finally:
+        # the chunks written before a failure are committed
+        if sent:
+            data_versions.bump(AUDIENCE)
+            await invalidation_bus.notify(AUDIENT)
+    if errors:
+        return {"Success": summary, "errors": errors}
+    return {"Success": summary}
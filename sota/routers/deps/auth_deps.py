@@ -1,7 +1,8 @@
 from typing import Annotated, List, Dict
 from enum import Enum
 from fastapi import Request, Header, HTTPException
-from ...database_connection import keys_collection
+from ...database_connection import async_keys_collection
+from ...key_cache import key_cache
 
 resp401 = HTTPException(status_code=401, detail="Unauthorized access")
 authorization_type = "Bearer"
@@ -10,9 +11,10 @@ authorization_type = "Bearer"
 class AuthScope(Enum):
     PUBLISH_MEDAL = "PUBLISH_MEDAL"
     PUBLISH_AUDIENCE = "PUBLISH_AUDIENCE"
+    ADMIN = "ADMIN"
 
 
-def check_auth_key(request: Request):
+async def check_auth_key(request: Request):
     try:
         authorization = request.headers["authorization"]
     except KeyError:
@@ -22,7 +24,10 @@ def check_auth_key(request: Request):
     key: str = authorization.removeprefix(authorization_type).strip()
     if len(key) != 20:
         raise resp401
-    key_doc_queried = keys_collection.find_one({"key": key})
+    found, key_doc_queried = key_cache.get(key)
+    if not found:
+        key_doc_queried = await async_keys_collection.find_one({"key": key})
+        key_cache.put(key, key_doc_queried)
     if not key_doc_queried:
         raise resp401
     request.state.key = key_doc_queried
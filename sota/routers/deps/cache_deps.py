@@ -0,0 +1,52 @@
+from typing import Optional
+from fastapi import Request, Response, HTTPException
+from decouple import config
+from ...data_versions import data_versions
+
+cache_max_age = config("HTTP_CACHE_MAX_AGE", default=5, cast=int)
+cache_stale_while_revalidate = config(
+    "HTTP_CACHE_STALE_WHILE_REVALIDATE", default=30, cast=int
+)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag, as required by RFC 9110.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+class ConditionalGet:
+    """
+    A class dependency making the responses of a read route cacheable.
+
+    The ETag of the response is built from the versions of the data names given
+    in constructor. A request whose If-None-Match holds the current ETag gets
+    a 304 without the route running, other responses get the ETag and
+    the `Cache-Control` header.
+    """
+
+    def __init__(
+        self,
+        *data: str,
+        max_age: int = cache_max_age,
+        stale_while_revalidate: int = cache_stale_while_revalidate,
+    ):
+        self.data = data
+        self.cache_control = (
+            f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+        )
+
+    def __call__(self, request: Request, response: Response) -> None:
+        etag = data_versions.etag(*self.data)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
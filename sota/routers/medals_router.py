@@ -1,52 +1,44 @@
 # Standard library imports
-from typing import List
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, List
 
 # Third-party imports
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field, model_validator
-import pycountry
 
 # Local application imports
-from ..database_connection import medal_collection, sub_sport_collection
+from ..broadcaster import medal_broadcaster
+from ..countries import unknown_countries
+from ..data_versions import data_versions, MEDALS
+from ..invalidation import invalidation_bus, MEDAL
+from ..medal_writer import medal_coalescer, FAILED
+from ..standings import medal_standings
+from ..projections import medal_projections
+from ..reference_data import reference_data
 from .deps.auth_deps import check_auth_key, CheckPermissionsOfKey, AuthScope
+from .deps.cache_deps import ConditionalGet
 
 
-country_codes = [country.alpha_2 for country in pycountry.countries]
 router = APIRouter(prefix="/medals", tags=["medals"])
+# a single thread applies the written medals in the order the writes returned,
+# the callers of a coalesced commit in the order they arrived, so the read
+# models and the medal stream end with the medals of the last write
+apply_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="medal-apply")
 
 
-@router.get("")
-def get_medals():
-    pipeline = [
-        {"$unwind": {"path": "$sports"}},
-        {
-            "$group": {
-                "_id": "$country_code",
-                "gold": {"$sum": "$sports.gold"},
-                "silver": {"$sum": "$sports.silver"},
-                "bronze": {"$sum": "$sports.bronze"},
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "data": {
-                    "$push": {
-                        "k": "$_id",
-                        "v": {
-                            "gold": "$gold",
-                            "silver": "$silver",
-                            "bronze": "$bronze",
-                        },
-                    }
-                },
-            }
-        },
-        {"$replaceRoot": {"newRoot": {"$arrayToObject": "$data"}}},
-    ]
-
-    medals = list(medal_collection.aggregate(pipeline))
-    return medals[0] if medals else {}
+class MedalTotals(BaseModel):
+    gold: int
+    silver: int
+    bronze: int
+
+
+@router.get("", dependencies=[Depends(ConditionalGet(MEDALS))])
+def get_medals() -> Dict[str, MedalTotals]:
+    """
+    Returns the medal totals of every country from the in-memory standings.
+    """
+    return medal_standings.table()
 
 
 class RequestMedal(BaseModel):
@@ -70,10 +62,7 @@ class RequestUpdateMedal(BaseModel):
         sport_id = self.sport_id
         sport_type_id = self.sport_type_id
 
-        result = sub_sport_collection.find_one(
-            {"sport_id": sport_id, "type_id": sport_type_id}
-        )
-        if not result:
+        if not reference_data.sub_sport(sport_id, sport_type_id):
             raise ValueError(
                 f"The sport_id {sport_id} and type_id {sport_type_id} don't exist",
             )
@@ -88,25 +77,41 @@ class RequestUpdateMedal(BaseModel):
         # Fetch the participating countries for the given sport and type
         participating_countries = get_participating_countries(sport_id, sport_type_id)
 
-        # Loop through all participants to verify their country's participation
-        for participant in participants:
-            country = participant.country
-            if country not in country_codes:
-                raise ValueError(f"Country {country} doesn't exist")
-            if country not in participating_countries:
-                raise ValueError(
-                    f"Country {country} is not participating in the given sport_id {sport_id} and type_id {sport_type_id}"
-                )
+        # Check the countries of all participants at once
+        countries = {participant.country for participant in participants}
+        unknown = unknown_countries(countries)
+        if unknown:
+            raise ValueError(f"Country {', '.join(sorted(unknown))} doesn't exist")
+        not_participating = countries.difference(participating_countries)
+        if not_participating:
+            raise ValueError(
+                f"Country {', '.join(sorted(not_participating))} is not participating in the given sport_id {sport_id} and type_id {sport_type_id}"
+            )
         return self
 
 
 # Helper function to retrieve participating countries based on sport and type.
-def get_participating_countries(sport_id: int, sport_type_id: int) -> list:
-    # Query the database to find the details of the sport type.
-    detail = sub_sport_collection.find_one(
-        {"sport_id": sport_id, "type_id": sport_type_id}
-    )
-    return detail["participating_countries"] if detail else []
+def get_participating_countries(sport_id: int, sport_type_id: int) -> FrozenSet[str]:
+    # Look up the details of the sport type in the reference data.
+    return reference_data.participating_countries(sport_id, sport_type_id)
+
+
+def apply_medals(sport_id: int, sport_type_id: int, medals: Dict[str, Dict[str, int]]) -> None:
+    """
+    Applies the medals written for some countries to the read models,
+    then publishes them on the medal stream.
+    """
+    for country_code, medal in medals.items():
+        medal_standings.apply(country_code, sport_id, sport_type_id, medal)
+    medal_projections.apply(sport_id, sport_type_id, medals)
+    if medals:
+        data_versions.bump(MEDALS)
+        medal_broadcaster.publish(
+            [
+                {"country": country_code, "sport_id": sport_id, "type_id": sport_type_id, **medal}
+                for country_code, medal in medals.items()
+            ]
+        )
 
 
 @router.post(
@@ -117,50 +122,42 @@ def get_participating_countries(sport_id: int, sport_type_id: int) -> list:
     ],
 )
 async def update_medal(data: RequestUpdateMedal):
-    for request_participant in data.participants:
-        country_code = request_participant.country
-        sport_data = {
-            "sport_id": data.sport_id,
-            "type_id": data.sport_type_id,
-            "gold": request_participant.medal.gold,
-            "silver": request_participant.medal.silver,
-            "bronze": request_participant.medal.bronze,
+    """
+    Writes the medals of every participant in a single bulk write, shared with
+    the concurrent updates when `MEDAL_COALESCE_WINDOW_MS` is set.
+    A country listed more than once gets the medals of its last entry.
+
+    Returns the outcome of every participant: `updated`, `added` or `created`
+    when its medals were written, `failed` with the reason otherwise.
+    """
+    medals = {
+        participant.country: participant.medal.model_dump()
+        for participant in data.participants
+    }
+    results = await medal_coalescer.write(
+        {
+            (country_code, data.sport_id, data.sport_type_id): medal
+            for country_code, medal in medals.items()
         }
+    )
 
-        # Attempt to update existing document or create a new one using $elemMatch
-        updated = medal_collection.update_one(
-            {
-                "country_code": country_code,
-                "sports": {
-                    "$elemMatch": {
-                        "sport_id": data.sport_id,
-                        "type_id": data.sport_type_id,
-                    }
-                },
-            },
-            {
-                "$set": {
-                    "sports.$.gold": request_participant.medal.gold,
-                    "sports.$.silver": request_participant.medal.silver,
-                    "sports.$.bronze": request_participant.medal.bronze,
-                }
-            },
-        ).matched_count
-
-        if not updated:
-            # If not updated, either push to sports or insert a new document
-            updated = medal_collection.update_one(
-                {"country_code": country_code}, {"$push": {"sports": sport_data}}
-            ).matched_count
-
-            if not updated:
-                country_name = pycountry.countries.get(alpha_2=country_code).name
-                medal_collection.insert_one(
-                    {
-                        "country_code": country_code,
-                        "country_name": country_name,
-                        "sports": [sport_data],
-                    }
-                )
-
-    return {"Success": data}
+    written = {
+        country_code: medals[country_code]
+        for (country_code, _, _), result in results.items()
+        if result["result"] != FAILED
+    }
+    # writing the shared snapshot waits for its lock, which another worker
+    # may hold while it loads the medals, so it is done off the event loop
+    await asyncio.get_running_loop().run_in_executor(
+        apply_executor, apply_medals, data.sport_id, data.sport_type_id, written
+    )
+    if written:
+        await invalidation_bus.notify(MEDAL)
+
+    return {
+        "Success": data,
+        "results": [
+            {"country": country_code, **result}
+            for (country_code, _, _), result in results.items()
+        ],
+    }
@@ -0,0 +1,159 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..audience_stats import audience_stats
+from ..broadcaster import medal_broadcaster
+from ..key_cache import key_cache
+from ..metrics import Exposition, command_metrics, request_metrics
+from ..pipelines import pipeline_timings
+from ..pool_metrics import pool_metrics
+
+router = APIRouter(tags=["metrics"])
+
+# counters of the pool metrics, the others are gauges
+POOL_COUNTERS = {
+    "checkouts": "Connections checked out of the pool.",
+    "checkout_failures": "Checkouts which failed.",
+    "exhausted": "Checkouts which timed out waiting for a connection.",
+    "created": "Connections created.",
+    "closed": "Connections closed.",
+    "cleared": "Times the pool was cleared.",
+}
+POOL_GAUGES = {
+    "in_use": "Connections checked out right now.",
+    "max_in_use": "Peak of the connections checked out.",
+    "open": "Connections open.",
+}
+
+
+def render_metrics() -> str:
+    """
+    Renders every metric from the counters kept in memory,
+    without querying the database.
+    """
+    exposition = Exposition()
+
+    in_flight, requests, latency = request_metrics.snapshot()
+    exposition.family(
+        "sota_http_requests_in_flight",
+        "gauge",
+        "Requests being served.",
+        [((), in_flight)],
+    )
+    exposition.family(
+        "sota_http_requests_total",
+        "counter",
+        "Requests served, by route and status.",
+        [
+            ((("method", method), ("route", route), ("status", status)), count)
+            for (method, route, status), count in sorted(requests.items())
+        ],
+    )
+    exposition.histogram(
+        "sota_http_request_duration_seconds",
+        "Latency of the requests, by route.",
+        [
+            ((("method", method), ("route", route)), histogram)
+            for (method, route), histogram in sorted(latency.items())
+        ],
+    )
+
+    durations = []
+    failures = []
+    for client, metrics in command_metrics.items():
+        client_durations, client_failures = metrics.snapshot()
+        for (collection, command), histogram in sorted(client_durations.items()):
+            labels = (("client", client), ("collection", collection), ("command", command))
+            durations.append((labels, histogram))
+        for (collection, command), count in sorted(client_failures.items()):
+            labels = (("client", client), ("collection", collection), ("command", command))
+            failures.append((labels, count))
+    exposition.histogram(
+        "sota_mongo_command_duration_seconds",
+        "Duration of the Mongo commands, by collection and command.",
+        durations,
+    )
+    exposition.family(
+        "sota_mongo_command_failures_total",
+        "counter",
+        "Mongo commands which failed, by collection and command.",
+        failures,
+    )
+
+    pools = {client: metrics.stats() for client, metrics in pool_metrics.items()}
+    for name, help in POOL_COUNTERS.items():
+        exposition.family(
+            f"sota_mongo_pool_{name}_total",
+            "counter",
+            help,
+            [((("client", client),), stats[name]) for client, stats in pools.items()],
+        )
+    for name, help in POOL_GAUGES.items():
+        exposition.family(
+            f"sota_mongo_pool_{name}",
+            "gauge",
+            help,
+            [((("client", client),), stats[name]) for client, stats in pools.items()],
+        )
+    exposition.family(
+        "sota_mongo_pool_wait_seconds_total",
+        "counter",
+        "Time spent waiting for a connection by the successful checkouts.",
+        [
+            ((("client", client),), stats["wait_ms_total"] / 1000)
+            for client, stats in pools.items()
+        ],
+    )
+
+    caches = {"key": key_cache.stats(), "audience_stats": audience_stats.stats()}
+    for name, kind, help in (
+        ("hits", "counter", "Lookups answered by the cache."),
+        ("misses", "counter", "Lookups missing the cache."),
+        ("hit_ratio", "gauge", "Ratio of the lookups answered by the cache."),
+        ("size", "gauge", "Entries in the cache."),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        exposition.family(
+            f"sota_cache_{name}{suffix}",
+            kind,
+            help,
+            [((("cache", cache),), stats[name]) for cache, stats in caches.items()],
+        )
+
+    pipelines = sorted(pipeline_timings.stats().items())
+    exposition.family(
+        "sota_pipeline_runs_total",
+        "counter",
+        "Runs of the aggregation pipelines.",
+        [((("pipeline", name),), timing["runs"]) for name, timing in pipelines],
+    )
+    exposition.family(
+        "sota_pipeline_duration_seconds_total",
+        "counter",
+        "Time spent running the aggregation pipelines.",
+        [((("pipeline", name),), timing["total_ms"] / 1000) for name, timing in pipelines],
+    )
+
+    stream = medal_broadcaster.stats()
+    exposition.family(
+        "sota_medal_stream_subscribers",
+        "gauge",
+        "Clients subscribed to the medal stream.",
+        [((), stream["subscribers"])],
+    )
+    exposition.family(
+        "sota_medal_stream_dropped_total",
+        "counter",
+        "Subscribers dropped for falling behind the medal stream.",
+        [((), stream["dropped"])],
+    )
+    return exposition.text()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Returns the metrics of the app in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,47 +1,67 @@
-from typing import Optional, Dict
-from fastapi import APIRouter
-from ..database_connection import sport_detail_collection, sub_sport_collection
+from typing import Optional, Dict, List, Union
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, ConfigDict
+from ..data_versions import REFERENCE
+from ..reference_data import reference_data
+from ..responses import EmptyObject
+from .deps.cache_deps import ConditionalGet
 
 
-router = APIRouter(prefix="/sport", tags=["sport"])
+router = APIRouter(
+    prefix="/sport",
+    tags=["sport"],
+    dependencies=[Depends(ConditionalGet(REFERENCE))],
+)
 
 
-def retrieve_sport_info(sport_id: Optional[int] = None):
-    """
-    Returns a PyMongo's cursor from aggregation, the pipeline works as follow:
+class SportType(BaseModel):
+    # fields added to the reference data are returned as they are
+    model_config = ConfigDict(extra="allow")
 
-    - Matches the sport_id if given,
-    - Project the root data with everything except: _id
-    - Lookup from the sub sport type collection and
-      join the output as `sport_types`
-    """
+    type_id: int
+    type_name: str
+    participating_countries: List[str]
 
-    match_op: Optional[Dict] = None
-    if sport_id:
-        match_op = {"$match": {"sport_id": sport_id}}
 
-    projection_op = {"$project": {"_id": 0, "sport_id": 0}}
+class SportDetail(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    sport_id: int
+    sport_name: str
+    sport_summary: str
+    participating_countries: List[str]
+    sport_types: List[SportType]
 
-    lookup_op: Dict = {
-        "$lookup": {
-            "from": sub_sport_collection.name,
-            "localField": "sport_id",
-            "foreignField": "sport_id",
-            "as": "sport_types",
-            "pipeline": [projection_op],
-        }
-    }
 
-    pipeline = []
-    if match_op:
-        pipeline.append(match_op)
-    pipeline.extend(({"$project": {"_id": 0}}, lookup_op))
+def retrieve_sport_info(sport_id: Optional[int] = None) -> List[Dict]:
+    """
+    Returns the sport details from the reference data as follow:
+
+    - Only the sport with sport_id if given, every sport otherwise,
+    - Everything except: _id
+    - The sub sport types of the sport joined as `sport_types`,
+      without their _id and sport_id
+    """
+    if sport_id is None:
+        sports = reference_data.sports()
+    else:
+        sport = reference_data.sport(sport_id)
+        sports = [sport] if sport else []
 
-    return sport_detail_collection.aggregate(pipeline)
+    return [
+        {
+            **sport,
+            "sport_types": [
+                {key: value for key, value in sport_type.items() if key != "sport_id"}
+                for sport_type in reference_data.sub_sports_of(sport["sport_id"])
+            ],
+        }
+        for sport in sports
+    ]
 
 
 @router.get("/all")
-def get_all_sport():
+def get_all_sport() -> List[SportDetail]:
     """
     Gets all sport details from collection as list.
     """
@@ -49,7 +69,7 @@ def get_all_sport():
 
 
 @router.get("/{sport_id}")
-def get_sport_by_id(sport_id: int):
+def get_sport_by_id(sport_id: int) -> Union[SportDetail, EmptyObject]:
     """
     Gets a specific sport details as object or blank object if not found.
     """
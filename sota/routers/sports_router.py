@@ -1,29 +1,21 @@
-from fastapi import APIRouter
-from ..database_connection import sport_detail_collection
+from typing import Dict
+from fastapi import APIRouter, Depends
+from ..data_versions import REFERENCE
+from ..reference_data import reference_data
+from .deps.cache_deps import ConditionalGet
 
-router = APIRouter(prefix="/sports", tags=["sports"])
+router = APIRouter(
+    prefix="/sports",
+    tags=["sports"],
+    dependencies=[Depends(ConditionalGet(REFERENCE))],
+)
 
 
 @router.get("")
-def get_all_sports_id():
-
-    sport_pairs = sport_detail_collection.aggregate(
-        [
-            {
-                "$replaceRoot": {
-                    "newRoot": {
-                        "$arrayToObject": [
-                            [{"k": {"$toString": "$sport_id"}, "v": "$sport_name"}]
-                        ]
-                    }
-                }
-            }
-        ]
-    )
-
-    res = dict()
-    for entry in sport_pairs:
-        item = list(entry.items())[0]
-        res[item[0]] = item[1]
-
-    return res
+def get_all_sports_id() -> Dict[str, str]:
+    """
+    Gets the name of every sport keyed by its id.
+    """
+    return {
+        str(sport["sport_id"]): sport["sport_name"] for sport in reference_data.sports()
+    }
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from decouple import config
+from ..broadcaster import medal_broadcaster, Subscription, RESET
+
+heartbeat_interval = config("MEDAL_STREAM_HEARTBEAT", default=15, cast=float)
+router = APIRouter(prefix="/medals/stream", tags=["medals"])
+
+
+async def sse_events(
+    subscription: Subscription, heartbeat: float = heartbeat_interval
+) -> AsyncIterator[str]:
+    """
+    Formats the events of a subscription as Server-Sent Events.
+
+    Medal changes are `medal` events and `reset` asks the client to refetch
+    the medals. Their id is the resume token, sent back by browsers in the
+    `Last-Event-ID` header when they reconnect. A comment is sent when
+    no event came within `heartbeat` seconds to keep proxies from closing
+    the connection.
+    """
+    try:
+        while True:
+            try:
+                item = await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if item is None:
+                yield f"event: reset\ndata: {json.dumps(RESET)}\n\n"
+                return
+            token, event = item
+            name = "reset" if event is RESET else "medal"
+            yield f"id: {token}\nevent: {name}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        medal_broadcaster.unsubscribe(subscription)
+
+
+@router.get("")
+async def stream_medals(
+    resume: Optional[str] = Query(default=None),
+    last_event_id: Optional[str] = Header(default=None),
+):
+    """
+    Streams the medal changes as Server-Sent Events.
+
+    Each event names the country, sport, type and new medal counts. Clients
+    resume after the event whose id is given as `Last-Event-ID` or `resume`,
+    from the worker which sent it, see the README.
+    """
+    subscription = medal_broadcaster.subscribe(resume or last_event_id)
+    return StreamingResponse(
+        sse_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_medals_ws(websocket: WebSocket, resume: Optional[str] = None):
+    """
+    Streams the medal changes over a WebSocket as {"token": .., "event": ..} messages,
+    resuming after the `resume` token if given.
+    """
+    await websocket.accept()
+    subscription = medal_broadcaster.subscribe(resume)
+    try:
+        while True:
+            item = await subscription.get()
+            if item is None:
+                await websocket.send_json({"token": None, "event": RESET})
+                await websocket.close()
+                return
+            token, event = item
+            await websocket.send_json({"token": token, "event": event})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        medal_broadcaster.unsubscribe(subscription)
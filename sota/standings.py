@@ -0,0 +1,235 @@
+import threading
+from typing import Dict, Optional, Tuple
+from .countries import country_name
+from .database_connection import medal_collection
+from .medal_layout import MEDAL_TYPES, country_totals, load_facts, reads_flat
+from .medal_snapshot import MedalSnapshot, medal_snapshot
+from .pipelines import Pipeline
+
+# Aggregates the total of each medal type per country as {country_code: counts}
+MEDAL_TOTALS_PIPELINE = [
+    {"$unwind": {"path": "$sports"}},
+    {
+        "$group": {
+            "_id": "$country_code",
+            "gold": {"$sum": "$sports.gold"},
+            "silver": {"$sum": "$sports.silver"},
+            "bronze": {"$sum": "$sports.bronze"},
+        }
+    },
+    {
+        "$group": {
+            "_id": None,
+            "data": {
+                "$push": {
+                    "k": "$_id",
+                    "v": {
+                        "gold": "$gold",
+                        "silver": "$silver",
+                        "bronze": "$bronze",
+                    },
+                }
+            },
+        }
+    },
+    {"$replaceRoot": {"newRoot": {"$arrayToObject": "$data"}}},
+]
+MEDAL_TOTALS = Pipeline("medal_totals", MEDAL_TOTALS_PIPELINE)
+
+
+def load_medals(collection) -> Tuple[Dict, Dict[str, str]]:
+    """
+    Reads the counts of every (country, sport, type) cell and the names of
+    the countries from the Medal collection.
+    """
+    cells = {}
+    names = {}
+    for document in collection.find(
+        {}, {"_id": 0, "country_code": 1, "country_name": 1, "sports": 1}
+    ):
+        country_code = document["country_code"]
+        names[country_code] = document.get("country_name", country_code)
+        for sport in document.get("sports", []):
+            cells[(country_code, sport["sport_id"], sport["type_id"])] = tuple(
+                sport[medal] for medal in MEDAL_TYPES
+            )
+    return cells, names
+
+
+def read_medals(collection) -> Tuple[Dict, Dict[str, str]]:
+    """
+    Reads the cells and the names of the countries from the layout set by `MEDAL_LAYOUT`,
+    `collection` being the Medal collection of the embedded layout.
+    """
+    if reads_flat():
+        return load_facts()
+    return load_medals(collection)
+
+
+def shared_snapshot(snapshot: MedalSnapshot) -> Optional[MedalSnapshot]:
+    """
+    Returns the snapshot mapped, None unless `MEDAL_SNAPSHOT` is enabled.
+    """
+    if not snapshot.enabled:
+        return None
+    snapshot.open()
+    return snapshot
+
+
+class MedalStandings:
+    """
+    In-memory read model of the medal table, the per country totals of
+    gold, silver and bronze medals served by `GET /medals`.
+
+    The table is built once from the Medal collection, then kept up to date
+    by applying the change of every (country, sport, type) cell written by
+    `update_medal`, so reads never go to the database.
+
+    The table served to readers is never mutated in place, every change
+    replaces it with an updated copy.
+
+    With `MEDAL_SNAPSHOT` enabled, the cells and the totals are kept in the
+    snapshot shared by the workers instead, which is built by the first one.
+    """
+
+    def __init__(self, collection=medal_collection, snapshot: MedalSnapshot = medal_snapshot):
+        self._collection = collection
+        self._snapshot = snapshot
+        self._lock = threading.Lock()
+        self._cells: Dict[Tuple[str, int, int], Tuple[int, int, int]] = {}
+        self._table: Dict[str, Dict[str, int]] = {}
+        self._loaded = False
+        # sequence of the snapshot the table was read at
+        self._sequence: Optional[int] = None
+
+    def rebuild(self) -> None:
+        """
+        Builds the whole table from the documents of the Medal collection.
+        """
+        shared = shared_snapshot(self._snapshot)
+        if shared is not None:
+            shared.publish(*read_medals(self._collection))
+            return
+        with self._lock:
+            cells, _ = read_medals(self._collection)
+            table = {}
+            for (country_code, _, _), counts in cells.items():
+                totals = table.setdefault(country_code, dict.fromkeys(MEDAL_TYPES, 0))
+                for medal, count in zip(MEDAL_TYPES, counts):
+                    totals[medal] += count
+            self._cells = cells
+            self._table = table
+            self._loaded = True
+
+    def load(self) -> None:
+        """
+        Builds the table, unless another worker already published the shared snapshot.
+        """
+        shared = shared_snapshot(self._snapshot)
+        if shared is None:
+            self.rebuild()
+        else:
+            shared.publish_once(lambda: read_medals(self._collection))
+
+    def invalidate(self) -> None:
+        """
+        Drops the table, it is rebuilt from the database on the next read.
+
+        The shared snapshot is kept, the workers of the server write it
+        before telling the others, which only read their table from it again.
+        `rebuild` publishes it again from the database.
+        """
+        with self._lock:
+            self._cells = {}
+            self._table = {}
+            self._loaded = False
+            self._sequence = None
+
+    def apply(
+        self, country_code: str, sport_id: int, type_id: int, medal: Dict[str, int]
+    ) -> None:
+        """
+        Applies the new medal counts of a (country, sport, type) cell
+        to the totals of its country.
+        """
+        shared = shared_snapshot(self._snapshot)
+        if shared is not None:
+            if shared.ready:
+                counts = tuple(medal[name] for name in MEDAL_TYPES)
+                shared.update({(country_code, sport_id, type_id): counts}, country_name)
+            return
+        with self._lock:
+            if not self._loaded:
+                # nothing to keep up to date, the next read loads the written data
+                return
+            key = (country_code, sport_id, type_id)
+            new = tuple(medal[name] for name in MEDAL_TYPES)
+            old = self._cells.get(key, (0, 0, 0))
+            self._cells[key] = new
+
+            counts = dict(self._table.get(country_code, dict.fromkeys(MEDAL_TYPES, 0)))
+            for name, old_count, new_count in zip(MEDAL_TYPES, old, new):
+                counts[name] += new_count - old_count
+            self._table = {**self._table, country_code: counts}
+
+    def cell(self, country_code: str, sport_id: int, type_id: int) -> Optional[Dict[str, int]]:
+        """
+        Returns the medal counts of a (country, sport, type) cell,
+        None if it has no medals or the table isn't loaded.
+        """
+        shared = shared_snapshot(self._snapshot)
+        if shared is not None:
+            counts = shared.cell(country_code, sport_id, type_id) if shared.ready else None
+        else:
+            counts = self._cells.get((country_code, sport_id, type_id))
+        return dict(zip(MEDAL_TYPES, counts)) if counts is not None else None
+
+    def table(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the medal totals of every country as {country_code: counts}.
+        """
+        shared = shared_snapshot(self._snapshot)
+        if shared is not None:
+            return self._shared_table(shared)
+        if not self._loaded:
+            self.rebuild()
+        return self._table
+
+    def _shared_table(self, shared: MedalSnapshot) -> Dict[str, Dict[str, int]]:
+        if not shared.ready:
+            self.load()
+        # the table of this process is read again only after a write
+        sequence = shared.sequence()
+        if sequence != self._sequence:
+            self._table = {
+                country_code: dict(zip(MEDAL_TYPES, counts))
+                for country_code, counts in shared.totals().items()
+            }
+            self._sequence = sequence
+        return self._table
+
+    def check(self) -> Dict:
+        """
+        Compares the table with the result of the aggregation over the
+        Medal collection, or with the country counters of the flat layout,
+        and returns the countries whose totals differ.
+        """
+        if reads_flat():
+            expected = country_totals()
+        else:
+            aggregated = MEDAL_TOTALS.run(self._collection)
+            expected = aggregated[0] if aggregated else {}
+        actual = self.table()
+
+        mismatches = {
+            country_code: {
+                "read_model": actual.get(country_code),
+                "database": expected.get(country_code),
+            }
+            for country_code in expected.keys() | actual.keys()
+            if actual.get(country_code) != expected.get(country_code)
+        }
+        return {"consistent": not mismatches, "mismatches": mismatches}
+
+
+medal_standings = MedalStandings()
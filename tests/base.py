@@ -4,7 +4,12 @@ from mongomock import MongoClient
 from fastapi.testclient import TestClient
 from sota.main import app
 from sota.database_connection import client
-from bson import decode_file_iter
+from sota.standings import medal_standings
+from sota.projections import medal_projections
+from sota.reference_data import reference_data
+from sota.key_cache import key_cache
+from sota.audience_stats import audience_stats
+from sota.load import load
 
 
 class setUpTest(unittest.TestCase):
@@ -34,6 +39,13 @@ class setUpTest(unittest.TestCase):
         # Load test data into the database
         cls.load_test_data()
 
+        # Drop the in-memory read models built from the data of previous suites
+        reference_data.reload()
+        medal_standings.invalidate()
+        medal_projections.invalidate()
+        key_cache.invalidate()
+        audience_stats.invalidate()
+
         # Initialize FastAPI test client
         cls.fastapi_client = TestClient(app)
 
@@ -43,14 +55,10 @@ class setUpTest(unittest.TestCase):
         Loads test data from BSON files into the mock MongoDB database.
 
         Supported collections: 'Audient', 'Keys', 'Medal', 'SportDetail', 'SubSportType'.
-        Each collection's data is stored in a corresponding BSON file in 'dump_data/Sota'.
+        Each collection's data is stored in a corresponding BSON file in 'dump_data/Sota',
+        streamed by the loader of `python -m sota.load` as the documents are, unvalidated.
         """
-        collections = ["Audient", "Keys", "Medal", "SportDetail", "SubSportType"]
-        for collection_name in collections:
-            with open(f"dump_data/Sota/{collection_name}.bson", "rb") as file:
-                collection_data = list(decode_file_iter(file))
-                if collection_data:
-                    cls.db[collection_name].insert_many(collection_data)
+        load(["dump_data/Sota"], database=cls.db, validate=False, build_indexes=False)
 
     @classmethod
     def insert_authentication_keys(cls, keys_data):
@@ -61,6 +69,8 @@ class setUpTest(unittest.TestCase):
             keys_data (list): A list of dictionaries, each containing a key and its scope.
         """
         cls.db["Keys"].insert_many(keys_data)
+        key_cache.invalidate()
+        audience_stats.invalidate()
 
     def post_request(self, url, token, payload):
         """
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from .base import setUpTest
+from fastapi import status
+from sota.database_connection import async_sota_database
+
+
+class TestAsyncDatabase(setUpTest):
+    """
+    Tests for the asyncio database handles used by the routes running on the event loop.
+
+    When testing, the handles are backed by the mongomock client, so this suite verifies
+    that they expose the asyncio API of pymongo while sharing their data with the
+    synchronous handles.
+    """
+
+    AUDIENT_DATA = [
+        {"_id": "1", "country_code": "US", "sport_id": [1], "gender": "M", "age": 20},
+        {"_id": "2", "country_code": "TH", "sport_id": [2], "gender": "F", "age": 30},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the necessary resources and some audience for running the tests."""
+        super().setUpClass()
+        cls.db["Audient"].insert_many([dict(audient) for audient in cls.AUDIENT_DATA])
+
+    def test_operations_are_awaitable_and_share_data(self):
+        """Ensure a document written through the asyncio handle is seen by the synchronous one."""
+        collection = async_sota_database["Keys"]
+
+        async def write_and_read():
+            await collection.insert_one({"key": "async" * 4, "scope": {}})
+            return await collection.find_one({"key": "async" * 4}, {"_id": 0})
+
+        self.assertEqual(asyncio.run(write_and_read()), {"key": "async" * 4, "scope": {}})
+        self.assertIsNotNone(self.db["Keys"].find_one({"key": "async" * 4}))
+
+    def test_cursors_support_async_iteration_and_to_list(self):
+        """Verify the find and aggregate cursors can be iterated and collected asynchronously."""
+        collection = async_sota_database["Audient"]
+
+        async def read():
+            found = [
+                audient["_id"]
+                async for audient in collection.find({}, {"_id": 1}).sort("_id", -1)
+            ]
+            cursor = await collection.aggregate(
+                [{"$match": {"country_code": "TH"}}, {"$project": {"_id": 1}}]
+            )
+            return found, await cursor.to_list(None)
+
+        found, aggregated = asyncio.run(read())
+        self.assertEqual(found, ["2", "1"])
+        self.assertEqual(aggregated, [{"_id": "2"}])
+
+    def test_get_audient_awaits_the_asyncio_handle(self):
+        """Test that 'GET /audient' returns the audience read through the asyncio handle."""
+        response = self.fastapi_client.get("/audient")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {key: value for key, value in audient.items() if key != "_id"}
+                for audient in self.AUDIENT_DATA
+            ],
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
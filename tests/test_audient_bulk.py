@@ -0,0 +1,182 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from pymongo.errors import AutoReconnect, BulkWriteError
+from sota.data_versions import data_versions, AUDIENCE
+from sota.database_connection import (
+    async_audient_collection,
+    audient_collection,
+    sport_detail_collection,
+)
+from sota.invalidation import invalidation_bus, AUDIENT
+from sota.reference_data import reference_data
+
+
+class TestAudientBulk(setUpTest):
+    """
+    Tests for the batched ingest of '/audient/update_audient_info'.
+
+    This test suite verifies that the sport ids of a whole upload are checked at once
+    against the reference data, that the audience is written in chunks of bulk writes and that the
+    response summarizes the writes instead of echoing the payload.
+    """
+
+    AUDIENT_TOKEN = "audie" * 4
+    KEYS_DATA = [
+        {
+            "key": AUDIENT_TOKEN,
+            "scope": {"PUBLISH_AUDIENCE": True, "PUBLISH_MEDAL": False},
+        },
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def setUp(self):
+        """Start every test from an empty Audient collection."""
+        self.db["Audient"].delete_many({})
+
+    def audience(self, size, sport_ids=(1, 2, 3)):
+        """Build an upload of `size` people, each watching all of `sport_ids`."""
+        return {
+            "audience": [
+                {
+                    "id": str(index),
+                    "country_code": "US",
+                    "sport_id": list(sport_ids),
+                    "gender": "F",
+                    "age": 30,
+                }
+                for index in range(size)
+            ]
+        }
+
+    def test_sport_ids_are_checked_without_querying_the_database(self):
+        """Ensure the sport ids of the whole upload are validated against the reference data."""
+        reference_data.reload()
+
+        with patch.object(sport_detail_collection, "find") as mock_find, patch.object(
+            sport_detail_collection, "find_one"
+        ) as mock_find_one, patch.object(
+            sport_detail_collection, "distinct"
+        ) as mock_distinct:
+            response = self.post_request(
+                "/audient/update_audient_info", self.AUDIENT_TOKEN, self.audience(50)
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_find.assert_not_called()
+        mock_find_one.assert_not_called()
+        mock_distinct.assert_not_called()
+
+    def test_unknown_sport_ids_are_all_reported(self):
+        """Verify that every unknown sport id of the upload is listed in the error."""
+        response = self.post_request(
+            "/audient/update_audient_info",
+            self.AUDIENT_TOKEN,
+            self.audience(3, sport_ids=(1, int(1e9), -1)),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f"-1, {int(1e9)}", response.text)
+        self.assertEqual(self.db["Audient"].count_documents({}), 0)
+
+    def test_audience_is_written_in_chunks(self):
+        """Test that a large upload is split into bulk writes of the configured size."""
+        with patch("sota.routers.audient_router.bulk_chunk_size", 2), patch.object(
+            audient_collection, "bulk_write", wraps=audient_collection.bulk_write
+        ) as mock_bulk_write, patch.object(
+            audient_collection, "update_one"
+        ) as mock_update_one:
+            response = self.post_request(
+                "/audient/update_audient_info", self.AUDIENT_TOKEN, self.audience(5)
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [len(call.args[0]) for call in mock_bulk_write.call_args_list], [2, 2, 1]
+        )
+        mock_update_one.assert_not_called()
+        self.assertEqual(self.db["Audient"].count_documents({}), 5)
+
+    def test_response_summarizes_the_writes(self):
+        """Check that the response counts the upserted and modified people, last entry winning."""
+        self.post_request(
+            "/audient/update_audient_info", self.AUDIENT_TOKEN, self.audience(2)
+        )
+        payload = self.audience(3)
+        payload["audience"].append(dict(payload["audience"][0], age=31))
+
+        response = self.post_request(
+            "/audient/update_audient_info", self.AUDIENT_TOKEN, payload
+        )
+
+        self.assertEqual(
+            response.json(),
+            {"Success": {"received": 4, "matched": 2, "modified": 1, "upserted": 1, "failed": 0}},
+        )
+        self.assertEqual(self.db["Audient"].find_one({"_id": "0"})["age"], 31)
+
+    def test_failed_chunk_still_invalidates_the_audience(self):
+        """Ensure the chunks written before a failure make the audience stale, and the failure is reported."""
+        bulk_write = async_audient_collection.bulk_write
+        calls = []
+
+        async def failing_bulk_write(requests, **kwargs):
+            calls.append(len(requests))
+            if len(calls) == 2:
+                raise AutoReconnect("connection closed")
+            return await bulk_write(requests, **kwargs)
+
+        version = data_versions.get(AUDIENCE)
+        with patch("sota.routers.audient_router.bulk_chunk_size", 2), patch.object(
+            async_audient_collection, "bulk_write", side_effect=failing_bulk_write
+        ), patch.object(invalidation_bus, "notify") as mock_notify:
+            response = self.post_request(
+                "/audient/update_audient_info", self.AUDIENT_TOKEN, self.audience(5)
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "Success": {"received": 5, "matched": 0, "modified": 0, "upserted": 2, "failed": 3},
+                "errors": [{"chunk": 1, "detail": "connection closed"}],
+            },
+        )
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(self.db["Audient"].count_documents({}), 2)
+        self.assertGreater(data_versions.get(AUDIENCE), version)
+        mock_notify.assert_called_once_with(AUDIENT)
+
+    def test_failed_writes_are_reported_by_id(self):
+        """Check that the writes rejected in a chunk are listed, the others of the chunk counted."""
+        error = BulkWriteError(
+            {
+                "nMatched": 0,
+                "nModified": 0,
+                "nUpserted": 1,
+                "writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}],
+            }
+        )
+        with patch.object(async_audient_collection, "bulk_write", side_effect=error):
+            response = self.post_request(
+                "/audient/update_audient_info", self.AUDIENT_TOKEN, self.audience(2)
+            )
+
+        self.assertEqual(
+            response.json(),
+            {
+                "Success": {"received": 2, "matched": 0, "modified": 0, "upserted": 1, "failed": 1},
+                "errors": [{"id": "1", "detail": "Document failed validation"}],
+            },
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
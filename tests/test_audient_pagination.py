@@ -0,0 +1,107 @@
+import json
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota.database_connection import read_audient_collection
+
+
+class TestAudientPagination(setUpTest):
+    """
+    Tests for the paginated and streamed reads of the audience.
+
+    This test suite verifies that 'GET /audient' returns pages ordered by id
+    linked by a cursor, that the fields are projected by the database, and that
+    'GET /audient/stream' writes the whole audience as newline-delimited JSON.
+    """
+
+    AUDIENT_DATA = [
+        {
+            "_id": f"p{index:02}",
+            "id": f"p{index:02}",
+            "country_code": "US",
+            "sport_id": [1],
+            "gender": "F",
+            "age": index,
+        }
+        for index in range(5)
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the necessary resources and some audience for running the tests."""
+        super().setUpClass()
+        cls.db["Audient"].insert_many([dict(audient) for audient in cls.AUDIENT_DATA])
+
+    def expected(self, audience):
+        return [
+            {
+                key: value
+                for key, value in audient.items()
+                if key in ("country_code", "sport_id", "gender", "age")
+            }
+            for audient in audience
+        ]
+
+    def test_pages_follow_the_cursor(self):
+        """Ensure the pages cover the audience once, in order, and the last one has no cursor."""
+        first = self.fastapi_client.get("/audient", params={"limit": 2})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.json(), self.expected(self.AUDIENT_DATA[:2]))
+        self.assertEqual(first.headers["x-next-cursor"], "p01")
+
+        second = self.fastapi_client.get(
+            "/audient", params={"limit": 2, "after": first.headers["x-next-cursor"]}
+        )
+        self.assertEqual(second.json(), self.expected(self.AUDIENT_DATA[2:4]))
+
+        last = self.fastapi_client.get(
+            "/audient", params={"limit": 2, "after": second.headers["x-next-cursor"]}
+        )
+        self.assertEqual(last.json(), self.expected(self.AUDIENT_DATA[4:]))
+        self.assertNotIn("x-next-cursor", last.headers)
+
+    def test_cursor_readable_by_browsers(self):
+        """Verify a cross-origin page exposes its cursor and ETag to the scripts of the page."""
+        response = self.fastapi_client.get(
+            "/audient", params={"limit": 2}, headers={"Origin": "http://localhost"}
+        )
+
+        exposed = response.headers["access-control-expose-headers"].lower().split(", ")
+        self.assertIn("x-next-cursor", exposed)
+        self.assertIn("etag", exposed)
+
+    def test_fields_are_projected_by_the_database(self):
+        """Verify that the query only asks the database for the returned fields."""
+        with patch.object(
+            read_audient_collection, "find", wraps=read_audient_collection.find
+        ) as mock_find:
+            self.fastapi_client.get("/audient")
+
+        projection = mock_find.call_args.args[1]
+        self.assertNotIn("id", projection)
+        self.assertEqual(
+            set(projection), {"_id", "country_code", "sport_id", "gender", "age"}
+        )
+
+    def test_page_size_is_bounded(self):
+        """Test that a page size out of bounds is rejected."""
+        response = self.fastapi_client.get("/audient", params={"limit": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream_is_newline_delimited_json(self):
+        """Check that the stream holds one person per line, without their ids."""
+        response = self.fastapi_client.get("/audient/stream")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertIn("etag", response.headers)
+        self.assertEqual(
+            [json.loads(line) for line in response.text.splitlines()],
+            self.expected(self.AUDIENT_DATA),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
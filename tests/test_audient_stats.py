@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota.database_connection import audient_collection
+
+
+class TestAudientStats(setUpTest):
+    """
+    Tests for the audience counts computed by aggregation.
+
+    This test suite verifies the counts by country, sport, gender and age bucket,
+    the cross-tabs, and that results are cached until the audience is written.
+    """
+
+    AUDIENT_TOKEN = "audie" * 4
+    KEYS_DATA = [{"key": AUDIENT_TOKEN, "scope": {"PUBLISH_AUDIENCE": True}}]
+    AUDIENT_DATA = [
+        {"_id": "1", "country_code": "US", "sport_id": [1, 2], "gender": "F", "age": 16},
+        {"_id": "2", "country_code": "US", "sport_id": [1], "gender": "M", "age": 30},
+        {"_id": "3", "country_code": "HU", "sport_id": [2], "gender": "F", "age": 70},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the necessary resources and some audience for running the tests."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+        cls.db["Audient"].insert_many([dict(audient) for audient in cls.AUDIENT_DATA])
+
+    def test_summary(self):
+        """Ensure the summary holds the counts by every dimension."""
+        response = self.fastapi_client.get("/audient/stats")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "country": {"HU": 1, "US": 2},
+                "sport": {"1": 2, "2": 2},
+                "gender": {"F": 2, "M": 1},
+                "age": {"0-17": 1, "25-34": 1, "65+": 1},
+            },
+        )
+
+    def test_counts_by_dimension(self):
+        """Verify the counts by a single dimension."""
+        response = self.fastapi_client.get("/audient/stats/age")
+        self.assertEqual(list(response.json()), ["0-17", "25-34", "65+"])
+
+        response = self.fastapi_client.get("/audient/stats/height")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_crosstab(self):
+        """Test the counts by two dimensions."""
+        response = self.fastapi_client.get("/audient/stats/sport/country")
+        self.assertEqual(response.json(), {"1": {"US": 2}, "2": {"HU": 1, "US": 1}})
+
+        response = self.fastapi_client.get("/audient/stats/sport/sport")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_results_are_cached_until_written(self):
+        """Check that the aggregation runs again only after an audience upload."""
+        with patch.object(
+            audient_collection, "aggregate", wraps=audient_collection.aggregate
+        ) as mock_aggregate:
+            self.fastapi_client.get("/audient/stats/gender")
+            self.fastapi_client.get("/audient/stats/gender")
+            self.assertEqual(mock_aggregate.call_count, 1)
+
+            self.post_request(
+                "/audient/update_audient_info",
+                self.AUDIENT_TOKEN,
+                {
+                    "audience": [
+                        {
+                            "id": "4",
+                            "country_code": "US",
+                            "sport_id": [1],
+                            "gender": "N",
+                            "age": 40,
+                        }
+                    ]
+                },
+            )
+            response = self.fastapi_client.get("/audient/stats/gender")
+
+        self.assertEqual(mock_aggregate.call_count, 2)
+        self.assertEqual(response.json()["N"], 1)
+        self.db["Audient"].delete_one({"_id": "4"})
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota.countries import country_codes, country_name, unknown_countries
+
+
+class TestCountries(setUpTest):
+    """
+    Tests for the country registry and the validators using it.
+
+    This test suite verifies the registry built from pycountry, and that the medal and
+    audience validators check the countries of a whole payload at once without
+    looking countries up in pycountry.
+    """
+
+    MEDAL_TOKEN = "medal" * 4
+    AUDIENT_TOKEN = "audie" * 4
+    KEYS_DATA = [
+        {"key": MEDAL_TOKEN, "scope": {"PUBLISH_MEDAL": True}},
+        {"key": AUDIENT_TOKEN, "scope": {"PUBLISH_AUDIENCE": True}},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def test_registry(self):
+        """Ensure the registry holds the alpha-2 codes and names of the countries."""
+        self.assertIsInstance(country_codes(), frozenset)
+        self.assertIn("HU", country_codes())
+        self.assertEqual(country_name("HU"), "Hungary")
+        self.assertEqual(unknown_countries(["HU", "XX", "US", "YY"]), {"XX", "YY"})
+
+    def test_unknown_countries_of_an_audience_are_all_reported(self):
+        """Verify that every unknown country of an audience is listed in a single error."""
+        audience = [
+            {"id": str(index), "country_code": code, "sport_id": [1], "gender": "F", "age": 20}
+            for index, code in enumerate(["US", "YY", "HU", "XX"])
+        ]
+
+        with patch("pycountry.countries.get") as mock_get:
+            response = self.post_request(
+                "/audient/update_audient_info", self.AUDIENT_TOKEN, {"audience": audience}
+            )
+
+        mock_get.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Country XX, YY doesn't exist", response.json()["detail"][0]["msg"])
+
+    def test_countries_of_a_medal_update_are_checked_at_once(self):
+        """Test the errors of the unknown and of the not participating countries."""
+        payload = {
+            "sport_id": 1,
+            "sport_type_id": 1,
+            "participants": [
+                {"country": "XX", "medal": {"gold": 1}},
+                {"country": "AD", "medal": {"gold": 1}},
+                {"country": "AE", "medal": {"gold": 1}},
+            ],
+        }
+        response = self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+        self.assertIn("Country XX doesn't exist", response.json()["detail"][0]["msg"])
+
+        payload["participants"] = payload["participants"][1:]
+        response = self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+        self.assertIn(
+            "Country AD, AE is not participating", response.json()["detail"][0]["msg"]
+        )
+
+    def test_new_country_is_named_from_the_registry(self):
+        """Check that a country getting its first medals is named without pycountry."""
+        self.db["Medal"].delete_many({"country_code": "HU"})
+        payload = {
+            "sport_id": 1,
+            "sport_type_id": 1,
+            "participants": [{"country": "HU", "medal": {"gold": 1}}],
+        }
+
+        with patch("pycountry.countries.get") as mock_get:
+            response = self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+
+        mock_get.assert_not_called()
+        self.assertEqual(response.json()["results"][0]["result"], "created")
+        self.assertEqual(
+            self.db["Medal"].find_one({"country_code": "HU"})["country_name"], "Hungary"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,119 @@
+import unittest
+from .base import setUpTest
+from fastapi import status
+from sota.data_versions import data_versions, MEDALS, REFERENCE
+from sota.routers.deps.cache_deps import etag_matches
+
+
+class TestHttpCaching(setUpTest):
+    """
+    Tests for the ETag and Cache-Control headers of the read routes.
+
+    This test suite verifies that the read routes return validators and cache headers,
+    that a client holding the current ETag gets a 304 without a body, and that
+    medal and audience writes make the previous ETags stale.
+    """
+
+    MEDAL_TOKEN = "medal" * 4
+    AUDIENT_TOKEN = "audie" * 4
+    KEYS_DATA = [
+        {"key": MEDAL_TOKEN, "scope": {"PUBLISH_MEDAL": True}},
+        {"key": AUDIENT_TOKEN, "scope": {"PUBLISH_AUDIENCE": True}},
+    ]
+    READ_ROUTES = [
+        "/medals",
+        "/medal/c/US",
+        "/medal/s/1",
+        "/medal/s/1/t/1",
+        "/sport/all",
+        "/sport/1",
+        "/sports",
+        "/audient",
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def conditional_get(self, url, etag):
+        return self.fastapi_client.get(url, headers={"If-None-Match": etag})
+
+    def test_read_routes_are_cacheable(self):
+        """Ensure every read route returns an ETag and answers 304 when it still matches."""
+        for url in self.READ_ROUTES:
+            with self.subTest(url=url):
+                response = self.fastapi_client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn("stale-while-revalidate", response.headers["cache-control"])
+
+                etag = response.headers["etag"]
+                self.assertTrue(etag.startswith(f'"{data_versions.boot_id}-'))
+
+                response = self.conditional_get(url, etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response.headers["etag"], etag)
+
+    def test_medal_update_makes_etags_stale(self):
+        """Verify that a medal update changes the ETag of the medal routes only."""
+        medals_etag = self.fastapi_client.get("/medals").headers["etag"]
+        sports_etag = self.fastapi_client.get("/sports").headers["etag"]
+
+        response = self.post_request(
+            "/medals/update_medal",
+            self.MEDAL_TOKEN,
+            {
+                "sport_id": 1,
+                "sport_type_id": 1,
+                "participants": [{"country": "US", "medal": {"gold": 2}}],
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.conditional_get("/medals", medals_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers["etag"], medals_etag)
+        response = self.conditional_get("/sports", sports_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_audience_update_makes_etag_stale(self):
+        """Test that an audience upload changes the ETag of '/audient'."""
+        etag = self.fastapi_client.get("/audient").headers["etag"]
+
+        response = self.post_request(
+            "/audient/update_audient_info",
+            self.AUDIENT_TOKEN,
+            {
+                "audience": [
+                    {
+                        "id": "cache",
+                        "country_code": "US",
+                        "sport_id": [1],
+                        "gender": "F",
+                        "age": 30,
+                    }
+                ]
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.conditional_get("/audient", etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    def test_etag_comparison(self):
+        """Check the parsing of If-None-Match headers."""
+        etag = data_versions.etag(MEDALS, REFERENCE)
+
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches('"other"', etag))
+        self.assertFalse(etag_matches(None, etag))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,69 @@
+import unittest
+from .base import setUpTest
+from sota.indexes import ensure_indexes, required_indexes
+
+
+class TestIndexes(setUpTest):
+    """
+    Tests the index bootstrap which runs at application startup.
+
+    It verifies that the required indexes are created when missing, that running
+    the bootstrap again is a no-op, and that indexes whose definition differs from
+    the declared one are reported as drift instead of being silently replaced.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the necessary resources for running the tests."""
+        super().setUpClass()
+
+    def setUp(self):
+        """Start each test from collections that only have the default `_id_` index."""
+        for collection_name in required_indexes():
+            self.db[collection_name].drop_indexes()
+
+    def test_missing_indexes_are_created(self):
+        """Ensure every declared index exists with its definition after the bootstrap."""
+        report = ensure_indexes()
+
+        for collection_name, models in required_indexes().items():
+            existing = self.db[collection_name].index_information()
+            for model in models:
+                wanted = model.document
+                self.assertIn(wanted["name"], existing)
+                self.assertIn(wanted["name"], report[collection_name]["created"])
+                self.assertEqual(
+                    bool(existing[wanted["name"]].get("unique")),
+                    bool(wanted.get("unique")),
+                )
+            self.assertEqual(report[collection_name]["drift"], [])
+
+    def test_bootstrap_is_idempotent(self):
+        """Verify that a second bootstrap neither creates indexes nor reports drift."""
+        ensure_indexes()
+        report = ensure_indexes()
+
+        for collection_report in report.values():
+            self.assertEqual(collection_report, {"created": [], "drift": []})
+
+    def test_index_drift_is_reported(self):
+        """Test that an index declared unique but existing as non-unique is reported."""
+        self.db["Keys"].create_index("key", name="key_1")
+
+        with self.assertLogs("sota.indexes", level="WARNING"):
+            report = ensure_indexes()
+
+        self.assertNotIn("key_1", report["Keys"]["created"])
+        self.assertEqual(len(report["Keys"]["drift"]), 1)
+        self.assertIn("unique", report["Keys"]["drift"][0])
+        self.assertFalse(self.db["Keys"].index_information()["key_1"].get("unique"))
+
+    def tearDown(self):
+        """Drop the indexes so the other suites keep their original setup."""
+        for collection_name in required_indexes():
+            self.db[collection_name].drop_indexes()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
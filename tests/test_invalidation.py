@@ -0,0 +1,242 @@
+import asyncio
+import unittest
+from unittest.mock import Mock, patch
+from pymongo.errors import OperationFailure
+from .base import setUpTest
+from sota.broadcaster import medal_broadcaster
+from sota.data_versions import data_versions, AUDIENCE, MEDALS, REFERENCE
+from sota.database_connection import async_versions_collection
+from sota.invalidation import (
+    AUDIENT,
+    CHANGE_STREAMS_NOT_SUPPORTED,
+    InvalidationBus,
+    LOCAL,
+    MEDAL,
+    VERSIONS_ID,
+    POLLING,
+    CHANGE_STREAM,
+    invalidation_bus,
+    medal_cells,
+)
+from sota.key_cache import key_cache
+from sota.reference_data import reference_data
+from sota.standings import medal_standings
+
+
+def medal_document(gold):
+    return {
+        "country_code": "HU",
+        "country_name": "Hungary",
+        "sports": [
+            {"sport_id": 1, "type_id": 1, "gold": 1, "silver": 0, "bronze": 0},
+            {"sport_id": 1, "type_id": 2, "gold": gold, "silver": 0, "bronze": 0},
+        ],
+    }
+
+
+class TestInvalidation(setUpTest):
+    """
+    Tests for the invalidation bus keeping the caches in line with the writes
+    of the other processes.
+
+    This test suite emits the events of a change stream through the local
+    stand-in, and verifies that the medal read models follow the written cells,
+    that the other caches are invalidated, and that the bus falls back to
+    polling the versions without change streams.
+    """
+
+    def setUp(self):
+        """Start every test from a medal table loaded from an empty collection."""
+        self.db["Medal"].delete_many({})
+        medal_standings.rebuild()
+        medal_broadcaster.forget()
+        # the ETags of the other tests are built from the versions of the process
+        patcher = patch.object(data_versions, "_shared", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_medals(self, operation, gold, **change):
+        """Write the medals of HU as another process would, and emit the change."""
+        document = medal_document(gold)
+        self.db["Medal"].replace_one({"country_code": "HU"}, document, upsert=True)
+        invalidation_bus.emit(
+            {
+                "operationType": operation,
+                "ns": {"db": "Sota", "coll": "Medal"},
+                "fullDocument": document,
+                **change,
+            }
+        )
+
+    def test_bus_is_local_when_testing(self):
+        """Ensure the tests use the in-process stand-in."""
+        self.assertEqual(invalidation_bus.mode, LOCAL)
+
+    def test_medal_changes_are_applied(self):
+        """Verify that the medals written by another process reach the table and the stream."""
+        version = data_versions.get(MEDALS)
+        token = medal_broadcaster.stats()["last_token"]
+
+        self.write_medals("insert", 2)
+        self.assertEqual(self.fastapi_client.get("/medals").json()["HU"]["gold"], 3)
+        self.assertEqual(data_versions.get(MEDALS), version + 1)
+        self.assertNotEqual(medal_broadcaster.stats()["last_token"], token)
+
+        self.write_medals("update", 5, updateDescription={"updatedFields": {"sports.1.gold": 5}})
+        self.assertEqual(self.fastapi_client.get("/medals").json()["HU"]["gold"], 6)
+
+    def test_applied_changes_are_ignored(self):
+        """Check that a change already applied, such as an own write, is not applied twice."""
+        self.write_medals("insert", 2)
+        version = data_versions.get(MEDALS)
+        token = medal_broadcaster.stats()["last_token"]
+
+        self.write_medals("update", 2, updateDescription={"updatedFields": {"sports.1.gold": 2}})
+
+        self.assertEqual(data_versions.get(MEDALS), version)
+        self.assertEqual(medal_broadcaster.stats()["last_token"], token)
+
+    def test_updated_cells(self):
+        """Test that only the sub-sports at the updated indexes are taken from the document."""
+        change = {
+            "operationType": "update",
+            "fullDocument": medal_document(4),
+            "updateDescription": {"updatedFields": {"sports.1.gold": 4}},
+        }
+        self.assertEqual(
+            medal_cells(change),
+            [{"country": "HU", "sport_id": 1, "type_id": 2, "gold": 4, "silver": 0, "bronze": 0}],
+        )
+        self.assertIsNone(medal_cells({"operationType": "delete", "documentKey": {"_id": 1}}))
+
+    def test_deleted_medals_invalidate_the_table(self):
+        """Ensure a change without the written cells makes the table load again."""
+        self.write_medals("insert", 2)
+        self.db["Medal"].delete_many({})
+        invalidation_bus.emit(
+            {"operationType": "delete", "ns": {"db": "Sota", "coll": "Medal"}, "documentKey": {"_id": 1}}
+        )
+
+        self.assertEqual(self.fastapi_client.get("/medals").json(), {})
+
+    def test_new_key_is_uncached(self):
+        """Verify that a key cached as unknown is dropped once another process inserts it."""
+        key = "newer" * 4
+        key_cache.put(key, None)
+
+        invalidation_bus.emit(
+            {"operationType": "insert", "ns": {"db": "Sota", "coll": "Keys"}, "fullDocument": {"key": key}}
+        )
+
+        self.assertEqual(key_cache.get(key), (False, None))
+
+    def test_other_collections_make_their_data_stale(self):
+        """Check that the audience and reference changes make their cached data stale."""
+        audience = data_versions.get(AUDIENCE)
+        self.addCleanup(reference_data.reload)
+
+        invalidation_bus.emit({"operationType": "update", "ns": {"db": "Sota", "coll": "Audient"}})
+        invalidation_bus.emit({"operationType": "update", "ns": {"db": "Sota", "coll": "SportDetail"}})
+
+        self.assertEqual(data_versions.get(AUDIENCE), audience + 1)
+        self.assertIsNone(reference_data._loaded_at)
+
+    def test_polling_the_versions(self):
+        """Test that a process notified of a write is seen by the others, but not by itself."""
+        writer = InvalidationBus(mode=POLLING, versions=async_versions_collection)
+        reader = InvalidationBus(mode=POLLING, versions=async_versions_collection)
+
+        async def scenario():
+            await writer.poll()
+            await reader.poll()
+            await writer.notify(AUDIENT)
+            await writer.poll()
+            version = data_versions.get(AUDIENCE)
+            await reader.poll()
+            return version
+
+        version = asyncio.run(scenario())
+
+        self.assertEqual(data_versions.get(AUDIENCE), version + 1)
+        self.assertEqual(writer.stats()["changes"], {})
+        self.assertEqual(reader.stats()["changes"], {AUDIENT: 1})
+
+    def test_etags_built_from_the_shared_versions(self):
+        """Verify the workers build the same ETags from the versions bumped by the writes."""
+        writer = InvalidationBus(mode=POLLING, versions=async_versions_collection)
+        reader = InvalidationBus(mode=POLLING, versions=async_versions_collection)
+        self.db["Versions"].delete_one({"_id": VERSIONS_ID})
+
+        asyncio.run(writer.notify(MEDAL))
+        etag = data_versions.etag(MEDALS, REFERENCE)
+        # the counters of the process differ between the workers
+        data_versions.bump(MEDALS)
+
+        self.assertEqual(etag, '"shared-1-0"')
+        self.assertEqual(data_versions.etag(MEDALS, REFERENCE), etag)
+
+        invalidation_bus.emit(
+            {
+                "operationType": "update",
+                "ns": {"db": "Sota", "coll": "Versions"},
+                "documentKey": {"_id": VERSIONS_ID},
+                "fullDocument": {"_id": VERSIONS_ID, "Medal": 1, "MedalFact": 2, "SportDetail": 3},
+            }
+        )
+        self.assertEqual(data_versions.etag(MEDALS, REFERENCE), '"shared-3-3"')
+        asyncio.run(reader.poll())
+        self.assertEqual(data_versions.etag(MEDALS, REFERENCE), '"shared-3-3"')
+
+    def test_reference_loaded_before_its_version_is_shared(self):
+        """Ensure a reference write is loaded before the ETags of the other workers change."""
+        reader = InvalidationBus(mode=POLLING, versions=async_versions_collection)
+        asyncio.run(reader.poll())
+        self.db["SportDetail"].insert_one({"sport_id": 1000, "sport_name": "Breaking"})
+        self.addCleanup(reference_data.reload)
+        self.addCleanup(self.db["SportDetail"].delete_one, {"sport_id": 1000})
+        # written by another worker
+        self.db["Versions"].update_one({"_id": VERSIONS_ID}, {"$inc": {"SportDetail": 1}}, upsert=True)
+        versions = self.db["Versions"].find_one({"_id": VERSIONS_ID})
+
+        asyncio.run(reader.poll())
+
+        reference = versions["SportDetail"] + versions.get("SubSportType", 0)
+        self.assertEqual(data_versions.etag(REFERENCE), f'"shared-{reference}"')
+        # answered from the loaded data, not from a reload in the background
+        self.assertEqual(reference_data.sport_name(1000), "Breaking")
+
+    def test_unknown_medal_changes_bump_the_shared_versions(self):
+        """Check that a deletion seen on the change stream changes the ETags built from the shared versions."""
+        bus = InvalidationBus(mode=CHANGE_STREAM, versions=async_versions_collection)
+        asyncio.run(bus.notify(AUDIENT))
+        etag = data_versions.etag(MEDALS)
+
+        bus.handle(
+            {"operationType": "delete", "ns": {"db": "Sota", "coll": "Medal"}, "documentKey": {"_id": 1}}
+        )
+        asyncio.run(bus._share_dropped_medals())
+
+        self.assertNotEqual(data_versions.etag(MEDALS), etag)
+
+    def test_fallback_to_polling(self):
+        """Ensure the bus polls the versions when the deployment has no change streams."""
+        database = Mock()
+        database.watch.side_effect = OperationFailure(
+            "not a replica set", code=CHANGE_STREAMS_NOT_SUPPORTED
+        )
+        bus = InvalidationBus(
+            mode=CHANGE_STREAM, database=database, versions=async_versions_collection
+        )
+
+        async def scenario():
+            await bus.start()
+            await asyncio.sleep(0.01)
+            await bus.stop()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(bus.mode, POLLING)
+
+
+if __name__ == "__main__":
+    unittest.main()
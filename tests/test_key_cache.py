@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota.database_connection import keys_collection
+from sota.key_cache import KeyCache, key_cache
+
+
+class TestKeyCache(setUpTest):
+    """
+    Tests for the in-process cache of the authentication keys.
+
+    This test suite verifies that known and unknown keys are answered from the cache,
+    that it is bounded and expires its entries, that new keys are not hidden by a
+    cached miss, and that its counters are exposed to admins.
+    """
+
+    ADMIN_TOKEN = "admin" * 4
+    UNKNOWN_TOKEN = "xxxxx" * 4
+    KEYS_DATA = [{"key": ADMIN_TOKEN, "scope": {"ADMIN": True}}]
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        key_cache.invalidate()
+
+    def get_stats(self, token=ADMIN_TOKEN):
+        return self.fastapi_client.get(
+            "/admin/stats", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    def test_known_key_is_read_once(self):
+        """Ensure a known key is read from the database on its first use only."""
+        with patch.object(
+            keys_collection, "find_one", wraps=keys_collection.find_one
+        ) as mock_find_one:
+            for _ in range(3):
+                self.assertEqual(self.get_stats().status_code, status.HTTP_200_OK)
+
+        self.assertEqual(mock_find_one.call_count, 1)
+
+    def test_unknown_key_is_cached(self):
+        """Verify that repeated unknown keys are rejected without querying the database."""
+        with patch.object(
+            keys_collection, "find_one", wraps=keys_collection.find_one
+        ) as mock_find_one:
+            for _ in range(3):
+                response = self.get_stats(self.UNKNOWN_TOKEN)
+                self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.assertEqual(mock_find_one.call_count, 1)
+
+    def test_generated_key_is_not_hidden_by_a_cached_miss(self):
+        """Test that a key generated after being cached as unknown is accepted."""
+        with patch("sota.routers.apikeygen_router.random.choices") as mock_choices:
+            mock_choices.return_value = list(self.UNKNOWN_TOKEN)
+            response = self.post_request("/medals/update_medal", self.UNKNOWN_TOKEN, {})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.fastapi_client.post(
+                "/apikeygen/", json={"scope": {"PUBLISH_MEDAL": True}}
+            )
+
+        self.assertEqual(response.json(), {"key": self.UNKNOWN_TOKEN})
+        # authorized, then rejected for its empty body
+        response = self.post_request("/medals/update_medal", self.UNKNOWN_TOKEN, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        keys_collection.delete_one({"key": self.UNKNOWN_TOKEN})
+
+    def test_admin_keys_are_not_generated(self):
+        """Ensure the key generator refuses the ADMIN scope."""
+        count = keys_collection.count_documents({})
+
+        response = self.fastapi_client.post("/apikeygen/", json={"scope": {"ADMIN": True}})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(keys_collection.count_documents({}), count)
+
+    def test_stats(self):
+        """Check the hit and miss counters exposed to admins."""
+        before = self.get_stats().json()["key_cache"]
+        after = self.get_stats().json()["key_cache"]
+
+        self.assertEqual(after["size"], 1)
+        self.assertEqual(after["misses"], before["misses"])
+        self.assertEqual(after["hits"], before["hits"] + 1)
+
+    def test_least_recently_used_key_is_evicted(self):
+        """Ensure the cache is bounded and evicts the least recently used key."""
+        cache = KeyCache(max_size=2, ttl=60, negative_ttl=60)
+        cache.put("a", {"key": "a"})
+        cache.put("b", None)
+        cache.get("a")
+        cache.put("c", {"key": "c"})
+
+        self.assertEqual(cache.get("a"), (True, {"key": "a"}))
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("c"), (True, {"key": "c"}))
+
+    def test_entries_expire(self):
+        """Verify that entries are dropped once their TTL expired."""
+        cache = KeyCache(max_size=2, ttl=60, negative_ttl=0)
+        cache.put("a", None)
+
+        self.assertEqual(cache.get("a"), (False, None))
+        with patch("sota.key_cache.time.monotonic", return_value=0):
+            cache.put("b", {"key": "b"})
+        self.assertEqual(cache.get("b"), (False, None))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,159 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock
+from bson import encode
+from pymongo.errors import BulkWriteError
+from .base import setUpTest
+from sota.invalidation import VERSIONS_ID
+from sota.load import _insert, data_files, load, load_file, validate_audience, validate_medals
+
+
+class TestLoad(setUpTest):
+    """
+    Tests for the data loader of `python -m sota.load`.
+
+    This test suite loads BSON, JSON and CSV files into collections of the test
+    database, and verifies that the documents are validated with the rules of the
+    routes, that they are inserted in chunks whatever the number of workers, and
+    that the results count every document.
+    """
+
+    def setUp(self):
+        """Write the files of every test to a new directory."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(self.db.drop_collection, "Audient")
+        self.addCleanup(self.db.drop_collection, "Medal")
+
+    def write(self, name, content):
+        """Write a file of the test directory, bytes or text."""
+        path = os.path.join(self.directory, name)
+        with open(path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        return path
+
+    def test_formats(self):
+        """Ensure BSON, JSON lines and CSV rows are loaded as the same documents."""
+        person = {"id": "a1", "country_code": "TH", "sport_id": [1, 2], "gender": "M", "age": 21}
+        paths = [
+            self.write("one.bson", encode({"_id": "a1", **person})),
+            self.write("two.json", json.dumps({**person, "id": "a2"}) + "\n\n"),
+            self.write("three.csv", "id,country_code,sport_id,gender,age\na3,TH,1;2,M,21\n"),
+        ]
+
+        results = load(paths, database=self.db, collection="Audient", build_indexes=False)
+
+        self.assertEqual([result["inserted"] for result in results], [1, 1, 1])
+        # the servers issue new ETags for the audience
+        self.assertGreater(self.db["Versions"].find_one({"_id": VERSIONS_ID})["Audient"], 0)
+        self.assertEqual(
+            list(self.db["Audient"].find().sort("_id", 1)),
+            [{"_id": f"a{index}", **person, "id": f"a{index}"} for index in (1, 2, 3)],
+        )
+
+    def test_audience_validated_as_the_route_does(self):
+        """Verify that the people of unknown countries or sports, or invalid fields, are rejected."""
+        valid, rejected = validate_audience(
+            [
+                {"id": "a1", "country_code": "TH", "sport_id": [1], "gender": "M", "age": 21},
+                {"id": "a2", "country_code": "ZZ", "sport_id": [1], "gender": "M", "age": 21},
+                {"id": "a3", "country_code": "TH", "sport_id": [999], "gender": "M", "age": 21},
+                {"id": "a4", "country_code": "TH", "sport_id": [1], "gender": "X", "age": 21},
+                {"id": "a5", "country_code": "TH", "sport_id": [1], "gender": "F", "age": -1},
+            ]
+        )
+
+        self.assertEqual([document["_id"] for document in valid], ["a1"])
+        errors = {document["id"]: error for document, error in rejected}
+        self.assertEqual(sorted(errors), ["a2", "a3", "a4", "a5"])
+        self.assertEqual(errors["a2"], "Country ZZ doesn't exist")
+        self.assertEqual(errors["a3"], "The sport_id 999 doesn't exist")
+
+    def test_medals_validated_as_the_route_does(self):
+        """Check that a country must participate in the sub-sports of its medals."""
+        cell = {"sport_id": 1, "type_id": 1, "gold": 1, "silver": 0, "bronze": 0}
+        valid, rejected = validate_medals(
+            [
+                {"country_code": "US", "sports": [cell]},
+                {"country_code": "TH", "sports": [cell]},
+                {"country_code": "US", "sports": [{**cell, "type_id": 999}]},
+            ]
+        )
+
+        self.assertEqual(len(valid), 1)
+        self.assertEqual(valid[0]["country_name"], "United States")
+        self.assertIn("is not participating", rejected[0][1])
+        self.assertIn("don't exist", rejected[1][1])
+
+    def test_chunks_and_duplicates(self):
+        """Test that every chunk is inserted, and duplicates are counted instead of stopping the load."""
+        lines = "".join(
+            json.dumps({"id": f"a{index % 250}", "country_code": "TH", "sport_id": [1], "gender": "N", "age": 30})
+            + "\n"
+            for index in range(300)
+        )
+        path = self.write("Audient.json", lines)
+
+        result = load_file(path, self.db["Audient"], validate_audience, chunk_size=40, workers=3)
+
+        self.assertEqual((result["read"], result["inserted"], result["duplicates"]), (300, 250, 50))
+        self.assertEqual(self.db["Audient"].count_documents({}), 250)
+        self.assertGreater(result["rows_per_second"], 0)
+
+    def test_other_insert_errors_are_not_duplicates(self):
+        """Check that only duplicate keys are counted as duplicates, the other errors as failed."""
+        collection = Mock()
+        collection.insert_many.side_effect = BulkWriteError(
+            {
+                "nInserted": 1,
+                "writeErrors": [
+                    {"index": 1, "code": 11000, "errmsg": "duplicate key"},
+                    {"index": 2, "code": 121, "errmsg": "Document failed validation"},
+                ],
+            }
+        )
+
+        inserted, duplicates, errors = _insert(collection, [{"_id": 1}, {"_id": 2}, {"_id": 3}])
+
+        self.assertEqual((inserted, duplicates), (1, 1))
+        self.assertEqual(errors, ["3: Document failed validation"])
+
+    def test_validated_against_the_loaded_database(self):
+        """Verify the audience is checked against the sports loaded into the same database, and indexed there."""
+        database = self.db.client["LoadTarget"]
+        self.addCleanup(self.db.client.drop_database, "LoadTarget")
+        paths = [
+            self.write(
+                "SportDetail.json",
+                json.dumps({"sport_id": 900, "sport_name": "Loaded", "participating_countries": ["TH"]}),
+            ),
+            self.write(
+                "SubSportType.json",
+                json.dumps({"sport_id": 900, "type_id": 1, "type_name": "Loaded", "participating_countries": ["TH"]}),
+            ),
+            self.write(
+                "Audient.json",
+                json.dumps({"id": "a1", "country_code": "TH", "sport_id": [900], "gender": "F", "age": 20}),
+            ),
+        ]
+
+        results = load(paths, database=database)
+
+        self.assertEqual([result["inserted"] for result in results], [1, 1, 1])
+        self.assertIsNone(self.db["SportDetail"].find_one({"sport_id": 900}))
+        self.assertIn("sport_id_1", database["SportDetail"].index_information())
+
+    def test_directory_of_a_dump(self):
+        """Ensure a directory loads its data files, without the metadata of mongodump."""
+        self.write("Medal.bson", b"")
+        self.write("Medal.metadata.json", "{}")
+        self.write("notes.txt", "")
+
+        self.assertEqual(data_files([self.directory]), [os.path.join(self.directory, "Medal.bson")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,261 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota import medal_layout
+from sota.database_connection import medal_fact_collection
+from sota.invalidation import invalidation_bus
+from sota.medal_layout import DUAL, FLAT
+from sota.migrate_medals import MIGRATION_ID, compute_counters, migrate
+from sota.projections import medal_projections
+from sota.standings import medal_standings
+
+
+class TestMedalLayout(setUpTest):
+    """
+    Tests for the flat medal layout, a MedalFact document per (country, sport, type)
+    with MedalCounter totals per country and sport.
+
+    This test suite verifies that the routes write and read either layout behind
+    `MEDAL_LAYOUT`, that the counters follow the changes of the cells, that a
+    concurrent write of a fact fails instead of skewing them, and that the
+    migration from the embedded layout resumes where it stopped.
+    """
+
+    MEDAL_TOKEN = "medal" * 4
+    KEYS_DATA = [
+        {
+            "key": MEDAL_TOKEN,
+            "scope": {"PUBLISH_AUDIENCE": False, "PUBLISH_MEDAL": True},
+        },
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def setUp(self):
+        """Start every test from empty medals in both layouts."""
+        for name in ("Medal", "MedalFact", "MedalCounter"):
+            self.db[name].delete_many({})
+        self.db["Versions"].delete_many({"_id": MIGRATION_ID})
+        medal_standings.invalidate()
+        medal_projections.invalidate()
+        self.addCleanup(medal_standings.invalidate)
+        self.addCleanup(medal_projections.invalidate)
+
+    def layout(self, layout):
+        """Switch the layout of the medals for the rest of the test."""
+        patcher = patch.object(medal_layout, "MEDAL_LAYOUT", layout)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def update_medal(self, sport_id, sport_type_id, participants):
+        """Send a medal update with the given (country, gold, silver, bronze) participants."""
+        payload = {
+            "sport_id": sport_id,
+            "sport_type_id": sport_type_id,
+            "participants": [
+                {"country": country, "medal": {"gold": gold, "silver": silver, "bronze": bronze}}
+                for country, gold, silver, bronze in participants
+            ],
+        }
+        return self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+
+    def counter(self, counter_id):
+        """Return the counts of a counter."""
+        document = self.db["MedalCounter"].find_one({"_id": counter_id})
+        return document and (document["gold"], document["silver"], document["bronze"])
+
+    def test_flat_writes_facts_and_counters(self):
+        """Ensure a flat write upserts a fact per cell and increments the counters by the change."""
+        self.layout(FLAT)
+
+        response = self.update_medal(1, 1, [("US", 1, 0, 0), ("HU", 0, 1, 0)])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.update_medal(1, 2, [("US", 0, 0, 1)])
+        response = self.update_medal(1, 1, [("US", 0, 1, 0)])
+
+        self.assertEqual(response.json()["results"], [{"country": "US", "result": "updated"}])
+        self.assertEqual(self.db["Medal"].count_documents({}), 0)
+        self.assertEqual(
+            self.db["MedalFact"].find_one({"_id": "US:1:1"}),
+            {"_id": "US:1:1", "country_code": "US", "sport_id": 1, "type_id": 1,
+             "gold": 0, "silver": 1, "bronze": 0},
+        )
+        self.assertEqual(self.counter("country:US"), (0, 1, 1))
+        self.assertEqual(self.counter("sport:1"), (0, 2, 1))
+        self.assertEqual(
+            self.db["MedalCounter"].find_one({"_id": "country:HU"})["country_name"], "Hungary"
+        )
+
+    def test_flat_write_reads_only_the_written_cells(self):
+        """Verify a flat write reads the facts of its cells, and the outcomes come from the counters."""
+        self.layout(FLAT)
+        self.update_medal(1, 1, [("US", 1, 0, 0)])
+        self.update_medal(1, 2, [("US", 0, 0, 1)])
+
+        with patch.object(
+            medal_fact_collection, "find", wraps=medal_fact_collection.find
+        ) as mock_find:
+            response = self.update_medal(1, 3, [("US", 1, 0, 0), ("AU", 0, 1, 0)])
+
+        self.assertEqual(
+            mock_find.call_args.args[0], {"_id": {"$in": ["US:1:3", "AU:1:3"]}}
+        )
+        self.assertEqual(
+            response.json()["results"],
+            [{"country": "US", "result": "added"}, {"country": "AU", "result": "created"}],
+        )
+
+    def test_flat_reads(self):
+        """Verify the read models load from the facts, and check against the counters."""
+        self.layout(FLAT)
+        self.update_medal(1, 1, [("US", 1, 0, 0), ("HU", 0, 1, 0)])
+        medal_standings.invalidate()
+        medal_projections.invalidate()
+
+        self.assertEqual(
+            self.fastapi_client.get("/medals").json(),
+            {"US": {"gold": 1, "silver": 0, "bronze": 0}, "HU": {"gold": 0, "silver": 1, "bronze": 0}},
+        )
+        self.assertEqual(self.fastapi_client.get("/medal/c/HU").json()["country_name"], "Hungary")
+        self.assertTrue(medal_standings.check()["consistent"])
+
+    def test_concurrently_written_fact_fails(self):
+        """Check that a fact changed after it was read is reported as failed and left uncounted."""
+        self.layout(FLAT)
+        self.update_medal(1, 1, [("US", 1, 0, 0)])
+        original_bulk_write = medal_fact_collection.bulk_write
+
+        def bulk_write_after_concurrent_write(requests, **kwargs):
+            medal_fact_collection.update_one({"_id": "US:1:1"}, {"$set": {"gold": 3}})
+            return original_bulk_write(requests, **kwargs)
+
+        with patch.object(
+            medal_fact_collection, "bulk_write", side_effect=bulk_write_after_concurrent_write
+        ):
+            response = self.update_medal(1, 1, [("US", 5, 0, 0)])
+
+        self.assertEqual(response.json()["results"][0]["result"], "failed")
+        self.assertEqual(self.db["MedalFact"].find_one({"_id": "US:1:1"})["gold"], 3)
+        self.assertEqual(self.counter("country:US"), (1, 0, 0))
+
+    def test_dual_writes_both_layouts(self):
+        """Test that the dual layout writes the Medal documents and the facts."""
+        self.layout(DUAL)
+
+        self.update_medal(1, 1, [("US", 2, 0, 0)])
+
+        self.assertEqual(self.db["Medal"].find_one({"country_code": "US"})["sports"][0]["gold"], 2)
+        self.assertEqual(self.db["MedalFact"].find_one({"_id": "US:1:1"})["gold"], 2)
+        self.assertEqual(self.counter("country:US"), (2, 0, 0))
+
+    def test_fact_changes_reach_the_read_models(self):
+        """Ensure the change of a fact written by another process is applied to the table."""
+        self.layout(FLAT)
+        self.assertEqual(self.fastapi_client.get("/medals").json(), {})
+
+        invalidation_bus.emit(
+            {
+                "operationType": "insert",
+                "ns": {"db": "Sota", "coll": "MedalFact"},
+                "fullDocument": {
+                    "_id": "HU:1:1", "country_code": "HU", "sport_id": 1, "type_id": 1,
+                    "gold": 2, "silver": 0, "bronze": 0,
+                },
+            }
+        )
+
+        self.assertEqual(self.fastapi_client.get("/medals").json()["HU"]["gold"], 2)
+
+    def test_resumable_migration(self):
+        """Verify the migration copies in batches, resumes after an interruption and verifies."""
+        for index, country in enumerate(("US", "HU", "AU")):
+            self.update_medal(1, 1, [(country, 1, 0, index)])
+
+        state = migrate(batch_size=2, max_batches=1)
+        self.assertEqual((state["phase"], state["copied"]), ("copy", 2))
+        self.assertEqual(self.db["MedalFact"].count_documents({}), 2)
+
+        # written by the API in the dual layout while the migration was stopped
+        self.layout(DUAL)
+        self.update_medal(1, 1, [("US", 4, 0, 0)])
+
+        state = migrate(batch_size=2)
+        self.assertEqual(state["phase"], "done")
+        self.assertEqual(state["copied"], 3)
+        self.assertEqual(state["report"]["repaired_facts"], 0)
+        self.assertEqual(self.db["MedalFact"].find_one({"_id": "US:1:1"})["gold"], 4)
+        self.assertEqual(self.counter("country:US"), (4, 0, 0))
+        self.assertEqual(self.counter("sport:1"), (6, 0, 3))
+
+        self.layout(FLAT)
+        medal_standings.invalidate()
+        self.assertTrue(medal_standings.check()["consistent"])
+
+    def test_verify_repairs_facts(self):
+        """Test that the facts differing from the Medal documents are written again."""
+        self.update_medal(1, 1, [("US", 1, 0, 0)])
+        migrate()
+        self.db["MedalFact"].update_one({"_id": "US:1:1"}, {"$set": {"gold": 7}})
+
+        state = migrate()
+
+        self.assertEqual(state["report"]["repaired_facts"], 1)
+        self.assertEqual(self.db["MedalFact"].find_one({"_id": "US:1:1"})["gold"], 1)
+        self.assertEqual(self.counter("country:US"), (1, 0, 0))
+
+    def test_migration_after_the_flat_switch_keeps_the_facts(self):
+        """Ensure migrating again once the workers write the flat layout keeps the facts written since."""
+        self.layout(DUAL)
+        self.update_medal(1, 1, [("US", 1, 0, 0)])
+        migrate()
+
+        self.layout(FLAT)
+        self.update_medal(1, 1, [("US", 5, 0, 0)])
+        state = migrate()
+
+        self.assertEqual(state["report"]["repaired_facts"], 0)
+        self.assertEqual(state["report"]["unrepaired_facts"], 1)
+        self.assertEqual(self.db["MedalFact"].find_one({"_id": "US:1:1"})["gold"], 5)
+        self.assertEqual(self.counter("country:US"), (5, 0, 0))
+        self.assertEqual(self.counter("sport:1"), (5, 0, 0))
+
+    def test_counter_repair_keeps_concurrent_writes(self):
+        """Check that repairing a counter doesn't lose the increment of a write made meanwhile."""
+        self.update_medal(1, 1, [("US", 1, 0, 0)])
+        migrate()
+        self.db["MedalCounter"].update_one({"_id": "country:US"}, {"$set": {"gold": 9}})
+        original_aggregate = medal_fact_collection.aggregate
+        calls = []
+
+        def aggregate_before_concurrent_write(pipeline):
+            result = list(original_aggregate(pipeline))
+            if not calls:
+                # written by a worker once the facts were summed
+                medal_fact_collection.update_one({"_id": "US:1:1"}, {"$set": {"gold": 5}})
+                for counter_id in ("country:US", "sport:1"):
+                    self.db["MedalCounter"].update_one({"_id": counter_id}, {"$inc": {"gold": 4}})
+            calls.append(pipeline)
+            return result
+
+        with patch.object(
+            medal_fact_collection, "aggregate", side_effect=aggregate_before_concurrent_write
+        ):
+            repaired = compute_counters()
+
+        self.assertEqual(repaired, 1)
+        self.assertEqual(self.counter("country:US"), (5, 0, 0))
+        self.assertEqual(self.counter("sport:1"), (5, 0, 0))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
+
+
+if __name__ == "__main__":
+    unittest.main()
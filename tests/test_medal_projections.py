@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota.projections import medal_projections
+
+
+class TestMedalProjections(setUpTest):
+    """
+    Tests for the precomputed documents served by the '/medal' routes.
+
+    This test suite verifies that the documents are read without querying the database
+    and that a medal update refreshes the documents of the written country, sport and
+    sub-sport while leaving the others untouched.
+    """
+
+    MEDAL_TOKEN = "medal" * 4
+    KEYS_DATA = [
+        {
+            "key": MEDAL_TOKEN,
+            "scope": {"PUBLISH_AUDIENCE": False, "PUBLISH_MEDAL": True},
+        },
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def setUp(self):
+        """Start every test from an empty Medal collection and freshly built documents."""
+        self.db["Medal"].delete_many({})
+        medal_projections.rebuild()
+
+    def update_medal(self, sport_id, sport_type_id, participants):
+        """Send a medal update and check it succeeded."""
+        payload = {
+            "sport_id": sport_id,
+            "sport_type_id": sport_type_id,
+            "participants": [
+                {
+                    "country": country,
+                    "medal": {"gold": gold, "silver": silver, "bronze": bronze},
+                }
+                for country, (gold, silver, bronze) in participants.items()
+            ],
+        }
+        response = self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_reads_do_not_query_the_database(self):
+        """Ensure the '/medal' routes are answered from memory once the documents are built."""
+        self.update_medal(1, 1, {"US": (1, 0, 0)})
+
+        with patch("sota.projections.medal_collection.find") as mock_find, patch(
+            "sota.projections.medal_collection.aggregate"
+        ) as mock_aggregate:
+            self.assertEqual(
+                self.fastapi_client.get("/medal/c/US").status_code, status.HTTP_200_OK
+            )
+            self.fastapi_client.get("/medal/s/1")
+            self.fastapi_client.get("/medal/s/1/t/1")
+
+        mock_find.assert_not_called()
+        mock_aggregate.assert_not_called()
+
+    def test_update_refreshes_affected_documents(self):
+        """Verify that the country, sport and sub-sport documents follow a medal update."""
+        self.update_medal(1, 1, {"US": (1, 0, 0), "HU": (0, 1, 0)})
+        self.update_medal(1, 2, {"US": (0, 0, 1)})
+        self.update_medal(1, 1, {"US": (0, 1, 0), "HU": (1, 0, 0)})
+
+        country = self.fastapi_client.get("/medal/c/US").json()
+        self.assertEqual(
+            {medal: country[medal] for medal in ("gold", "silver", "bronze")},
+            {"gold": 0, "silver": 1, "bronze": 1},
+        )
+        self.assertEqual(
+            [sub["sub_id"] for sub in country["individual_sports"][0]["sub_sports"]],
+            [1, 2],
+        )
+
+        sport = self.fastapi_client.get("/medal/s/1").json()
+        self.assertEqual(
+            {medal: sport[medal] for medal in ("gold", "silver", "bronze")},
+            {"gold": 1, "silver": 1, "bronze": 1},
+        )
+
+        sub_sport = self.fastapi_client.get("/medal/s/1/t/1").json()
+        self.assertEqual(
+            [
+                (row["country_code"], row["gold"], row["silver"])
+                for row in sub_sport["individual_countries"]
+            ],
+            [("HU", 1, 0), ("US", 0, 1)],
+        )
+
+    def test_update_leaves_other_documents_untouched(self):
+        """Test that documents unrelated to an update are not computed again."""
+        self.update_medal(1, 1, {"HU": (0, 1, 0)})
+        self.update_medal(6, 1, {"US": (1, 0, 0)})
+        hungary = medal_projections.country("HU")
+        basketball = medal_projections.sport(6)
+
+        self.update_medal(1, 1, {"US": (0, 0, 1)})
+
+        self.assertIs(medal_projections.country("HU"), hungary)
+        self.assertIs(medal_projections.sport(6), basketball)
+        self.assertEqual(medal_projections.sport(1)["bronze"], 1)
+
+    def test_database_matches_projection_after_rebuild(self):
+        """Check that rebuilding from the database gives the documents kept up to date by writes."""
+        self.update_medal(1, 1, {"US": (1, 0, 0), "HU": (0, 1, 0)})
+        self.update_medal(6, 1, {"US": (0, 0, 1)})
+        documents = (
+            medal_projections.country("US"),
+            medal_projections.sport(1),
+            medal_projections.sub_sport(6, 1),
+        )
+
+        medal_projections.rebuild()
+
+        self.assertEqual(
+            (
+                medal_projections.country("US"),
+                medal_projections.sport(1),
+                medal_projections.sub_sport(6, 1),
+            ),
+            documents,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
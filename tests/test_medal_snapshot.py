@@ -0,0 +1,243 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from sota.broadcaster import MedalBroadcaster
+from sota.medal_snapshot import MedalSnapshot, SnapshotFull
+from sota.projections import MedalProjections
+from sota.standings import MedalStandings
+
+
+def snapshot_path():
+    directory = tempfile.mkdtemp()
+    return os.path.join(directory, "medals")
+
+
+CELLS = {
+    ("HU", 1, 1): (1, 0, 0),
+    ("HU", 1, 2): (0, 2, 0),
+    ("CA", 1, 1): (0, 1, 1),
+}
+NAMES = {"HU": "Hungary", "CA": "Canada"}
+
+
+class TestMedalSnapshot(setUpTest):
+    """
+    Tests for the medal snapshot shared by the worker processes.
+
+    This test suite verifies the cells and totals read back from the mapped file,
+    by this process and by another one, that a snapshot is published once per file,
+    that readers never see a write half done, and that the standings and projections
+    backed by a snapshot serve the same data as the in-memory ones.
+    """
+
+    def setUp(self):
+        """Map a new snapshot file for every test."""
+        self.snapshot = MedalSnapshot(
+            path=snapshot_path(), max_countries=8, max_sub_sports=8, enabled=True
+        )
+        self.snapshot.open()
+        self.addCleanup(self.snapshot.unlink)
+
+    def test_published_cells_and_totals(self):
+        """Verify that the published cells are read back with the totals of their countries."""
+        self.assertFalse(self.snapshot.ready)
+        self.snapshot.publish(CELLS, NAMES)
+
+        self.assertTrue(self.snapshot.ready)
+        self.assertEqual(self.snapshot.cell("HU", 1, 2), (0, 2, 0))
+        self.assertIsNone(self.snapshot.cell("CA", 1, 2))
+        self.assertEqual(self.snapshot.totals(), {"HU": (1, 2, 0), "CA": (0, 1, 1)})
+        self.assertEqual(self.snapshot.cells(), (NAMES, CELLS))
+
+    def test_updates_add_countries_and_sub_sports(self):
+        """Ensure an update overwrites cells, and appends new countries and sub-sports."""
+        self.snapshot.publish(CELLS, NAMES)
+        sequence = self.snapshot.sequence()
+
+        self.snapshot.update({("HU", 1, 1): (3, 0, 0), ("FR", 2, 1): (0, 0, 1)}, {"FR": "France"}.get)
+
+        self.assertEqual(self.snapshot.sequence(), sequence + 2)
+        self.assertEqual(self.snapshot.totals()["HU"], (3, 2, 0))
+        self.assertEqual(self.snapshot.cell("FR", 2, 1), (0, 0, 1))
+        self.assertEqual(self.snapshot.cells()[0]["FR"], "France")
+
+    def test_capacity(self):
+        """Check that outgrowing the capacities raises instead of writing past them."""
+        cells = {(f"C{index}", 1, index): (1, 0, 0) for index in range(9)}
+        names = {country_code: country_code for country_code, _, _ in cells}
+        with self.assertRaises(SnapshotFull):
+            self.snapshot.publish(cells, names)
+
+    def test_published_once(self):
+        """Test that only the first worker loads the snapshot, until it is invalidated."""
+        loads = []
+
+        def load():
+            loads.append(1)
+            return CELLS, NAMES
+
+        other = MedalSnapshot(path=self.snapshot.path, max_countries=8, max_sub_sports=8)
+        other.open()
+        self.addCleanup(other.close)
+
+        self.assertTrue(self.snapshot.publish_once(load))
+        self.assertFalse(other.publish_once(load))
+        other.invalidate()
+        self.assertFalse(self.snapshot.ready)
+        self.assertTrue(self.snapshot.publish_once(load))
+        self.assertEqual(len(loads), 2)
+
+    def test_emptied_for_another_server_start(self):
+        """Ensure the file of a previous start of the server isn't served again."""
+        self.snapshot.publish(CELLS, NAMES)
+        self.snapshot.close()
+
+        restarted = MedalSnapshot(
+            path=self.snapshot.path, max_countries=8, max_sub_sports=8, token="restarted"
+        )
+        restarted.open()
+        self.addCleanup(restarted.close)
+
+        self.assertFalse(restarted.ready)
+        self.assertEqual(restarted.totals(), {})
+
+    def test_removed_by_the_last_process(self):
+        """Verify the file is removed on shutdown by the last process mapping it."""
+        script = (
+            "from sota.medal_snapshot import MedalSnapshot\n"
+            f"snapshot = MedalSnapshot(path={self.snapshot.path!r}, max_countries=8, max_sub_sports=8)\n"
+            "snapshot.open()\n"
+            "snapshot.release()\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True)
+        self.assertTrue(os.path.exists(self.snapshot.path))
+
+        self.snapshot.release()
+        self.assertFalse(os.path.exists(self.snapshot.path))
+
+    def test_repaired_after_a_dead_writer(self):
+        """Check that a sequence left odd by a killed writer doesn't block the readers."""
+        self.snapshot.publish(CELLS, NAMES)
+        script = (
+            "import os\n"
+            "from sota.medal_snapshot import MedalSnapshot\n"
+            f"snapshot = MedalSnapshot(path={self.snapshot.path!r}, max_countries=8, max_sub_sports=8)\n"
+            "snapshot.open()\n"
+            "with snapshot._writing():\n"
+            "    os._exit(0)\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True)
+        self.assertEqual(self.snapshot.sequence() % 2, 1)
+
+        self.assertFalse(self.snapshot.ready)
+        self.assertEqual(self.snapshot.sequence() % 2, 0)
+        self.assertTrue(self.snapshot.publish_once(lambda: (CELLS, NAMES)))
+        self.assertEqual(self.snapshot.totals()["HU"], (1, 2, 0))
+
+    def test_shared_with_another_process(self):
+        """Verify that another process mapping the file reads the cells written by this one."""
+        self.snapshot.publish(CELLS, NAMES)
+        script = (
+            "from sota.medal_snapshot import MedalSnapshot\n"
+            f"snapshot = MedalSnapshot(path={self.snapshot.path!r}, max_countries=8, max_sub_sports=8)\n"
+            "snapshot.open()\n"
+            "print(snapshot.cell('CA', 1, 1))\n"
+            "snapshot.update({('CA', 1, 1): (5, 1, 1)}, str)\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        ).stdout
+
+        self.assertEqual(output.strip(), "(0, 1, 1)")
+        self.assertEqual(self.snapshot.totals()["CA"], (5, 1, 1))
+
+    def test_readers_see_whole_writes(self):
+        """Ensure a reader racing a writer only sees totals matching the cells."""
+        self.snapshot.publish({("HU", 1, 1): (0, 0, 0), ("HU", 1, 2): (0, 0, 0)}, NAMES)
+        done = threading.Event()
+
+        def write():
+            for gold in range(1, 2000):
+                self.snapshot.update({("HU", 1, 1): (gold, 0, 0), ("HU", 1, 2): (gold, 0, 0)}, str)
+            done.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not done.is_set():
+            names, cells = self.snapshot.cells()
+            self.assertEqual(cells[("HU", 1, 1)], cells[("HU", 1, 2)])
+            self.assertEqual(self.snapshot.totals()["HU"][0] % 2, 0)
+        writer.join()
+
+    def test_read_models_backed_by_the_snapshot(self):
+        """Check that the standings and projections serve the same data from the snapshot."""
+        self.db["Medal"].delete_many({})
+        self.db["Medal"].insert_many(
+            [
+                {
+                    "country_code": "HU",
+                    "country_name": "Hungary",
+                    "sports": [{"sport_id": 1, "type_id": 1, "gold": 1, "silver": 0, "bronze": 0}],
+                },
+                {
+                    "country_code": "CA",
+                    "country_name": "Canada",
+                    "sports": [{"sport_id": 1, "type_id": 1, "gold": 0, "silver": 1, "bronze": 0}],
+                },
+            ]
+        )
+        local = MedalStandings(collection=self.db["Medal"], snapshot=MedalSnapshot(enabled=False))
+        shared = MedalStandings(collection=self.db["Medal"], snapshot=self.snapshot)
+        projections = MedalProjections(medal=self.db["Medal"], snapshot=self.snapshot)
+        local.load()
+        shared.load()
+        self.assertEqual(shared.table(), local.table())
+        hungary = projections.country("HU")
+
+        # written by another worker
+        other = MedalStandings(
+            collection=self.db["Medal"],
+            snapshot=MedalSnapshot(path=self.snapshot.path, max_countries=8, max_sub_sports=8, enabled=True),
+        )
+        other.apply("HU", 1, 1, {"gold": 2, "silver": 0, "bronze": 0})
+
+        self.assertEqual(shared.table()["HU"]["gold"], 2)
+        self.assertEqual(shared.cell("HU", 1, 1), {"gold": 2, "silver": 0, "bronze": 0})
+        self.assertNotEqual(projections.country("HU"), hungary)
+        self.assertEqual(projections.country("HU")["gold"], 2)
+
+    def test_invalidated_views_read_the_snapshot_again(self):
+        """Ensure invalidating the standings of a worker doesn't load the medals from the database again."""
+        self.snapshot.publish(CELLS, NAMES)
+        standings = MedalStandings(collection=self.db["Medal"], snapshot=self.snapshot)
+        standings.table()
+
+        with patch("sota.standings.read_medals") as read_medals:
+            standings.invalidate()
+            table = standings.table()
+
+        read_medals.assert_not_called()
+        self.assertTrue(self.snapshot.ready)
+        self.assertEqual(table["CA"], {"gold": 0, "silver": 1, "bronze": 1})
+
+    def test_changes_published_once(self):
+        """Test that the broadcaster drops the changes it already published."""
+        broadcaster = MedalBroadcaster()
+        event = {"country": "HU", "sport_id": 1, "type_id": 1, "gold": 1, "silver": 0, "bronze": 0}
+
+        broadcaster.publish_new([event])
+        token = broadcaster.stats()["last_token"]
+        broadcaster.publish_new([event])
+        self.assertEqual(broadcaster.stats()["last_token"], token)
+
+        broadcaster.publish_new([event, {**event, "gold": 2}])
+        self.assertTrue(broadcaster.stats()["last_token"].endswith("-2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
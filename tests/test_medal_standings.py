@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota.data_versions import data_versions
+from sota.invalidation import invalidation_bus, POLLING
+from sota.standings import medal_standings
+
+
+class TestMedalStandings(setUpTest):
+    """
+    Tests for the in-memory medal standings served by 'GET /medals'.
+
+    This test suite verifies that the standings follow the writes of '/medals/update_medal'
+    without double counting, and that the admin endpoints detect and repair a table
+    which has diverged from the Medal collection.
+    """
+
+    MEDAL_TOKEN = "medal" * 4
+    ADMIN_TOKEN = "admin" * 4
+    KEYS_DATA = [
+        {
+            "key": MEDAL_TOKEN,
+            "scope": {"PUBLISH_AUDIENCE": False, "PUBLISH_MEDAL": True},
+        },
+        {
+            "key": ADMIN_TOKEN,
+            "scope": {"ADMIN": True},
+        },
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def setUp(self):
+        """Start every test from an empty Medal collection and standings."""
+        self.db["Medal"].delete_many({})
+        medal_standings.invalidate()
+
+    def update_medal(self, sport_id, sport_type_id, country, gold, silver, bronze):
+        """Send a medal update for a single participant and check it succeeded."""
+        payload = {
+            "sport_id": sport_id,
+            "sport_type_id": sport_type_id,
+            "participants": [
+                {
+                    "country": country,
+                    "medal": {"gold": gold, "silver": silver, "bronze": bronze},
+                }
+            ],
+        }
+        response = self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_medals_follows_updates(self):
+        """Ensure the totals add up the sub-sports and replace, not add, rewritten cells."""
+        self.assertEqual(self.fastapi_client.get("/medals").json(), {})
+
+        self.update_medal(1, 1, "US", 1, 0, 0)
+        self.update_medal(1, 2, "US", 0, 1, 1)
+        self.update_medal(1, 1, "US", 2, 0, 0)
+
+        response = self.fastapi_client.get("/medals")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"US": {"gold": 2, "silver": 1, "bronze": 1}})
+
+    def test_check_reports_consistent_standings(self):
+        """Verify that the standings kept up to date by writes match the aggregation."""
+        self.update_medal(1, 1, "US", 1, 2, 3)
+        self.fastapi_client.get("/medals")
+        self.update_medal(1, 1, "US", 3, 2, 1)
+
+        response = self.fastapi_client.get(
+            "/admin/medals/check", headers={"Authorization": f"Bearer {self.ADMIN_TOKEN}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"consistent": True, "mismatches": {}})
+
+    def test_rebuild_repairs_diverged_standings(self):
+        """Test that a write done behind the API is detected, then fixed by a rebuild."""
+        self.update_medal(1, 1, "US", 1, 0, 0)
+        self.fastapi_client.get("/medals")
+        self.db["Medal"].update_one(
+            {"country_code": "US"}, {"$set": {"sports.0.gold": 5}}
+        )
+
+        check = medal_standings.check()
+        self.assertFalse(check["consistent"])
+        self.assertEqual(
+            check["mismatches"]["US"],
+            {
+                "read_model": {"gold": 1, "silver": 0, "bronze": 0},
+                "database": {"gold": 5, "silver": 0, "bronze": 0},
+            },
+        )
+
+        response = self.post_request("/admin/medals/rebuild", self.ADMIN_TOKEN, None)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["consistent"])
+        self.assertEqual(
+            self.fastapi_client.get("/medals").json(),
+            {"US": {"gold": 5, "silver": 0, "bronze": 0}},
+        )
+
+    def test_rebuild_changes_the_shared_etag(self):
+        """Ensure a rebuild changes the ETag of the medals built from the versions shared by the workers."""
+        with patch.object(invalidation_bus, "mode", POLLING), patch.object(
+            data_versions, "_shared", {}
+        ):
+            etag = self.fastapi_client.get("/medals").headers["ETag"]
+            response = self.post_request("/admin/medals/rebuild", self.ADMIN_TOKEN, None)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            self.assertNotEqual(self.fastapi_client.get("/medals").headers["ETag"], etag)
+
+    def test_admin_endpoints_require_admin_scope(self):
+        """Check that a key without the ADMIN scope cannot rebuild the standings."""
+        response = self.post_request("/admin/medals/rebuild", self.MEDAL_TOKEN, None)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+from .base import setUpTest
+from sota.broadcaster import MedalBroadcaster, RESET, medal_broadcaster
+from sota.data_versions import data_versions
+from sota.routers.stream_router import sse_events
+
+
+class TestMedalStream(setUpTest):
+    """
+    Tests for the stream of medal changes.
+
+    This test suite verifies that medal updates are pushed to the subscribers,
+    that reconnecting clients resume from their token, and that slow
+    subscribers are dropped instead of buffering without bound.
+    """
+
+    MEDAL_TOKEN = "medal" * 4
+    KEYS_DATA = [{"key": MEDAL_TOKEN, "scope": {"PUBLISH_MEDAL": True}}]
+    EVENT = {"country": "US", "sport_id": 1, "type_id": 1, "gold": 1, "silver": 0, "bronze": 0}
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def test_medal_update_is_pushed(self):
+        """Ensure a committed medal update reaches the WebSocket subscribers."""
+        with self.fastapi_client.websocket_connect("/medals/stream/ws") as websocket:
+            response = self.post_request(
+                "/medals/update_medal",
+                self.MEDAL_TOKEN,
+                {
+                    "sport_id": 1,
+                    "sport_type_id": 1,
+                    "participants": [{"country": "US", "medal": {"gold": 3}}],
+                },
+            )
+            self.assertEqual(response.status_code, 200)
+            message = websocket.receive_json()
+
+        self.assertEqual(
+            message["event"],
+            {"country": "US", "sport_id": 1, "type_id": 1, "gold": 3, "silver": 0, "bronze": 0},
+        )
+        self.assertTrue(message["token"].startswith(data_versions.boot_id))
+
+    def test_resume_from_token(self):
+        """Verify that a client reconnecting with a token receives the events it missed."""
+        token = medal_broadcaster.stats()["last_token"]
+        medal_broadcaster.publish([self.EVENT, {**self.EVENT, "country": "HU"}])
+
+        with self.fastapi_client.websocket_connect(
+            f"/medals/stream/ws?resume={token}"
+        ) as websocket:
+            first = websocket.receive_json()
+            second = websocket.receive_json()
+
+        self.assertEqual(first["event"]["country"], "US")
+        self.assertEqual(second["event"]["country"], "HU")
+
+    def test_unknown_token_resets(self):
+        """Test that a token issued by another process asks the client to refetch."""
+        with self.fastapi_client.websocket_connect(
+            "/medals/stream/ws?resume=otherboot-3"
+        ) as websocket:
+            self.assertEqual(websocket.receive_json()["event"], RESET)
+
+    def test_slow_subscriber_is_dropped(self):
+        """Ensure a subscriber whose queue is full is dropped."""
+        broadcaster = MedalBroadcaster(queue_size=2, history_size=10)
+
+        async def run():
+            subscription = broadcaster.subscribe()
+            broadcaster.publish([self.EVENT] * 3)
+            await asyncio.sleep(0)
+            dropped = await subscription.get(1)
+            broadcaster.publish([self.EVENT])
+            return dropped
+
+        self.assertIsNone(asyncio.run(run()))
+        self.assertEqual(broadcaster.stats()["subscribers"], 0)
+        self.assertEqual(broadcaster.stats()["dropped"], 1)
+
+    def test_server_sent_events(self):
+        """Check the format of the Server-Sent Events and the heartbeats."""
+        broadcaster = MedalBroadcaster(queue_size=2, history_size=10)
+
+        async def run():
+            events = sse_events(broadcaster.subscribe(), heartbeat=0.01)
+            heartbeat = await anext(events)
+            broadcaster.publish([self.EVENT])
+            event = await anext(events)
+            await events.aclose()
+            return heartbeat, event
+
+        heartbeat, event = asyncio.run(run())
+        self.assertEqual(heartbeat, ": heartbeat\n\n")
+        self.assertEqual(
+            event,
+            f"id: {data_versions.boot_id}-1\nevent: medal\n"
+            'data: {"country": "US", "sport_id": 1, "type_id": 1, "gold": 1, "silver": 0, "bronze": 0}\n\n',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
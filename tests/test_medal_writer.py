@@ -0,0 +1,252 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+from pymongo.errors import AutoReconnect
+from .base import setUpTest
+from fastapi import status
+from sota.database_connection import medal_collection
+from sota.broadcaster import medal_broadcaster
+from sota.medal_writer import MedalWriteCoalescer, medal_coalescer
+from sota.routers.medals_router import RequestUpdateMedal, update_medal
+from sota.standings import medal_standings
+
+
+class TestMedalWriter(setUpTest):
+    """
+    Tests for the bulk write behind '/medals/update_medal'.
+
+    This test suite verifies the outcome reported for every participant, that a batch
+    costs the same number of round trips whatever its size, that a sub-sport is
+    never duplicated in the medals of a country, and that concurrent updates are
+    merged into one commit when coalescing.
+    """
+
+    MEDAL_TOKEN = "medal" * 4
+    KEYS_DATA = [
+        {
+            "key": MEDAL_TOKEN,
+            "scope": {"PUBLISH_AUDIENCE": False, "PUBLISH_MEDAL": True},
+        },
+    ]
+
+    # countries participating in sport 1, type 1
+    COUNTRIES = ["US", "HU", "AU", "BR", "CA", "CN", "DE", "FR", "GB", "JP"]
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def setUp(self):
+        """Start every test with a single country having medals in sport 1, type 1."""
+        self.db["Medal"].delete_many({})
+        self.db["Medal"].insert_one(
+            {
+                "country_code": "US",
+                "country_name": "United States",
+                "sports": [
+                    {"sport_id": 1, "type_id": 1, "gold": 0, "silver": 0, "bronze": 0}
+                ],
+            }
+        )
+
+    def update_medal(self, sport_id, sport_type_id, participants):
+        """Send a medal update with the given (country, gold) participants."""
+        payload = {
+            "sport_id": sport_id,
+            "sport_type_id": sport_type_id,
+            "participants": [
+                {"country": country, "medal": {"gold": gold}}
+                for country, gold in participants
+            ],
+        }
+        return self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+
+    def test_results_report_each_participant(self):
+        """Ensure existing sub-sports are updated, new ones added and new countries created."""
+        self.db["Medal"].insert_one(
+            {"country_code": "HU", "country_name": "Hungary", "sports": []}
+        )
+
+        response = self.update_medal(1, 1, [("US", 1), ("HU", 2), ("AU", 3)])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"country": "US", "result": "updated"},
+                {"country": "HU", "result": "added"},
+                {"country": "AU", "result": "created"},
+            ],
+        )
+        golds = {
+            document["country_code"]: document["sports"][0]["gold"]
+            for document in self.db["Medal"].find()
+        }
+        self.assertEqual(golds, {"US": 1, "HU": 2, "AU": 3})
+        self.assertEqual(
+            self.db["Medal"].find_one({"country_code": "AU"})["country_name"],
+            "Australia",
+        )
+
+    def test_batch_costs_two_round_trips(self):
+        """Verify a batch is one read and one bulk write, however many participants it has."""
+        with patch.object(
+            medal_collection, "find", wraps=medal_collection.find
+        ) as mock_find, patch.object(
+            medal_collection, "bulk_write", wraps=medal_collection.bulk_write
+        ) as mock_bulk_write, patch.object(
+            medal_collection, "update_one"
+        ) as mock_update_one, patch.object(
+            medal_collection, "insert_one"
+        ) as mock_insert_one:
+            response = self.update_medal(
+                1, 1, [(country, 1) for country in self.COUNTRIES]
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_find.call_count, 1)
+        self.assertEqual(mock_bulk_write.call_count, 1)
+        mock_update_one.assert_not_called()
+        mock_insert_one.assert_not_called()
+        self.assertEqual(self.db["Medal"].count_documents({}), len(self.COUNTRIES))
+
+    def test_repeated_country_keeps_last_medals(self):
+        """Test that a country listed twice in a batch is written once with its last medals."""
+        response = self.update_medal(1, 1, [("US", 1), ("US", 4)])
+
+        self.assertEqual(response.json()["results"], [{"country": "US", "result": "updated"}])
+        self.assertEqual(
+            self.db["Medal"].find_one({"country_code": "US"})["sports"],
+            [{"sport_id": 1, "type_id": 1, "gold": 4, "silver": 0, "bronze": 0}],
+        )
+
+    def test_concurrently_created_sub_sport_is_not_duplicated(self):
+        """Check that a push racing with the creation of the same sub-sport fails instead of duplicating it."""
+        self.db["Medal"].create_index("country_code", unique=True)
+        concurrent_sport = {"sport_id": 1, "type_id": 2, "gold": 1, "silver": 0, "bronze": 0}
+        original_bulk_write = medal_collection.bulk_write
+
+        def bulk_write_after_concurrent_push(requests, **kwargs):
+            medal_collection.update_one(
+                {"country_code": "US"}, {"$push": {"sports": concurrent_sport}}
+            )
+            return original_bulk_write(requests, **kwargs)
+
+        try:
+            with patch.object(
+                medal_collection, "bulk_write", side_effect=bulk_write_after_concurrent_push
+            ):
+                response = self.update_medal(1, 2, [("US", 5)])
+        finally:
+            self.db["Medal"].drop_index("country_code_1")
+
+        result = response.json()["results"][0]
+        self.assertEqual(result["result"], "failed")
+        self.assertIn("detail", result)
+        self.assertEqual(
+            self.db["Medal"].find_one({"country_code": "US"})["sports"][1:],
+            [concurrent_sport],
+        )
+
+    def test_concurrent_writes_share_a_commit(self):
+        """Ensure the writes of a window are one bulk write, the last write of a cell winning."""
+        coalescer = MedalWriteCoalescer(window_ms=5)
+        gold = {"gold": 1, "silver": 0, "bronze": 0}
+        silver = {"gold": 0, "silver": 1, "bronze": 0}
+
+        async def scenario():
+            return await asyncio.gather(
+                coalescer.write({("US", 1, 1): gold, ("HU", 1, 1): gold}),
+                coalescer.write({("US", 1, 1): silver}),
+                coalescer.write({("AU", 1, 1): silver}),
+            )
+
+        with patch.object(
+            medal_collection, "bulk_write", wraps=medal_collection.bulk_write
+        ) as mock_bulk_write:
+            first, second, third = asyncio.run(scenario())
+
+        self.assertEqual(mock_bulk_write.call_count, 1)
+        self.assertEqual(
+            first,
+            {("US", 1, 1): {"result": "updated"}, ("HU", 1, 1): {"result": "created"}},
+        )
+        self.assertEqual(second, {("US", 1, 1): {"result": "updated"}})
+        self.assertEqual(third, {("AU", 1, 1): {"result": "created"}})
+        self.assertEqual(
+            self.db["Medal"].find_one({"country_code": "US"})["sports"],
+            [{"sport_id": 1, "type_id": 1, **silver}],
+        )
+        self.assertEqual(coalescer.stats()["commits"], 1)
+        self.assertEqual(coalescer.stats()["writes"], 3)
+
+    def test_failed_commit_fails_every_write(self):
+        """Verify that every request of a batch gets the error of its commit."""
+        coalescer = MedalWriteCoalescer(window_ms=1)
+        medal = {"gold": 1, "silver": 0, "bronze": 0}
+
+        async def scenario():
+            return await asyncio.gather(
+                coalescer.write({("US", 1, 1): medal}),
+                coalescer.write({("HU", 1, 1): medal}),
+                return_exceptions=True,
+            )
+
+        with patch.object(medal_collection, "bulk_write", side_effect=AutoReconnect("down")):
+            results = asyncio.run(scenario())
+
+        self.assertTrue(all(isinstance(result, AutoReconnect) for result in results))
+
+    def test_route_with_coalescing(self):
+        """Test that the route reports the outcome of its own participants when coalescing."""
+        with patch.object(medal_coalescer, "window", 0.001):
+            response = self.update_medal(1, 1, [("US", 2), ("HU", 1)])
+
+        self.assertEqual(
+            response.json()["results"],
+            [{"country": "US", "result": "updated"}, {"country": "HU", "result": "created"}],
+        )
+        self.assertEqual(self.fastapi_client.get("/medals").json()["US"]["gold"], 2)
+
+    def test_coalesced_writes_applied_in_arrival_order(self):
+        """Check that the callers of a commit apply and publish their medals in the order they arrived."""
+        requests = [
+            RequestUpdateMedal(
+                sport_id=1, sport_type_id=1, participants=[{"country": "US", "medal": {"gold": gold}}]
+            )
+            for gold in (1, 2)
+        ]
+        medal_standings.rebuild()
+        apply = medal_standings.apply
+        applied = []
+
+        def slow_first_apply(country_code, sport_id, type_id, medal):
+            # the first writer is the slower one to apply
+            if medal["gold"] == 1:
+                time.sleep(0.05)
+            applied.append(medal["gold"])
+            apply(country_code, sport_id, type_id, medal)
+
+        async def scenario():
+            subscription = medal_broadcaster.subscribe()
+            await asyncio.gather(*(update_medal(request) for request in requests))
+            events = [await subscription.get(1) for _ in requests]
+            medal_broadcaster.unsubscribe(subscription)
+            return events
+
+        with patch.object(medal_coalescer, "window", 0.005), patch.object(
+            medal_standings, "apply", side_effect=slow_first_apply
+        ):
+            events = asyncio.run(scenario())
+
+        self.assertEqual(applied, [1, 2])
+        self.assertEqual([event["gold"] for _, event in events], [1, 2])
+        self.assertEqual(medal_standings.cell("US", 1, 1)["gold"], 2)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,114 @@
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+from pymongo import monitoring
+from .base import setUpTest
+from fastapi import status
+from sota.database_connection import LazyHandle
+from sota.metrics import CommandMetrics, Exposition, Histogram
+
+ADDRESS = ("localhost", 27017)
+
+
+class TestMetrics(setUpTest):
+    """
+    Tests for the metrics exposed on '/metrics'.
+
+    This test suite verifies that the requests are counted and timed by route
+    template, that the Mongo commands are timed by collection and command, that
+    the histograms follow the Prometheus text format, and that scraping the
+    metrics doesn't touch the database.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the necessary resources for running the tests."""
+        super().setUpClass()
+
+    def scrape(self):
+        response = self.fastapi_client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.text.splitlines()
+
+    def sample(self, lines, prefix):
+        values = [line.rsplit(" ", 1)[1] for line in lines if line.startswith(prefix + " ")]
+        return float(values[0]) if values else 0.0
+
+    def test_requests_are_counted_by_route(self):
+        """Ensure the requests are labelled by the path template of their route."""
+        counter = 'sota_http_requests_total{method="GET",route="/sport/{sport_id}",status="200"}'
+        unmatched = 'sota_http_requests_total{method="GET",route="unmatched",status="404"}'
+        before = self.scrape()
+
+        self.fastapi_client.get("/sport/1")
+        self.fastapi_client.get("/sport/2")
+        self.fastapi_client.get("/no/such/route")
+        after = self.scrape()
+
+        self.assertEqual(self.sample(after, counter) - self.sample(before, counter), 2)
+        self.assertEqual(self.sample(after, unmatched) - self.sample(before, unmatched), 1)
+        self.assertIn(
+            'sota_http_request_duration_seconds_bucket{method="GET",route="/sport/{sport_id}",le="+Inf"}',
+            "\n".join(after),
+        )
+        # only the scrape itself is being served
+        self.assertEqual(self.sample(after, "sota_http_requests_in_flight"), 1)
+
+    def test_metrics_do_not_touch_the_database(self):
+        """Verify that a scrape is answered from the counters in memory."""
+        with patch.object(LazyHandle, "resolve", side_effect=AssertionError):
+            lines = self.scrape()
+
+        self.assertIn("# TYPE sota_mongo_pool_in_use gauge", lines)
+        self.assertIn("# TYPE sota_cache_hit_ratio gauge", lines)
+
+    def test_commands_are_timed_by_collection(self):
+        """Test that the command events are recorded under their collection and command."""
+        metrics = CommandMetrics(buckets=[0.001, 0.01])
+        metrics.started(
+            monitoring.CommandStartedEvent({"find": "Medal", "filter": {}}, "Sota", 1, ADDRESS, 1)
+        )
+        metrics.succeeded(
+            monitoring.CommandSucceededEvent(timedelta(milliseconds=5), {}, "find", 1, ADDRESS, 1)
+        )
+        metrics.started(
+            monitoring.CommandStartedEvent({"getMore": 7, "collection": "Medal"}, "Sota", 2, ADDRESS, 2)
+        )
+        metrics.failed(
+            monitoring.CommandFailedEvent(timedelta(milliseconds=20), {}, "getMore", 2, ADDRESS, 2)
+        )
+
+        durations, failures = metrics.snapshot()
+        self.assertEqual(durations[("Medal", "find")].counts, [0, 1, 0])
+        self.assertEqual(durations[("Medal", "getMore")].counts, [0, 0, 1])
+        self.assertEqual(failures, {("Medal", "getMore"): 1})
+
+    def test_histogram_exposition(self):
+        """Check that the buckets are cumulative and followed by the sum and the count."""
+        histogram = Histogram([0.1, 1])
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        exposition = Exposition()
+        exposition.histogram("latency_seconds", "Latency.", [((("route", "/"),), histogram)])
+
+        self.assertEqual(
+            exposition.text().splitlines(),
+            [
+                "# HELP latency_seconds Latency.",
+                "# TYPE latency_seconds histogram",
+                'latency_seconds_bucket{route="/",le="0.1"} 2',
+                'latency_seconds_bucket{route="/",le="1.0"} 3',
+                'latency_seconds_bucket{route="/",le="+Inf"} 4',
+                'latency_seconds_sum{route="/"} 3.65',
+                'latency_seconds_count{route="/"} 4',
+            ],
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from sota.database_connection import medal_collection
+from sota.pipelines import Pipeline, pipeline_timings
+from sota.standings import MEDAL_TOTALS, medal_standings
+
+
+class TestPipelines(setUpTest):
+    """
+    Tests for the aggregation pipelines built at import.
+
+    This test suite verifies that the stages are shared between runs, that the options
+    are given to the driver, and that every run is timed.
+    """
+
+    TEMPLATE = [
+        {"$match": {"country_code": "US"}},
+        {"$unwind": {"path": "$sports"}},
+        {"$group": {"_id": "$sports.sport_id", "gold": {"$sum": "$sports.gold"}}},
+    ]
+
+    def test_stages_are_shared_between_runs(self):
+        """Ensure every run gives the driver the stages built at import, without copying them."""
+        with patch.object(medal_collection, "aggregate", return_value=iter([])) as mock:
+            MEDAL_TOTALS.run(medal_collection)
+            MEDAL_TOTALS.run(medal_collection)
+
+        self.assertIs(mock.call_args_list[0].args[0], MEDAL_TOTALS.stages)
+        self.assertIs(mock.call_args_list[1].args[0], MEDAL_TOTALS.stages)
+
+    def test_options_are_given_to_the_driver(self):
+        """Test that the default options are merged with the options of the pipeline."""
+        pipeline = Pipeline(
+            "test", self.TEMPLATE, allowDiskUse=True, hint="country_code_1", batchSize=None
+        )
+
+        with patch.object(medal_collection, "aggregate", return_value=iter([])) as mock:
+            pipeline.run(medal_collection)
+
+        options = mock.call_args.kwargs
+        self.assertTrue(options["allowDiskUse"])
+        self.assertEqual(options["hint"], "country_code_1")
+        self.assertNotIn("batchSize", options)
+        self.assertIn("maxTimeMS", options)
+
+    def test_runs_are_timed(self):
+        """Check that the execution time of every run is recorded under its name."""
+        runs = pipeline_timings.stats().get("medal_totals", {}).get("runs", 0)
+
+        medal_standings.check()
+
+        timing = pipeline_timings.stats()["medal_totals"]
+        self.assertEqual(timing["runs"], runs + 1)
+        self.assertGreaterEqual(timing["max_ms"], timing["mean_ms"])
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
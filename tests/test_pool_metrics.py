@@ -0,0 +1,112 @@
+import os
+import unittest
+from unittest.mock import patch
+from pymongo import MongoClient, monitoring
+from .base import setUpTest
+from fastapi import status
+from sota.database_connection import client_options
+from sota.pool_metrics import PoolMetrics
+
+ADDRESS = ("localhost", 27017)
+
+
+class TestPoolMetrics(setUpTest):
+    """
+    Tests for the options and the metrics of the connection pools.
+
+    This test suite verifies that the pool options are read from the settings and
+    accepted by pymongo, that the pool events are counted, and that the counters
+    are exposed to admins.
+    """
+
+    ADMIN_TOKEN = "admin" * 4
+    KEYS_DATA = [{"key": ADMIN_TOKEN, "scope": {"ADMIN": True}}]
+    SETTINGS = {
+        "MONGO_MAX_POOL_SIZE": "20",
+        "MONGO_MIN_POOL_SIZE": "2",
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS": "500",
+        "MONGO_SERVER_SELECTION_TIMEOUT_MS": "2000",
+        "MONGO_READ_PREFERENCE": "secondaryPreferred",
+        "MONGO_COMPRESSORS": "zlib",
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def test_options_are_read_from_the_settings(self):
+        """Ensure only the options which are set are given to the clients."""
+        with patch.dict(os.environ, self.SETTINGS):
+            options = client_options()
+
+        self.assertEqual(
+            options,
+            {
+                "maxPoolSize": 20,
+                "minPoolSize": 2,
+                "waitQueueTimeoutMS": 500,
+                "serverSelectionTimeoutMS": 2000,
+                "readPreference": "secondaryPreferred",
+                "compressors": "zlib",
+            },
+        )
+        self.assertEqual(client_options(), {})
+
+    def test_options_are_accepted_by_pymongo(self):
+        """Verify that pymongo accepts the options and the listener."""
+        with patch.dict(os.environ, self.SETTINGS):
+            client = MongoClient(
+                "mongodb://localhost:27017",
+                connect=False,
+                event_listeners=[PoolMetrics()],
+                **client_options(),
+            )
+
+        pool_options = client.options.pool_options
+        self.assertEqual(pool_options.max_pool_size, 20)
+        self.assertEqual(pool_options.min_pool_size, 2)
+        self.assertEqual(pool_options.wait_queue_timeout, 0.5)
+        self.assertEqual(client.read_preference.mongos_mode, "secondaryPreferred")
+        client.close()
+
+    def test_pool_events_are_counted(self):
+        """Test the counters of checkouts, waits and pool exhaustion."""
+        metrics = PoolMetrics()
+        metrics.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+        metrics.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 2))
+        metrics.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1, 0.002))
+        metrics.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 2, 0.004))
+        metrics.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+        metrics.connection_check_out_failed(
+            monitoring.ConnectionCheckOutFailedEvent(
+                ADDRESS, monitoring.ConnectionCheckOutFailedReason.TIMEOUT, 0.5
+            )
+        )
+        metrics.connection_closed(monitoring.ConnectionClosedEvent(ADDRESS, 2, "idle"))
+
+        stats = metrics.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["in_use"], 1)
+        self.assertEqual(stats["max_in_use"], 2)
+        self.assertEqual(stats["exhausted"], 1)
+        self.assertEqual(stats["checkout_failures"], 1)
+        self.assertEqual(stats["open"], 1)
+        self.assertAlmostEqual(stats["wait_ms_max"], 4.0)
+        self.assertAlmostEqual(stats["wait_ms_mean"], 3.0)
+
+    def test_admin_stats(self):
+        """Check that the counters of both clients are exposed to admins."""
+        response = self.fastapi_client.get(
+            "/admin/stats", headers={"Authorization": f"Bearer {self.ADMIN_TOKEN}"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.json()["pools"]), {"sync", "async"})
+        self.assertIn("exhausted", response.json()["pools"]["async"])
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,124 @@
+import os
+import unittest
+from unittest.mock import patch
+from mongomock import MongoClient
+from pymongo.read_preferences import Nearest, Primary, SecondaryPreferred
+from .base import setUpTest
+from sota.audience_stats import audience_stats
+from sota.database_connection import (
+    _collection,
+    audient_collection,
+    keys_collection,
+    medal_collection,
+    read_audient_collection,
+    read_preference,
+    sport_detail_collection,
+    sub_sport_collection,
+)
+from sota.reference_data import reference_data
+
+
+class TestReadReplicas(setUpTest):
+    """
+    Tests for the routing of the reads to the read-preference handles.
+
+    This test suite verifies that the read preference is read from the settings,
+    the primary unless secondaries are chosen, that the audience pages query the
+    read handle, and that the writes and the cached reads stay on the primary.
+    """
+
+    AUDIENT_TOKEN = "audie" * 4
+    KEYS_DATA = [
+        {
+            "key": AUDIENT_TOKEN,
+            "scope": {"PUBLISH_AUDIENCE": True, "PUBLISH_MEDAL": False},
+        },
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def test_read_preference_is_read_from_the_settings(self):
+        """Ensure the mode and the maximum staleness come from the settings."""
+        self.assertEqual(read_preference(), Primary())
+
+        with patch.dict(os.environ, {"READ_PREFERENCE": "secondaryPreferred"}):
+            self.assertEqual(read_preference(), SecondaryPreferred())
+
+        settings = {"READ_PREFERENCE": "nearest", "READ_MAX_STALENESS_SECONDS": "120"}
+        with patch.dict(os.environ, settings):
+            self.assertEqual(read_preference(), Nearest(max_staleness=120))
+
+    def test_read_handle_shares_the_data_of_the_primary_handle(self):
+        """Verify the read handle has the read preference of the settings on the same collection."""
+        self.assertEqual(read_audient_collection.read_preference, read_preference())
+        self.assertEqual(read_audient_collection.full_name, audient_collection.full_name)
+
+        for collection in (audient_collection, medal_collection, keys_collection):
+            self.assertEqual(collection.read_preference, Primary())
+
+    def test_primary_handles_ignore_the_read_preference_of_the_client(self):
+        """Check the primary handles read the primary when the client prefers secondaries."""
+        database = MongoClient(read_preference=SecondaryPreferred())["Sota"]
+        with patch.dict(os.environ, {"MEDAL_COLLECTION": "Medal"}):
+            collection = _collection(database, "MEDAL_COLLECTION").resolve()
+
+        self.assertEqual(database.read_preference, SecondaryPreferred())
+        self.assertEqual(collection.read_preference, Primary())
+
+    def test_reference_data_is_loaded_from_the_primary(self):
+        """Check that reloading the reference data queries the primary handles."""
+        with patch.object(
+            sport_detail_collection, "find", wraps=sport_detail_collection.find
+        ) as mock_sports, patch.object(
+            sub_sport_collection, "find", wraps=sub_sport_collection.find
+        ) as mock_sub_sports:
+            reference_data.reload()
+
+        mock_sports.assert_called_once()
+        mock_sub_sports.assert_called_once()
+
+    def test_audience_pages_use_the_read_handle(self):
+        """Ensure the audience pages and stream query the read handle, and the cached statistics the primary."""
+        audience_stats.invalidate()
+        with patch.object(
+            read_audient_collection, "find", wraps=read_audient_collection.find
+        ) as mock_find, patch.object(
+            read_audient_collection, "aggregate"
+        ) as mock_read_aggregate, patch.object(
+            audient_collection, "aggregate", wraps=audient_collection.aggregate
+        ) as mock_aggregate:
+            self.fastapi_client.get("/audient")
+            self.fastapi_client.get("/audient/stream")
+            self.fastapi_client.get("/audient/stats")
+
+        self.assertEqual(mock_find.call_count, 2)
+        mock_read_aggregate.assert_not_called()
+        mock_aggregate.assert_called_once()
+
+    def test_audience_writes_use_the_primary(self):
+        """Verify the audience upload writes through the primary handle."""
+        audience = {
+            "audience": [
+                {"id": "r1", "country_code": "US", "sport_id": [1], "gender": "F", "age": 30}
+            ]
+        }
+        with patch.object(
+            read_audient_collection, "bulk_write"
+        ) as mock_read_write, patch.object(
+            audient_collection, "bulk_write", wraps=audient_collection.bulk_write
+        ) as mock_write:
+            response = self.post_request(
+                "/audient/update_audient_info", self.AUDIENT_TOKEN, audience
+            )
+
+        self.assertEqual(response.status_code, 200)
+        mock_write.assert_called_once()
+        mock_read_write.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import threading
+import unittest
+from unittest.mock import patch
+from .base import setUpTest
+from fastapi import status
+from sota.data_versions import data_versions, REFERENCE
+from sota.database_connection import sport_detail_collection, sub_sport_collection
+from sota.projections import medal_projections
+from sota.reference_data import ReferenceData, reference_data
+
+
+class TestReferenceData(setUpTest):
+    """
+    Tests for the cache of the SportDetail and SubSportType collections.
+
+    This test suite verifies that the sport routes and the validators are answered from
+    the cache, and that the cache is loaded again once its TTL expired or when an admin
+    asks for it.
+    """
+
+    ADMIN_TOKEN = "admin" * 4
+    MEDAL_TOKEN = "medal" * 4
+    KEYS_DATA = [
+        {"key": ADMIN_TOKEN, "scope": {"ADMIN": True}},
+        {
+            "key": MEDAL_TOKEN,
+            "scope": {"PUBLISH_AUDIENCE": False, "PUBLISH_MEDAL": True},
+        },
+    ]
+
+    NEW_SPORT = {
+        "sport_id": 1000,
+        "sport_name": "Breaking",
+        "sport_summary": "Breaking is good",
+        "participating_countries": ["US"],
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare the test environment and insert necessary authentication keys."""
+        super().setUpClass()
+        cls.insert_authentication_keys(cls.KEYS_DATA)
+
+    def setUp(self):
+        """Start every test from freshly loaded reference data."""
+        reference_data.reload()
+
+    def tearDown(self):
+        """Remove the sport added by a test."""
+        self.db["SportDetail"].delete_many({"sport_id": self.NEW_SPORT["sport_id"]})
+
+    def test_sport_routes_are_answered_from_the_cache(self):
+        """Ensure '/sports' and '/sport/all' list every sport without querying the database."""
+        with patch.object(sport_detail_collection, "find") as mock_find, patch.object(
+            sport_detail_collection, "aggregate"
+        ) as mock_aggregate:
+            sports = self.fastapi_client.get("/sports")
+            sport_details = self.fastapi_client.get("/sport/all")
+
+        mock_find.assert_not_called()
+        mock_aggregate.assert_not_called()
+        self.assertEqual(sports.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(sports.json()), self.db["SportDetail"].count_documents({}))
+        self.assertEqual(sports.json()["1"], "Archery")
+
+        archery = sport_details.json()[0]
+        self.assertEqual(archery["sport_name"], "Archery")
+        self.assertNotIn("_id", archery)
+        self.assertEqual(
+            archery["sport_types"][0],
+            {
+                key: value
+                for key, value in self.db["SubSportType"].find_one(
+                    {"sport_id": 1, "type_id": 1}, {"_id": 0, "sport_id": 0}
+                ).items()
+            },
+        )
+
+    def test_medal_validators_do_not_query_the_database(self):
+        """Verify that the checks of a medal update are answered from the cache."""
+        payload = {
+            "sport_id": 1,
+            "sport_type_id": 1,
+            "participants": [{"country": "US", "medal": {"gold": 1}}],
+        }
+        with patch.object(sub_sport_collection, "find_one") as mock_find_one:
+            response = self.post_request("/medals/update_medal", self.MEDAL_TOKEN, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_find_one.assert_not_called()
+
+    def test_cache_is_reloaded_after_its_ttl(self):
+        """Test that a sport added to the database is seen once the TTL expired, not before."""
+        cached = ReferenceData(ttl=3600)
+        expired = ReferenceData(ttl=0)
+        cached.reload()
+        expired.reload()
+
+        self.db["SportDetail"].insert_one(dict(self.NEW_SPORT))
+
+        self.assertIsNone(cached.sport(self.NEW_SPORT["sport_id"]))
+        # the expired cache answers its previous data while it is loaded again
+        self.assertIsNone(expired.sport(self.NEW_SPORT["sport_id"]))
+        expired._refresh.join(timeout=5)
+        self.assertEqual(
+            expired.sport_name(self.NEW_SPORT["sport_id"]), self.NEW_SPORT["sport_name"]
+        )
+
+    def test_expired_lookups_do_not_wait_for_the_reload(self):
+        """Verify that a lookup after the TTL doesn't query the database, the reload runs in the background."""
+        expired = ReferenceData(ttl=0)
+        expired.reload()
+        release = threading.Event()
+        started = threading.Event()
+        find = sport_detail_collection.find
+
+        def slow_find(*args, **kwargs):
+            started.set()
+            release.wait(timeout=5)
+            return find(*args, **kwargs)
+
+        with patch.object(sport_detail_collection, "find", side_effect=slow_find) as mock_find:
+            self.assertEqual(expired.sport_name(1), reference_data.sport_name(1))
+            self.assertTrue(started.wait(timeout=5))
+            # a single reload runs, whatever the number of lookups meanwhile
+            self.assertEqual(expired.sport_name(1), reference_data.sport_name(1))
+            release.set()
+            expired._refresh.join(timeout=5)
+
+        self.assertEqual(mock_find.call_count, 1)
+        self.assertFalse(expired._refresh.is_alive())
+
+    def test_version_only_bumped_by_changed_data(self):
+        """Verify a reload finding the same sports keeps the ETags, and a new sport changes them."""
+        version = data_versions.get(REFERENCE)
+
+        reference_data.reload()
+        self.assertEqual(data_versions.get(REFERENCE), version)
+
+        self.db["SportDetail"].insert_one(dict(self.NEW_SPORT))
+        reference_data.reload()
+        self.assertEqual(data_versions.get(REFERENCE), version + 1)
+
+    def test_renamed_sub_sport_reaches_the_medal_documents(self):
+        """Check that a reload finding a new name refreshes the '/medal' documents without the database."""
+        self.db["Medal"].delete_many({"country_code": "US"})
+        self.post_request(
+            "/medals/update_medal",
+            self.MEDAL_TOKEN,
+            {"sport_id": 1, "sport_type_id": 1, "participants": [{"country": "US", "medal": {"gold": 1}}]},
+        )
+        medal_projections.rebuild()
+        type_name = reference_data.type_name(1, 1)
+        self.db["SubSportType"].update_one({"sport_id": 1, "type_id": 1}, {"$set": {"type_name": "Renamed"}})
+        self.addCleanup(reference_data.reload)
+        self.addCleanup(
+            self.db["SubSportType"].update_one,
+            {"sport_id": 1, "type_id": 1},
+            {"$set": {"type_name": type_name}},
+        )
+
+        with patch("sota.projections.medal_collection.find") as mock_find:
+            reference_data.reload()
+
+        mock_find.assert_not_called()
+        sub_sports = self.fastapi_client.get("/medal/s/1/t/1").json()
+        self.assertEqual(sub_sports["sub_sport_name"], "Renamed")
+
+    def test_admin_reload(self):
+        """Check that the admin reload makes a new sport visible to the routes."""
+        self.db["SportDetail"].insert_one(dict(self.NEW_SPORT))
+        self.assertEqual(self.fastapi_client.get("/sport/1000").json(), {})
+
+        response = self.post_request("/admin/reference/reload", self.ADMIN_TOKEN, None)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.fastapi_client.get("/sport/1000").json()["sport_name"], "Breaking"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+import orjson
+from .base import setUpTest
+from fastapi import status
+from fastapi.encoders import jsonable_encoder
+
+
+class TestSerialization(setUpTest):
+    """
+    Tests for the encoding of the responses.
+
+    This test suite verifies that the responses are encoded by orjson, that the read
+    routes are converted from their response models instead of the generic encoder,
+    and that the models return the same documents as before.
+    """
+
+    TYPED_ROUTES = [
+        "/medals",
+        "/medal/c/US",
+        "/medal/s/1",
+        "/medal/s/1/t/1",
+        "/sport/all",
+        "/sport/1",
+        "/sports",
+        "/audient",
+    ]
+
+    def get(self, url):
+        """
+        Sends a GET request, returns the response, whether orjson encoded it and
+        whether the data went through the generic `jsonable_encoder`.
+        """
+        with patch(
+            "sota.responses.orjson.dumps", wraps=orjson.dumps
+        ) as mock_dumps, patch(
+            "fastapi.routing.jsonable_encoder", wraps=jsonable_encoder
+        ) as mock_encoder:
+            response = self.fastapi_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, mock_dumps.called, mock_encoder.called
+
+    def test_read_routes_are_encoded_from_their_response_model(self):
+        """Ensure the read routes skip the generic encoder and are encoded by orjson."""
+        for url in self.TYPED_ROUTES:
+            with self.subTest(url=url):
+                _, encoded_by_orjson, generic_encoder = self.get(url)
+                self.assertTrue(encoded_by_orjson)
+                self.assertFalse(generic_encoder)
+
+    def test_other_routes_are_encoded_by_orjson(self):
+        """Verify that routes returning plain data use the default response class."""
+        response, encoded_by_orjson, generic_encoder = self.get("/")
+
+        self.assertTrue(encoded_by_orjson)
+        self.assertTrue(generic_encoder)
+        self.assertEqual(response.json(), {"msg": "welcome to root page"})
+
+    def test_missing_documents_are_blank_objects(self):
+        """Test that the routes finding nothing still return a blank object."""
+        for url in ("/medal/c/ZZ", "/medal/s/999", "/medal/s/1/t/999", "/sport/999"):
+            with self.subTest(url=url):
+                response = self.fastapi_client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.json(), {})
+
+    def test_sport_details_are_returned_whole(self):
+        """Check that the sport model returns every field of the reference data."""
+        sport = self.db["SportDetail"].find_one({"sport_id": 1}, {"_id": 0})
+
+        response = self.fastapi_client.get("/sport/1").json()
+
+        self.assertEqual(
+            {key: value for key, value in response.items() if key != "sport_types"}, sport
+        )
+        self.assertEqual(
+            len(response["sport_types"]),
+            self.db["SubSportType"].count_documents({"sport_id": 1}),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+import unittest
+from .base import setUpTest
+
+# budget of the import of the modules of sota themselves, their dependencies excluded
+SOTA_IMPORT_BUDGET_MS = 200
+
+
+class TestStartup(setUpTest):
+    """
+    Tests for the cost of importing the app.
+
+    This test suite imports `sota.main` in a fresh interpreter with `-X importtime` and
+    verifies that no database client is created and no heavy optional module is loaded
+    by the import, and that the modules of sota stay within their import-time budget.
+    """
+
+    def import_app(self):
+        """
+        Imports the app in a new interpreter, returns the self import time in
+        microseconds of every module and what the interpreter printed.
+        """
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                "import sota.main\n"
+                "from sota.database_connection import client, async_client\n"
+                "print(client.created, async_client.created)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self_times = {}
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_time, _, module = line.removeprefix("import time:").split("|")
+            self_times[module.strip()] = int(self_time)
+        return self_times, process.stdout.strip()
+
+    def test_import_is_lazy(self):
+        """Ensure importing the app creates no client and loads neither pycountry nor mongomock."""
+        self_times, output = self.import_app()
+
+        self.assertIn("sota.main", self_times)
+        self.assertEqual(output, "False False")
+        self.assertNotIn("pycountry", self_times)
+        self.assertNotIn("mongomock", self_times)
+
+    def test_import_time_budget(self):
+        """Verify that the modules of sota are imported within their budget."""
+        self_times, _ = self.import_app()
+
+        sota_ms = sum(
+            self_time
+            for module, self_time in self_times.items()
+            if module == "sota" or module.startswith("sota.")
+        ) / 1000
+        self.assertLess(sota_ms, SOTA_IMPORT_BUDGET_MS)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up resources after all tests have been executed."""
+        super().tearDownClass()